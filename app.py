@@ -5,13 +5,11 @@ Starten mit: streamlit run app.py
 
 import streamlit as st
 import os
-import tempfile
-import shutil
-import zipfile
-import io
 import time
 import warnings
 
+from result_spool import create_spool, discard_spool, touch_spool, build_results_zip
+
 warnings.simplefilter("ignore", category=DeprecationWarning)
 
 # ==================== PAGE CONFIG ====================
@@ -23,23 +21,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ==================== NER-MODELLE LADEN (einmalig, gecacht) ====================
+# ==================== NER-MODELLE (lazy, gecacht) ====================
+# Die Modelle werden nicht im Server-Prozess geladen, sondern in den Worker-Prozessen
+# der Job-Queue (siehe job_queue.py) — dort bleiben sie zwischen den Jobs geladen.
 
-@st.cache_resource(show_spinner="Lade NER-Modelle...")
-def init_ner_models():
-    """Lädt die NER-Modelle einmalig und gibt den Status zurück."""
-    from docx_redactor import load_flair_models, load_spacy_model, get_engine_name
-    try:
-        load_flair_models()
-        engine = "flair"
-    except (ImportError, Exception):
-        load_spacy_model()
-        engine = "spacy"
-    return engine, get_engine_name()
+def detect_default_engine():
+    """Ermittelt die Standard-Engine ohne die Modelle zu laden."""
+    import importlib.util
+    return "flair" if importlib.util.find_spec("flair") is not None else "spacy"
 
 
-# Modelle beim Start laden
-default_engine, default_engine_name = init_ner_models()
+default_engine = detect_default_engine()
 
 
 # ==================== SIDEBAR ====================
@@ -47,14 +39,22 @@ default_engine, default_engine_name = init_ner_models()
 st.sidebar.title("Einstellungen")
 
 # NER-Engine
-engine_options = {"Flair (genauer)": "flair", "spaCy (schneller)": "spacy"}
+engine_options = {"Flair (genauer)": "flair", "spaCy (schneller)": "spacy",
+                  "Flair int8 (CPU-optimiert)": "flair-int8"}
 selected_engine_label = st.sidebar.radio(
     "NER-Engine",
     list(engine_options.keys()),
     index=0 if default_engine == "flair" else 1,
-    help="Flair: Zwei spezialisierte Modelle (legal + large), F1 ~92%. spaCy: Schneller, F1 ~85%."
+    help="Flair: Zwei spezialisierte Modelle (legal + large), F1 ~92%. spaCy: Schneller, F1 ~85%. "
+         "Flair int8: Dieselben Modelle quantisiert, deutlich schneller auf der CPU (Abweichung siehe ner_quantize.py check)."
 )
 selected_engine = engine_options[selected_engine_label]
+use_cascade = selected_engine != "spacy" and st.sidebar.checkbox(
+    "Kaskade (large-Modell nur bei Bedarf)",
+    value=False,
+    help="Das legal-Modell läuft auf allen Sätzen, das large-Modell nur auf Sätzen mit unsicheren "
+         "Treffern oder unerkannten namensartigen Wörtern. Deutlich schneller, selten weniger Treffer."
+)
 
 # Sensitivität
 sensitivity_options = {
@@ -89,8 +89,10 @@ if use_api:
 
 # Info
 st.sidebar.markdown("---")
+from docx_redactor import get_engine_name
+
 st.sidebar.markdown(
-    f"**Aktive Engine:** {default_engine_name}  \n"
+    f"**Aktive Engine:** {get_engine_name()}  \n"
     f"**Alle Daten bleiben lokal** (außer bei API-Nutzung)"
 )
 
@@ -152,178 +154,138 @@ if uploaded_files:
     st.info(f"{len(uploaded_files)} Datei(en) hochgeladen: {', '.join(f.name for f in uploaded_files)}")
 
 
+# ==================== SPOOL-VERZEICHNIS (PRO SITZUNG) ====================
+# Die Ergebnisse einer Sitzung liegen auf der Platte (siehe result_spool.py).
+
+def new_session_spool():
+    """Verwirft die Ergebnisse des vorigen Laufs dieser Sitzung und legt ein neues Spool-Verzeichnis an."""
+    spool_dir = create_spool(previous=st.session_state.pop("spool_dir", None))
+    st.session_state["spool_dir"] = spool_dir
+    return spool_dir
+
+
+def _read_file(path):
+    """Liefert eine Funktion, die die Datei erst beim Klick auf den Download liest."""
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+def download_from_disk(label, path, file_name, mime):
+    """
+    Download-Button mit verzögerten Daten: bei einem Rerun wird nur der Button
+    gezeichnet, die Datei wird erst beim Klick gelesen (nicht bei jedem Rerun
+    in den Speicher geladen und neu registriert). Der Klick löst keinen Rerun aus.
+    """
+    if not os.path.exists(path):
+        st.warning(f"{file_name} ist nicht mehr verfügbar — bitte erneut verarbeiten.")
+        return
+    st.download_button(label=label, data=_read_file(path), file_name=file_name, mime=mime,
+                       on_click="ignore", key=f"download_{path}", use_container_width=True)
+
+
 # ==================== VERARBEITUNG ====================
 
-def process_files(uploaded_files, engine, sensitivity, convert_pdf, use_api_post):
-    """Hauptverarbeitungsfunktion — verarbeitet alle hochgeladenen Dateien."""
-    from docx_redactor import (
-        process_docx, process_docx_api, EntityMapper,
-        set_sensitivity, set_ner_engine, redact_text_full
-    )
-    from pdf_redactor import redact_pdf, redact_pdf_api
-    from file_converter import (
-        convert_docx_to_pdf, convert_doc_to_docx,
-        extract_msg_text, convert_text_to_pdf
-    )
+@st.cache_resource
+def get_job_queue():
+    """Eine Job-Queue pro Server-Prozess, gemeinsam für alle Sitzungen."""
+    from job_queue import JobQueue
+    return JobQueue(preload_engine=default_engine)
 
-    # Engine & Sensitivität setzen
-    set_ner_engine(engine)
-    set_sensitivity(sensitivity)
 
-    # Temporäre Ordner
-    work_dir = tempfile.mkdtemp()
-    input_dir = os.path.join(work_dir, "input")
-    conv_dir = os.path.join(work_dir, "converted")
-    redacted_dir = os.path.join(work_dir, "redacted")
-    os.makedirs(input_dir, exist_ok=True)
-    os.makedirs(conv_dir, exist_ok=True)
-    os.makedirs(redacted_dir, exist_ok=True)
+def submit_files(uploaded_files, engine, sensitivity, convert_pdf, use_api_post, cascade=False):
+    """Legt die hochgeladenen Dateien im Spool der Sitzung ab und reiht einen Job ein."""
+    from redaction_pipeline import prepare_work_dir
 
-    # Dateien speichern
+    work_dir = new_session_spool()
+    input_dir = prepare_work_dir(work_dir)["input"]
+    size = 0
     for uf in uploaded_files:
-        file_path = os.path.join(input_dir, uf.name)
-        with open(file_path, "wb") as f:
+        with open(os.path.join(input_dir, uf.name), "wb") as f:
             f.write(uf.getbuffer())
-
-    mapper = EntityMapper(sensitivity=sensitivity)
-    results = []
-    pdf_files_to_process = []
-    total_files = len(uploaded_files)
-    progress_bar = st.progress(0, text="Starte Verarbeitung...")
-    status_text = st.empty()
-    current = 0
-
-    # === Dateien verarbeiten ===
-    for file in os.listdir(input_dir):
-        full_path = os.path.join(input_dir, file)
-        if not os.path.isfile(full_path):
-            continue
-
-        filename, ext = os.path.splitext(file)
-        ext = ext.lower()
-        current += 1
-        progress_bar.progress(current / (total_files + 1), text=f"Verarbeite: {file}")
-
-        if ext == ".docx":
-            if convert_pdf:
-                # DOCX -> PDF konvertieren, dann PDF schwärzen
-                output_pdf = os.path.join(conv_dir, filename + ".pdf")
-                status_text.text(f"Konvertiere {file} zu PDF...")
-                convert_docx_to_pdf(full_path, output_pdf)
-                if os.path.exists(output_pdf):
-                    pdf_files_to_process.append((output_pdf, filename))
-                else:
-                    st.warning(f"Konvertierung fehlgeschlagen: {file}")
-            else:
-                # DOCX direkt schwärzen
-                output_docx = os.path.join(redacted_dir, file)
-                status_text.text(f"Schwärze {file}...")
-                mapper = process_docx(full_path, output_docx, mapper)
-                results.append({"name": file, "path": output_docx, "type": "docx"})
-
-        elif ext == ".doc":
-            # DOC -> DOCX -> weiterverarbeiten
-            docx_path = os.path.join(conv_dir, filename + ".docx")
-            status_text.text(f"Konvertiere {file} zu DOCX...")
-            convert_doc_to_docx(full_path, docx_path)
-            if os.path.exists(docx_path):
-                if convert_pdf:
-                    output_pdf = os.path.join(conv_dir, filename + ".pdf")
-                    status_text.text(f"Konvertiere {filename}.docx zu PDF...")
-                    convert_docx_to_pdf(docx_path, output_pdf)
-                    if os.path.exists(output_pdf):
-                        pdf_files_to_process.append((output_pdf, filename))
-                else:
-                    output_docx = os.path.join(redacted_dir, filename + ".docx")
-                    status_text.text(f"Schwärze {filename}.docx...")
-                    mapper = process_docx(docx_path, output_docx, mapper)
-                    results.append({"name": filename + ".docx", "path": output_docx, "type": "docx"})
+        size += uf.size
+
+    params = {"work_dir": work_dir, "engine": engine, "sensitivity": sensitivity,
+              "convert_pdf": convert_pdf, "use_api_post": use_api_post, "cascade": cascade}
+    return get_job_queue().submit(params, size=size)
+
+
+def show_job_status(job_id):
+    """
+    Zeigt Fortschritt bzw. Ergebnis eines Jobs. Solange der Job läuft, wird die
+    Seite regelmäßig neu geladen (Polling). Fertige Ergebnisse wandern in den Session-State.
+    """
+    status = get_job_queue().status(job_id)
+    if status is None:
+        # Unbekannter Job (z.B. Server neu gestartet)
+        st.session_state.pop("job_id", None)
+        st.query_params.clear()
+        return
+
+    if status["state"] in ("queued", "running"):
+        st.markdown("---")
+        if status["state"] == "queued":
+            st.info(f"In der Warteschlange (Position {status['position']})...")
+        st.progress(status["progress"], text=status["text"])
+        if st.button("Abbrechen"):
+            get_job_queue().cancel(job_id)
+        time.sleep(1)
+        st.rerun()
+
+    st.session_state.pop("job_id", None)
+    st.query_params.clear()
+
+    if status["state"] == "done":
+        result = status["result"]
+        for warning in result["warnings"]:
+            st.warning(warning)
+        results = result["results"]
+        # Ergebnisse im Session-State speichern (nur Pfade, die Dateien liegen im Spool)
+        st.session_state["spool_dir"] = result["work_dir"]
+        st.session_state["results"] = results
+        st.session_state["mapper"] = result["mapper"]
+        st.session_state["zip_path"] = (build_results_zip(results, result["work_dir"])
+                                        if len(results) > 1 else None)
+        for key in ("api_stats", "cascade_stats", "trace"):
+            if result[key]:
+                st.session_state[key] = result[key]
             else:
-                st.warning(f"DOC-Konvertierung fehlgeschlagen: {file}")
-
-        elif ext == ".msg":
-            # MSG: Text extrahieren -> schwärzen -> PDF
-            status_text.text(f"Schwärze E-Mail {file}...")
-            try:
-                msg_data = extract_msg_text(full_path)
-                redacted_lines = [
-                    f"Betreff: {redact_text_full(msg_data['subject'], mapper)}",
-                    f"Von: {redact_text_full(msg_data['sender'], mapper)}",
-                    f"Datum: {msg_data['date']}",
-                    "",
-                    redact_text_full(msg_data["body"], mapper)
-                ]
-                output_pdf = os.path.join(redacted_dir, filename + ".pdf")
-                convert_text_to_pdf(redacted_lines, output_pdf)
-                results.append({"name": filename + ".pdf", "path": output_pdf, "type": "pdf"})
-            except Exception as e:
-                st.warning(f"MSG-Verarbeitung fehlgeschlagen für {file}: {e}")
-
-        elif ext == ".pdf":
-            pdf_files_to_process.append((full_path, filename))
-
-    # === PDF-Schwärzung ===
-    for pdf_path, pdf_name in pdf_files_to_process:
-        output_pdf = os.path.join(redacted_dir, pdf_name + ".pdf")
-        status_text.text(f"Schwärze {pdf_name}.pdf...")
-        mapper = redact_pdf(pdf_path, output_pdf, mapper)
-        results.append({"name": pdf_name + ".pdf", "path": output_pdf, "type": "pdf"})
-
-    # === Optional: API-Nachbearbeitung ===
-    if use_api_post:
-        status_text.text("API-Nachbearbeitung...")
-        for res in results:
-            if res["type"] == "docx":
-                api_path = res["path"].replace(".docx", "_api.docx")
-                process_docx_api(res["path"], api_path)
-                res["path"] = api_path
-                res["name"] = res["name"].replace(".docx", "_api.docx")
-            elif res["type"] == "pdf":
-                api_path = res["path"].replace(".pdf", "_api.pdf")
-                redact_pdf_api(res["path"], api_path)
-                res["path"] = api_path
-                res["name"] = res["name"].replace(".pdf", "_api.pdf")
-
-    progress_bar.progress(1.0, text="Fertig!")
-    status_text.text("Verarbeitung abgeschlossen!")
-
-    # Download-Daten vorbereiten (Dateien in Memory laden, damit temp-Ordner gelöscht werden kann)
-    for res in results:
-        with open(res["path"], "rb") as f:
-            res["data"] = f.read()
-
-    # Temp-Ordner aufräumen
-    try:
-        shutil.rmtree(work_dir)
-    except Exception:
-        pass
-
-    return results, mapper
+                st.session_state.pop(key, None)
+    elif status["state"] == "cancelled":
+        st.warning("Verarbeitung abgebrochen.")
+    else:
+        st.error(f"Verarbeitung fehlgeschlagen: {status['error']}")
 
 
 # ==================== START-BUTTON ====================
 
-if uploaded_files:
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        start_button = st.button(
-            "Schwärzung starten",
-            type="primary",
-            use_container_width=True
-        )
-
-    if start_button:
-        st.markdown("---")
+# Laufenden Job nach einem Browser-Refresh über die URL wiederfinden
+if "job_id" not in st.session_state and "job" in st.query_params:
+    st.session_state["job_id"] = st.query_params["job"]
+
+if uploaded_files or "job_id" in st.session_state or "results" in st.session_state:
+    if uploaded_files and "job_id" not in st.session_state:
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            start_button = st.button(
+                "Schwärzung starten",
+                type="primary",
+                use_container_width=True
+            )
 
-        with st.spinner("Verarbeitung läuft..."):
-            results, mapper = process_files(
+        if start_button:
+            for key in ("results", "mapper", "zip_path", "api_stats", "cascade_stats", "trace"):
+                st.session_state.pop(key, None)
+            job_id = submit_files(
                 uploaded_files, selected_engine, selected_sensitivity,
-                convert_to_pdf, use_api
+                convert_to_pdf, use_api, use_cascade
             )
+            st.session_state["job_id"] = job_id
+            st.query_params["job"] = job_id
 
-        # Ergebnisse im Session-State speichern
-        st.session_state["results"] = results
-        st.session_state["mapper"] = mapper
+    if "job_id" in st.session_state:
+        show_job_status(st.session_state["job_id"])
 
     # Ergebnisse anzeigen (aus Session-State, überlebt Reruns)
     if "results" in st.session_state:
@@ -333,6 +295,8 @@ if uploaded_files:
         if results:
             st.success(f"{len(results)} Datei(en) erfolgreich geschwärzt!")
 
+            touch_spool(st.session_state.get("spool_dir"))
+
             # Download-Bereich
             st.subheader("Geschwärzte Dateien herunterladen")
 
@@ -342,29 +306,14 @@ if uploaded_files:
                 col = download_cols[i % 3]
                 with col:
                     mime = "application/pdf" if res["type"] == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    st.download_button(
-                        label=f"  {res['name']}",
-                        data=res["data"],
-                        file_name=res["name"],
-                        mime=mime,
-                        use_container_width=True
-                    )
-
-            # ZIP-Download bei mehreren Dateien
-            if len(results) > 1:
+                    download_from_disk(f"  {res['name']}", res["path"], res["name"], mime)
+
+            # ZIP-Download bei mehreren Dateien (einmalig gebaut, siehe build_results_zip)
+            zip_path = st.session_state.get("zip_path")
+            if zip_path:
                 st.markdown("")
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for res in results:
-                        zf.writestr(res["name"], res["data"])
-                zip_buffer.seek(0)
-                st.download_button(
-                    label="Alle Dateien als ZIP herunterladen",
-                    data=zip_buffer,
-                    file_name="redacted_documents.zip",
-                    mime="application/zip",
-                    use_container_width=True
-                )
+                download_from_disk("Alle Dateien als ZIP herunterladen", zip_path,
+                                   "redacted_documents.zip", "application/zip")
 
             # ==================== ZUSAMMENFASSUNG ====================
 
@@ -380,6 +329,38 @@ if uploaded_files:
             met_cols[2].metric("Firmen erkannt", len(mapper.org_mapping))
             met_cols[3].metric("Orte erkannt", len(mapper.loc_mapping))
 
+            api_stats = st.session_state.get("api_stats")
+            if api_stats and api_stats["requests"]:
+                api_cols = st.columns(4)
+                api_cols[0].metric("API-Anfragen", api_stats["requests"])
+                api_cols[1].metric("API-Aufrufe", api_stats["calls"])
+                api_cols[2].metric("Aus Cache", api_stats["cache_hits"])
+                api_cols[3].metric("Tokens gespart", api_stats["tokens_saved"])
+
+            cascade_stats = st.session_state.get("cascade_stats")
+            if cascade_stats and cascade_stats["sentences"]:
+                cas_cols = st.columns(4)
+                cas_cols[0].metric("Sätze (NER)", cascade_stats["sentences"])
+                cas_cols[1].metric("Zweites Modell übersprungen", cascade_stats["skipped"])
+                cas_cols[2].metric("Unsichere Treffer", cascade_stats["low_confidence"])
+                cas_cols[3].metric("Unerkannte Namen", cascade_stats["unexplained_names"])
+
+            trace = st.session_state.get("trace")
+            if trace and trace["stages"]:
+                from tracing import format_rates
+                with st.expander(f"Laufzeiten pro Stufe ({trace['wall_seconds']:.1f}s gesamt)"):
+                    st.caption("Stufen können verschachtelt sein (z.B. ner.* innerhalb von docx.ner) — "
+                               "die Zeiten addieren sich daher nicht zur Gesamtzeit.")
+                    st.dataframe([{"Stufe": name, "Aufrufe": entry["calls"], "Sekunden": entry["seconds"],
+                                   "Durchsatz": format_rates(entry)}
+                                  for name, entry in trace["stages"].items()],
+                                 use_container_width=True, hide_index=True)
+                    st.dataframe([{"Dokument": os.path.basename(doc["name"]), "Sekunden": doc["wall_seconds"],
+                                   "Langsamste Stufe": next(iter(doc["stages"]), ""),
+                                   "Profil": doc.get("profile", "")}
+                                  for doc in sorted(trace["documents"], key=lambda d: -d["wall_seconds"])],
+                                 use_container_width=True, hide_index=True)
+
             # Tracking: welche Begriffe wurden bereits gelernt (für Button-Feedback)
             if "learned_this_session" not in st.session_state:
                 st.session_state["learned_this_session"] = set()
@@ -483,7 +464,10 @@ if uploaded_files:
             if st.button("Neue Schwärzung starten", use_container_width=True):
                 # Upload-Key erhöhen erzwingt neuen File-Uploader (auch in Safari)
                 new_key = st.session_state.get("upload_key", 0) + 1
+                # Geschwärzte Dokumente nicht bis zum nächsten Lauf auf der Platte lassen
+                discard_spool(st.session_state.get("spool_dir"))
                 st.session_state.clear()
+                st.query_params.clear()
                 st.session_state["upload_key"] = new_key
                 st.rerun()
 
@@ -0,0 +1,196 @@
+"""
+Parallele Verarbeitung vieler unabhängiger Dokumente.
+
+Ablauf in zwei Phasen:
+1. Erkennung (teuer: NER) läuft in einem Pool von Worker-Prozessen. Es sind
+   höchstens SUBMIT_WINDOW × Worker Aufträge eingereiht oder fertig, aber noch
+   nicht angewendet — der Speicher bleibt begrenzt, ein Abbruch greift sofort.
+2. Anwendung (billig: Platzhalter vergeben, schwärzen, speichern) läuft seriell
+   in der Reihenfolge der Einreihung. Dadurch werden Platzhalter wie "Person A"
+   genau so vergeben, als wäre der Batch nacheinander verarbeitet worden.
+
+Aufträge werden nach Größe eingereiht, die größten zuerst: ein großes Dokument
+am Ende der Liste würde sonst allein den Schluss des Batches bestimmen. Die
+Reihenfolge ist stabil und hängt nicht von der Anzahl Worker ab — auch seriell
+wird so verarbeitet, die Platzhalter sind in beiden Fällen gleich.
+
+Die Worker gehören zum langlebigen Pool des Prozesses (worker_pool): sie laden
+die NER-Modelle einmal und behalten sie über alle Batches hinweg; läuft ein
+NER-Server, rechnen sie dort. Die Anzahl Worker ist zusätzlich durch den freien
+Arbeitsspeicher begrenzt.
+"""
+
+import os
+
+from docx import Document
+from docx_redactor import (process_docx, redact_texts, docx_ner_inputs, text_ner_inputs,
+                            detect_entities_for_texts, store_prefetched_entities,
+                            clear_prefetched_entities,
+                            get_cascade_stats, reset_cascade_stats, add_cascade_stats)
+from pdf_redactor import detect_pdf, apply_pdf_detection
+from file_converter import extract_msg_text, convert_text_to_pdf
+import tracing
+import worker_pool
+
+
+class BatchCancelled(Exception):
+    """Der Batch wurde über die cancel-Funktion abgebrochen."""
+
+
+# Höchstens so viele Aufträge pro Worker gleichzeitig eingereiht (bzw. fertig, nicht angewendet)
+SUBMIT_WINDOW = 2
+
+
+def default_worker_count():
+    """Ein Kern bleibt für den Hauptprozess (Anwendung/Speichern) frei."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def make_job(kind, input_path, output_path):
+    """Ein Auftrag: kind ist "docx", "pdf" oder "msg"."""
+    return {"kind": kind, "input": input_path, "output": output_path}
+
+
+# ==================== PHASE 1: ERKENNUNG ====================
+
+def detect_job(job, sensitivity, confidence_threshold):
+    """Führt die Erkennung für einen Auftrag aus, ohne etwas zu schreiben."""
+    kind = job["kind"]
+    if kind == "docx":
+        return {"entities": detect_entities_for_texts(docx_ner_inputs(Document(job["input"])))}
+    if kind == "msg":
+        msg_data = extract_msg_text(job["input"])
+        fields = [msg_data["subject"], msg_data["sender"], msg_data["body"]]
+        return {"msg": msg_data, "entities": detect_entities_for_texts(text_ner_inputs(fields))}
+    if kind == "pdf":
+        return {"pages": detect_pdf(job["input"], sensitivity, confidence_threshold)}
+    raise ValueError(f"Unbekannter Auftragstyp: {kind}")
+
+
+def _detect_job_traced(job, sensitivity, confidence_threshold):
+    with tracing.span("detect"):
+        return detect_job(job, sensitivity, confidence_threshold)
+
+
+def _detect_job_in_worker(job, sensitivity, confidence_threshold):
+    """detect_job im Worker-Prozess; liefert Kaskaden-Zähler und Tracing-Bericht des Auftrags mit."""
+    reset_cascade_stats()
+    tracing.begin_document(job["input"])
+    try:
+        with tracing.span("detect"):
+            detection = detect_job(job, sensitivity, confidence_threshold)
+    finally:
+        trace = tracing.end_document(record=False)
+    detection["cascade_stats"] = get_cascade_stats()
+    detection["trace"] = trace
+    return detection
+
+
+def _collect_worker_result(future):
+    detection = future.result()
+    add_cascade_stats(detection.pop("cascade_stats", None))
+    tracing.merge_document_report(detection.pop("trace", None))
+    return detection
+
+
+# ==================== PHASE 2: ANWENDUNG ====================
+
+def apply_job(job, detection, mapper):
+    """Wendet das Erkennungsergebnis an (Platzhalter vergeben, schwärzen, speichern)."""
+    kind = job["kind"]
+    if kind == "pdf":
+        return apply_pdf_detection(job["input"], job["output"], detection["pages"], mapper)
+
+    store_prefetched_entities(detection["entities"])
+    try:
+        if kind == "docx":
+            return process_docx(job["input"], job["output"], mapper)
+
+        msg_data = detection["msg"]
+        subject, sender, body = redact_texts(
+            [msg_data["subject"], msg_data["sender"], msg_data["body"]], mapper
+        )
+        convert_text_to_pdf([
+            f"Betreff: {subject}",
+            f"Von: {sender}",
+            f"Datum: {msg_data['date']}",
+            "",
+            body
+        ], job["output"])
+        print(f"  MSG geschwärzt und als PDF gespeichert: {job['output']}")
+        return mapper
+    finally:
+        clear_prefetched_entities()
+
+
+# ==================== AUSFÜHRUNG ====================
+
+def _job_size(job):
+    try:
+        return os.path.getsize(job["input"])
+    except OSError:
+        return 0
+
+
+def run_batch(jobs, mapper, workers=None, progress=None, cancel=None):
+    """
+    Verarbeitet alle Aufträge und gibt den Mapper zurück.
+    workers: Anzahl Worker-Prozesse (None = automatisch, 1 = alles im Hauptprozess)
+    progress: optionaler Callback progress(fertig, gesamt, job, fehler)
+    cancel: optionale Funktion; liefert sie True, bricht der Batch vor dem nächsten
+            Auftrag mit BatchCancelled ab
+    Fehlgeschlagene Aufträge werden gemeldet und übersprungen.
+    """
+    if workers is None:
+        workers = default_worker_count()
+    total = len(jobs)
+    # Größte zuerst (stabil bei gleicher Größe)
+    jobs = sorted(jobs, key=_job_size, reverse=True)
+
+    def finish(done, job, detect):
+        error = None
+        tracing.begin_document(job["input"], bytes=_job_size(job))
+        try:
+            apply_job(job, detect(), mapper)
+        except Exception as e:
+            error = e
+            print(f"  Fehler bei {os.path.basename(job['input'])}: {e}")
+        finally:
+            tracing.end_document()
+        if progress:
+            progress(done, total, job, error)
+
+    # Ein einzelner Auftrag läuft im Hauptprozess. Sonst bestimmt workers die Größe
+    # des langlebigen Pools — nicht die Anzahl Aufträge, sonst würde er bei jedem
+    # kleineren Batch neu gestartet
+    if workers <= 1 or total <= 1:
+        for done, job in enumerate(jobs, start=1):
+            if cancel and cancel():
+                raise BatchCancelled()
+            finish(done, job, lambda job=job: _detect_job_traced(job, mapper.sensitivity,
+                                                                 mapper.confidence_threshold))
+        return mapper
+
+    workers = worker_pool.worker_limit(workers)
+    settings = worker_pool.task_settings(sensitivity=mapper.sensitivity)
+    # In derselben Reihenfolge einreihen und anwenden (deterministische Platzhalter);
+    # nur ein Fenster von Aufträgen ist gleichzeitig unterwegs
+    window = SUBMIT_WINDOW * workers
+    futures = {}
+    submitted = 0
+    try:
+        for index, job in enumerate(jobs):
+            while submitted < min(total, index + window):
+                futures[submitted] = worker_pool.submit_task(
+                    workers, settings, _detect_job_in_worker, jobs[submitted],
+                    mapper.sensitivity, mapper.confidence_threshold)
+                submitted += 1
+            if cancel and cancel():
+                raise BatchCancelled()
+            finish(index + 1, job, lambda future=futures.pop(index): _collect_worker_result(future))
+    finally:
+        # Bei Abbruch/Fehler: noch nicht gestartete Aufträge verwerfen, der Pool bleibt
+        for future in futures.values():
+            future.cancel()
+
+    return mapper
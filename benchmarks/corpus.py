@@ -0,0 +1,294 @@
+"""
+Synthetischer Korpus für die Benchmarks: deutsche/österreichische Verträge,
+Schriftsätze und E-Mails mit bekannten personenbezogenen Daten.
+
+- Reproduzierbar: gleicher Seed → identische Dokumente (random.Random, keine Zeitstempel)
+- Verträge und Schriftsätze als DOCX (Absätze, Tabelle, Kopfzeile) und PDF
+- E-Mails als JSON mit den Feldern einer MSG-Datei (subject, sender, date, body),
+  da sich .msg-Dateien ohne Outlook nicht erzeugen lassen
+- manifest.json listet pro Dokument die enthaltenen personenbezogenen Daten
+
+Aufruf:
+    python benchmarks/corpus.py --out /tmp/corpus --contracts 20 --pleadings 20 --emails 40
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRST_NAMES = [
+    "Max", "Anna", "Thomas", "Julia", "Michael", "Sabine", "Stefan", "Katharina", "Andreas",
+    "Claudia", "Markus", "Petra", "Jürgen", "Monika", "Florian", "Elisabeth", "Lukas", "Theresa",
+    "Wolfgang", "Ursula", "Sebastian", "Birgit", "Johannes", "Gertrud", "Matthias", "Verena",
+]
+LAST_NAMES = [
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Hoffmann",
+    "Schulz", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Huber", "Gruber", "Pichler", "Steiner",
+    "Moser", "Hofer", "Leitner", "Berger", "Fuchs", "Eder", "Zimmermann", "Krüger", "Lehmann",
+]
+COMPANY_STEMS = [
+    "Alpen", "Donau", "Nordlicht", "Rhein", "Sonnenberg", "Tauern", "Bergland", "Hansa",
+    "Isar", "Main", "Brenner", "Waldviertel", "Elbe", "Bodensee", "Kärntner", "Spree",
+]
+COMPANY_TRADES = ["Bau", "Immobilien", "Logistik", "Handel", "Consulting", "Software", "Energie", "Holz"]
+COMPANY_FORMS = ["GmbH", "AG", "KG", "GmbH & Co. KG", "OG", "e.U."]
+STREETS = [
+    "Hauptstraße", "Bahnhofstraße", "Schillerstraße", "Goethestraße", "Lindenweg", "Kirchgasse",
+    "Mozartgasse", "Ringstraße", "Am Marktplatz", "Gartenweg", "Wiener Straße", "Bergstraße",
+]
+CITIES_DE = [("80331", "München"), ("10115", "Berlin"), ("20095", "Hamburg"), ("50667", "Köln"),
+             ("60311", "Frankfurt am Main"), ("70173", "Stuttgart"), ("04109", "Leipzig")]
+CITIES_AT = [("1010", "Wien"), ("8010", "Graz"), ("4020", "Linz"), ("5020", "Salzburg"),
+             ("6020", "Innsbruck"), ("9020", "Klagenfurt")]
+COURTS_DE = ["Amtsgericht München", "Landgericht Berlin", "Landgericht Hamburg", "Amtsgericht Köln"]
+COURTS_AT = ["Bezirksgericht Innere Stadt Wien", "Landesgericht für ZRS Graz", "Handelsgericht Wien"]
+LAWS = ["§ 823 Abs. 1 BGB", "§ 535 BGB", "§ 433 Abs. 2 BGB", "§ 1295 ABGB", "§ 1096 ABGB",
+        "Art. 6 Abs. 1 lit. b DSGVO", "§ 280 Abs. 1 BGB i.V.m. § 241 Abs. 2 BGB"]
+
+
+class PIIFactory:
+    """Erzeugt zusammenpassende personenbezogene Daten und merkt sich alle erzeugten Werte."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.pii = {"PER": [], "ORG": [], "ADDRESS": [], "IBAN": [], "EMAIL": [], "PHONE": [],
+                    "BIRTHDATE": [], "HRB": []}
+
+    def _record(self, kind, value):
+        if value not in self.pii[kind]:
+            self.pii[kind].append(value)
+        return value
+
+    def person(self):
+        return self._record("PER", f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}")
+
+    def company(self):
+        name = (f"{self.rng.choice(COMPANY_STEMS)} {self.rng.choice(COMPANY_TRADES)} "
+                f"{self.rng.choice(COMPANY_FORMS)}")
+        return self._record("ORG", name)
+
+    def address(self, austria=False):
+        plz, city = self.rng.choice(CITIES_AT if austria else CITIES_DE)
+        street = f"{self.rng.choice(STREETS)} {self.rng.randint(1, 120)}"
+        self._record("ADDRESS", street)
+        return f"{street}, {plz} {city}"
+
+    def iban(self, austria=False):
+        if austria:
+            digits = "".join(str(self.rng.randint(0, 9)) for _ in range(18))
+            value = f"AT{digits[:2]} {digits[2:6]} {digits[6:10]} {digits[10:14]} {digits[14:18]}"
+        else:
+            digits = "".join(str(self.rng.randint(0, 9)) for _ in range(20))
+            value = f"DE{digits[:2]} {digits[2:6]} {digits[6:10]} {digits[10:14]} {digits[14:18]} {digits[18:20]}"
+        return self._record("IBAN", value)
+
+    def email(self, person):
+        first, last = person.split(" ", 1)
+        local = f"{first}.{last}".lower().replace("ü", "ue").replace("ö", "oe").replace("ä", "ae")
+        return self._record("EMAIL", f"{local}@{self.rng.choice(['example.de', 'example.at', 'mail.example.com'])}")
+
+    def phone(self, austria=False):
+        if austria:
+            value = f"+43 {self.rng.randint(1, 699)} {self.rng.randint(100000, 9999999)}"
+        else:
+            value = f"+49 {self.rng.randint(30, 9999)} {self.rng.randint(100000, 9999999)}"
+        return self._record("PHONE", value)
+
+    def birthdate(self):
+        return self._record("BIRTHDATE", f"{self.rng.randint(1, 28):02d}.{self.rng.randint(1, 12):02d}."
+                                         f"{self.rng.randint(1940, 2002)}")
+
+    def hrb(self):
+        return self._record("HRB", f"HRB {self.rng.randint(10000, 299999)}")
+
+    def date(self):
+        return f"{self.rng.randint(1, 28):02d}.{self.rng.randint(1, 12):02d}.{self.rng.randint(2015, 2024)}"
+
+
+# ==================== VORLAGEN ====================
+
+def make_contract(rng, number):
+    """Mietvertrag bzw. Kaufvertrag zwischen einer Person und einer Firma."""
+    f = PIIFactory(rng)
+    austria = rng.random() < 0.4
+    tenant, landlord_rep = f.person(), f.person()
+    company = f.company()
+    kind = rng.choice(["Mietvertrag", "Kaufvertrag"])
+    paragraphs = [
+        f"{kind} Nr. {number:04d}",
+        f"zwischen {company}, {f.address(austria)}, eingetragen unter {f.hrb()}, "
+        f"vertreten durch den Geschäftsführer {landlord_rep},",
+        f"und Frau/Herrn {tenant}, geboren am {f.birthdate()}, wohnhaft {f.address(austria)}, "
+        f"E-Mail: {f.email(tenant)}, Tel. {f.phone(austria)}.",
+        "§ 1 Vertragsgegenstand",
+        f"Gegenstand dieses Vertrages ist das Objekt in der {f.address(austria)}. "
+        f"Die Übergabe erfolgt am {f.date()} gem. {rng.choice(LAWS)}.",
+        "§ 2 Entgelt und Zahlung",
+        f"Das Entgelt beträgt EUR {rng.randint(500, 450000):,}".replace(",", ".")
+        + f",00 und ist auf das Konto IBAN {f.iban(austria)} bei der kontoführenden Bank zu überweisen.",
+        "§ 3 Sonstiges",
+        "Änderungen dieses Vertrages bedürfen der Schriftform. Sollte eine Bestimmung unwirksam sein, "
+        "bleibt die Wirksamkeit der übrigen Bestimmungen unberührt (salvatorische Klausel).",
+    ]
+    for i in range(rng.randint(3, 8)):
+        paragraphs.append(
+            f"§ {4 + i} Weitere Vereinbarungen: Die Parteien vereinbaren, dass {rng.choice([tenant, company])} "
+            f"die Pflichten aus {rng.choice(LAWS)} erfüllt. Ansprechpartner ist {f.person()}, "
+            f"erreichbar unter {f.phone(austria)}."
+        )
+    table = [["Partei", "Name", "Anschrift"],
+             ["Vermieter/Verkäufer", company, f.address(austria)],
+             ["Mieter/Käufer", tenant, f.address(austria)]]
+    return {"id": f"contract_{number:04d}", "kind": "contract", "header": f"{kind} — {company}",
+            "paragraphs": paragraphs, "table": table, "pii": f.pii}
+
+
+def make_pleading(rng, number):
+    """Klageschrift mit Parteien, Anwälten und Sachverhalt."""
+    f = PIIFactory(rng)
+    austria = rng.random() < 0.4
+    plaintiff, defendant, lawyer, witness = f.person(), f.person(), f.person(), f.person()
+    court = rng.choice(COURTS_AT if austria else COURTS_DE)
+    paragraphs = [
+        f"An das {court}",
+        "KLAGE",
+        f"Klagende Partei: {plaintiff}, geb. {f.birthdate()}, {f.address(austria)}",
+        f"vertreten durch: Rechtsanwalt Dr. {lawyer}, {f.address(austria)}, Tel. {f.phone(austria)}",
+        f"Beklagte Partei: {defendant}, {f.address(austria)}",
+        f"wegen: EUR {rng.randint(1000, 90000)},-- s.A.",
+        "I. Sachverhalt",
+    ]
+    for _ in range(rng.randint(4, 10)):
+        paragraphs.append(
+            f"Am {f.date()} trafen sich {plaintiff} und {defendant} in den Geschäftsräumen der "
+            f"{f.company()}. Der Zeuge {witness} bestätigt, dass die Beklagte Partei die Zahlung "
+            f"auf das Konto {f.iban(austria)} zugesagt hat. Dies ergibt sich auch aus der E-Mail "
+            f"vom {f.date()} (Beilage ./{rng.randint(1, 20)})."
+        )
+    paragraphs += [
+        "II. Rechtliche Beurteilung",
+        f"Der Anspruch ergibt sich aus {rng.choice(LAWS)} sowie aus {rng.choice(LAWS)}. "
+        "Die Beklagte Partei hat die Forderung trotz Mahnung nicht beglichen.",
+        "III. Beweise",
+        f"Zeuge {witness}, p.A. {f.address(austria)}; Parteienvernehmung; vorgelegte Urkunden.",
+        f"{plaintiff}",
+    ]
+    return {"id": f"pleading_{number:04d}", "kind": "pleading", "header": f"{court} — Klage",
+            "paragraphs": paragraphs, "table": None, "pii": f.pii}
+
+
+def make_email(rng, number):
+    """E-Mail mit Signatur (Felder wie bei extract_msg_text)."""
+    f = PIIFactory(rng)
+    austria = rng.random() < 0.4
+    sender, recipient = f.person(), f.person()
+    company = f.company()
+    body = "\n".join([
+        f"Sehr geehrte/r {recipient},",
+        "",
+        f"anbei übermittle ich Ihnen die Unterlagen zum Vertrag mit der {company}. "
+        f"Bitte überweisen Sie den offenen Betrag auf IBAN {f.iban(austria)}.",
+        f"Für Rückfragen erreichen Sie mich unter {f.phone(austria)} oder per E-Mail an {f.email(sender)}.",
+        "",
+        "Mit freundlichen Grüßen",
+        sender,
+        company,
+        f.address(austria),
+    ])
+    return {"id": f"email_{number:04d}", "kind": "email",
+            "subject": f"Unterlagen {company} — Ihr Schreiben vom {f.date()}",
+            "sender": f"{sender} <{f.email(sender)}>", "date": f.date(), "body": body, "pii": f.pii}
+
+
+# ==================== AUSGABE ====================
+
+def write_docx(spec, path):
+    from docx import Document
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = spec["header"]
+    for text in spec["paragraphs"]:
+        doc.add_paragraph(text)
+    if spec["table"]:
+        table = doc.add_table(rows=len(spec["table"]), cols=len(spec["table"][0]))
+        for r, row in enumerate(spec["table"]):
+            for c, value in enumerate(row):
+                table.cell(r, c).text = value
+    doc.save(path)
+
+
+def write_pdf(spec, path):
+    from file_converter import convert_text_to_pdf
+    lines = [spec["header"], ""]
+    for text in spec["paragraphs"]:
+        lines += [text, ""]
+    if spec["table"]:
+        lines += [" | ".join(row) for row in spec["table"]]
+    convert_text_to_pdf(lines, path)
+
+
+def document_texts(spec):
+    """Alle Texteinheiten eines Dokuments (wie sie in die Erkennung gehen)."""
+    if spec["kind"] == "email":
+        return [spec["subject"], spec["sender"], spec["body"]]
+    texts = [spec["header"]] + spec["paragraphs"]
+    if spec["table"]:
+        texts += [value for row in spec["table"] for value in row]
+    return texts
+
+
+def generate_corpus(out_dir, contracts=20, pleadings=20, emails=40, seed=42, pdf=True):
+    """
+    Erzeugt den Korpus in out_dir (docx/, pdf/, email/) und gibt das Manifest zurück.
+    Gleiche Parameter → identische Dokumente.
+    """
+    rng = random.Random(seed)
+    specs = ([make_contract(rng, i) for i in range(contracts)]
+             + [make_pleading(rng, i) for i in range(pleadings)]
+             + [make_email(rng, i) for i in range(emails)])
+
+    for sub in ("docx", "pdf", "email"):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+
+    manifest = {"seed": seed, "documents": []}
+    for spec in specs:
+        entry = {"id": spec["id"], "kind": spec["kind"], "pii": spec["pii"],
+                 "chars": sum(len(t) for t in document_texts(spec))}
+        if spec["kind"] == "email":
+            entry["email"] = os.path.join("email", spec["id"] + ".json")
+            with open(os.path.join(out_dir, entry["email"]), "w", encoding="utf-8") as f:
+                json.dump({key: spec[key] for key in ("subject", "sender", "date", "body")},
+                          f, ensure_ascii=False, indent=2)
+        else:
+            entry["docx"] = os.path.join("docx", spec["id"] + ".docx")
+            write_docx(spec, os.path.join(out_dir, entry["docx"]))
+            if pdf:
+                entry["pdf"] = os.path.join("pdf", spec["id"] + ".pdf")
+                write_pdf(spec, os.path.join(out_dir, entry["pdf"]))
+        entry["texts"] = document_texts(spec)
+        manifest["documents"].append(entry)
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetischen Benchmark-Korpus erzeugen")
+    parser.add_argument("--out", required=True, help="Zielordner")
+    parser.add_argument("--contracts", type=int, default=20)
+    parser.add_argument("--pleadings", type=int, default=20)
+    parser.add_argument("--emails", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-pdf", action="store_true", help="keine PDFs erzeugen")
+    args = parser.parse_args(argv)
+    manifest = generate_corpus(args.out, args.contracts, args.pleadings, args.emails,
+                               args.seed, pdf=not args.no_pdf)
+    print(f"{len(manifest['documents'])} Dokumente in {args.out} erzeugt.")
+
+
+if __name__ == "__main__":
+    main()
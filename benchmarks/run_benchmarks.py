@@ -0,0 +1,399 @@
+"""
+Benchmark der Schwärzungs-Pipeline auf einem synthetischen Korpus (siehe corpus.py).
+
+Gemessen wird pro Stufe Dauer, Durchsatz und Speicherzuwachs (RSS zu Beginn und
+höchster Anstieg währenddessen, abgetastet); für den ganzen Lauf die Spitzen-RSS:
+- regex:          Regex-Scanner über alle Texteinheiten
+- ner:<engine>:   NER pro Engine (ohne Cache, im eigenen Prozess), Ladezeit getrennt
+- text_full:      redact_text_full (Spans zusammensetzen + ersetzen, NER vorab berechnet)
+- docx_apply / docx_save:  Absätze, Tabellen, Kopf-/Fußzeilen schwärzen bzw. speichern
+- pdf_extract / pdf_locate / pdf_apply / pdf_save:
+                  Zeichen-Index, Fundstellen → Rechtecke, Schwärzen, Speichern
+- conversion:     DOCX → PDF über LibreOffice (nur wenn installiert)
+
+Das Ergebnis wird als JSON gespeichert; mit --compare wird es einem früheren Lauf
+gegenübergestellt.
+
+Aufruf (aus dem Projektordner):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --engines spacy --scale 3 --compare benchmarks/results/alt.json
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import warnings
+warnings.simplefilter("ignore", category=DeprecationWarning)
+
+from corpus import generate_corpus
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+# ==================== MESSUNG ====================
+
+def peak_rss_mb():
+    """Spitzen-RSS dieses Prozesses in MB (ru_maxrss: Linux KB, macOS Bytes) — wächst nur."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """Aktuelle RSS in MB (Linux: /proc/self/statm) oder None, wenn nicht verfügbar."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Tastet während einer Stufe die aktuelle RSS ab (ein Hintergrund-Thread).
+    Ergebnis: RSS zu Beginn und höchster Anstieg darüber — anders als ru_maxrss
+    auch für Stufen aussagekräftig, die nach einer speicherhungrigen laufen.
+    """
+
+    INTERVAL = 0.01
+
+    def __init__(self):
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.INTERVAL):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        if self.start_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start_mb is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return False
+
+    def result(self):
+        if self.start_mb is None:
+            return {}
+        return {"rss_start_mb": round(self.start_mb, 1),
+                "rss_peak_delta_mb": round(self.peak_mb - self.start_mb, 1)}
+
+
+class StageTimer:
+    """Sammelt die Ergebnisse aller Stufen."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, unit, fn, chars=None):
+        """
+        Führt fn() aus; fn gibt die Anzahl verarbeiteter Einheiten zurück oder
+        (Einheiten, {"chars": ..., "bytes": ...}) für erst dabei bekannte Mengen.
+        """
+        print(f"  {name}...", end="", flush=True)
+        with RssSampler() as rss:
+            started = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - started
+        items, amounts = result if isinstance(result, tuple) else (result, {})
+        if chars is not None:
+            amounts["chars"] = chars
+        entry = {
+            "seconds": round(seconds, 4),
+            "items": items,
+            "unit": unit,
+            "per_second": round(items / seconds, 2) if seconds > 0 else None,
+            **rss.result(),
+        }
+        if "chars" in amounts:
+            entry["chars"] = amounts["chars"]
+            entry["chars_per_second"] = round(amounts["chars"] / seconds) if seconds > 0 else None
+        if "bytes" in amounts:
+            entry["bytes"] = amounts["bytes"]
+            entry["mb_per_second"] = (round(amounts["bytes"] / seconds / 1024 / 1024, 2)
+                                      if seconds > 0 else None)
+        self.stages[name] = entry
+        print(f" {seconds:.3f}s ({entry['per_second']} {unit}/s)")
+        return entry
+
+    def skip(self, name, reason):
+        print(f"  {name}: übersprungen ({reason})")
+        self.stages[name] = {"skipped": reason}
+
+
+def available_engines():
+    """Engines, deren Pakete installiert sind (ohne sie zu laden)."""
+    engines = []
+    if importlib.util.find_spec("flair") is not None:
+        engines.append("flair")
+        if importlib.util.find_spec("torch") is not None:
+            engines.append("flair-int8")
+    if importlib.util.find_spec("spacy") is not None:
+        engines.append("spacy")
+    return engines
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ==================== BENCHMARK ====================
+
+def run_benchmarks(corpus_dir, engines, convert_limit=10):
+    import fitz
+    from docx import Document
+    import docx_redactor as dr
+    import pdf_redactor as pr
+    from ner_server import set_ner_server
+
+    # Reine Rechenzeit messen: kein Cache, kein NER-Server
+    dr.set_ner_cache(enabled=False)
+    set_ner_server(mode="off")
+
+    with open(os.path.join(corpus_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    documents = manifest["documents"]
+    docx_paths = [os.path.join(corpus_dir, d["docx"]) for d in documents if "docx" in d]
+    pdf_paths = [os.path.join(corpus_dir, d["pdf"]) for d in documents if "pdf" in d]
+
+    timer = StageTimer()
+    print(f"Korpus: {len(documents)} Dokumente ({len(docx_paths)} DOCX, {len(pdf_paths)} PDF)")
+
+    # --- Texteinheiten (DOCX-Absätze/Tabellen/Kopfzeilen, E-Mail-Felder) ---
+    docx_docs = [Document(path) for path in docx_paths]
+    texts = [t for doc in docx_docs for t in dr.docx_ner_inputs(doc)]
+    texts += [t for d in documents if d["kind"] == "email" for t in d["texts"]]
+    text_chars = sum(len(t) for t in texts)
+
+    # --- PDF: Zeichen-Index (Textextraktion) ---
+    pdf_docs = [fitz.open(path) for path in pdf_paths]
+    pages = [page for doc in pdf_docs for page in doc]
+    page_indices = []
+
+    def pdf_extract():
+        page_indices.extend(pr.PageTextIndex(page) for page in pages)
+        return len(pages), {"chars": sum(len(index.text) for index in page_indices)}
+
+    if pages:
+        timer.run("pdf_extract", "pages", pdf_extract)
+    page_texts = [index.text for index in page_indices]
+
+    # --- Regex ---
+    scanner = dr.get_regex_scanner()
+
+    def regex():
+        for t in texts + page_texts:
+            scanner.scan(t)
+        return len(texts) + len(page_texts)
+
+    timer.run("regex", "texts", regex, chars=text_chars + sum(len(t) for t in page_texts))
+
+    # --- NER pro Engine ---
+    ner_inputs = [t for t in dict.fromkeys(texts + page_texts) if t.strip()]
+    ner_chars = sum(len(t) for t in ner_inputs)
+    entities = None
+    ner_engine = None
+    for engine in engines:
+        dr.set_ner_engine(engine)
+        try:
+            timer.run(f"ner_load:{engine}", "engines", lambda: dr.warmup_ner_engine(engine) and 1)
+        except Exception as e:
+            timer.skip(f"ner:{engine}", f"Laden fehlgeschlagen: {e}")
+            continue
+        if dr.get_ner_engine() != engine:
+            timer.skip(f"ner:{engine}", f"nicht verfügbar, {dr.get_ner_engine()} geladen")
+            continue
+        result = {}
+
+        def ner(result=result):
+            result.update(zip(ner_inputs, dr.extract_entities_batch(ner_inputs)))
+            return len(ner_inputs)
+
+        timer.run(f"ner:{engine}", "texts", ner, chars=ner_chars)
+        if entities is None:
+            entities, ner_engine = result, engine
+    if entities is None:
+        # Ohne NER-Engine: die übrigen Stufen laufen nur mit Regex/Lernebene
+        entities = {t: [] for t in ner_inputs}
+    dr.store_prefetched_entities(entities)
+
+    # --- redact_text_full ---
+    mapper = dr.EntityMapper()
+    redacted = {}
+
+    def text_full():
+        for t in texts:
+            redacted[t] = dr.redact_text_full(t, mapper)
+        return len(texts)
+
+    timer.run("text_full", "texts", text_full, chars=text_chars)
+
+    # --- DOCX: schwärzen und speichern ---
+    def docx_apply():
+        paragraphs = 0
+        for doc in docx_docs:
+            for para in doc.paragraphs:
+                dr.redact_paragraph(para, mapper)
+                paragraphs += 1
+            dr.process_tables(doc, mapper)
+            dr.process_headers_and_footers(doc, mapper)
+            dr.process_footnotes(doc, mapper)
+        return paragraphs
+
+    def docx_save():
+        size = 0
+        for doc in docx_docs:
+            buffer = io.BytesIO()
+            doc.save(buffer)
+            size += buffer.tell()
+        return len(docx_docs), {"bytes": size}
+
+    if docx_docs:
+        timer.run("docx_apply", "paragraphs", docx_apply)
+        timer.run("docx_save", "documents", docx_save)
+
+    # --- PDF: Fundstellen → Rechtecke, schwärzen, speichern ---
+    page_rects = []
+
+    def pdf_locate():
+        for index in page_indices:
+            rects = []
+            if index.text.strip():
+                for start, end in pr._detect_page_spans(index.text, mapper):
+                    rects.extend(index.rects(start, end))
+            page_rects.append(rects)
+        return len(page_indices)
+
+    def pdf_apply():
+        for page, rects in zip(pages, page_rects):
+            pr._apply_page_redactions(page, rects)
+        return len(pages)
+
+    def pdf_save():
+        size = sum(len(doc.tobytes(garbage=3, deflate=True)) for doc in pdf_docs)
+        return len(pdf_docs), {"bytes": size}
+
+    if pages:
+        timer.run("pdf_locate", "pages", pdf_locate)
+        timer.run("pdf_apply", "pages", pdf_apply)
+        timer.run("pdf_save", "documents", pdf_save)
+    dr.clear_prefetched_entities()
+
+    # --- Konvertierung (LibreOffice) ---
+    from office_converter import find_soffice
+    if not convert_limit:
+        timer.skip("conversion", "abgeschaltet mit --convert 0")
+    elif not docx_paths:
+        timer.skip("conversion", "keine DOCX-Dateien")
+    elif not shutil.which(find_soffice()):
+        timer.skip("conversion", "LibreOffice nicht gefunden")
+    else:
+        from file_converter import convert_office_files
+        with tempfile.TemporaryDirectory() as out_dir:
+            jobs = [(path, os.path.join(out_dir, os.path.basename(path)[:-5] + ".pdf"), "pdf")
+                    for path in docx_paths[:convert_limit]]
+            timer.run("conversion", "documents", lambda: len(convert_office_files(jobs)))
+
+    # --- Qualität: wie viele bekannte personenbezogene Daten sind noch im Text? ---
+    total = found = 0
+    for d in documents:
+        if d["kind"] != "email":
+            continue
+        output = " ".join(redacted.get(t, t) for t in d["texts"])
+        for values in d["pii"].values():
+            for value in values:
+                total += 1
+                found += value not in output
+    pii = {"ner_engine": ner_engine, "known": total, "redacted": found,
+           "recall": round(found / total, 4) if total else None}
+
+    return {"stages": timer.stages, "pii_emails": pii, "peak_rss_mb": peak_rss_mb()}
+
+
+# ==================== VERGLEICH ====================
+
+def compare(current, baseline):
+    """Gibt pro Stufe den Durchsatz im Vergleich zu einem früheren Lauf aus."""
+    print(f"\nVergleich mit {baseline.get('commit') or '?'} ({baseline.get('timestamp')}):")
+    for name, entry in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or "per_second" not in entry or not old.get("per_second") or not entry["per_second"]:
+            continue
+        ratio = entry["per_second"] / old["per_second"]
+        print(f"  {name:<18} {old['per_second']:>12} → {entry['per_second']:>12} {entry['unit']}/s "
+              f"({ratio:.2f}x)")
+    print(f"  {'peak_rss_mb':<18} {baseline.get('peak_rss_mb')} → {current['peak_rss_mb']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Schwärzungs-Pipeline")
+    parser.add_argument("--corpus", help="vorhandener Korpus (sonst temporär erzeugt)")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Korpusgröße: 20 Verträge, 20 Schriftsätze, 40 E-Mails pro Stufe")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engines", nargs="*", default=None,
+                        help="NER-Engines (Standard: alle installierten)")
+    parser.add_argument("--convert", type=int, default=10,
+                        help="so viele DOCX für den Konvertierungs-Benchmark (0 = aus)")
+    parser.add_argument("--output", help="JSON-Datei (Standard: benchmarks/results/bench-<Zeit>.json)")
+    parser.add_argument("--compare", help="früheres Ergebnis (JSON) zum Vergleich")
+    args = parser.parse_args(argv)
+
+    engines = available_engines() if args.engines is None else args.engines
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus
+        if not corpus_dir:
+            corpus_dir = os.path.join(tmp, "corpus")
+            generate_corpus(corpus_dir, 20 * args.scale, 20 * args.scale, 40 * args.scale, args.seed)
+        result = run_benchmarks(corpus_dir, engines, args.convert)
+
+    result.update({
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "corpus": {"path": args.corpus, "scale": args.scale, "seed": args.seed},
+        "engines": engines,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    })
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nPeak RSS: {result['peak_rss_mb']} MB — Ergebnis: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
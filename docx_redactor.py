@@ -2,7 +2,15 @@ from docx import Document
 import re
 import json
 import os
-from llm_api import redact_text_api
+import hashlib
+import sqlite3
+from bisect import bisect_left, bisect_right
+from llm_api import redact_texts_api
+from text_matcher import AhoCorasick
+from text_segmenter import segment_text, map_entities, SEGMENTER_VERSION
+from result_cache import SQLiteCache
+from ner_server import get_ner_client
+from tracing import span
 
 # ==================== LERNEBENE ====================
 # Persistente Korrekturliste: Begriffe die immer/nie geschwärzt werden sollen
@@ -19,9 +27,39 @@ _learned_data = {
 }
 
 
+# Kompilierte Lookup-Strukturen (werden bei jeder Änderung neu aufgebaut):
+# Set für exakte "nie schwärzen"-Prüfungen, Aho-Corasick-Automat für die
+# Suche aller "immer schwärzen"-Begriffe in einem Durchlauf.
+_never_redact_set = frozenset()
+_always_redact_matcher = AhoCorasick()
+
+
+def _compile_learned_entities():
+    """Baut Set und Automat aus der gelernten Liste neu auf."""
+    global _never_redact_set, _always_redact_matcher
+    _never_redact_set = frozenset(t.strip() for t in _learned_data.get("never_redact", []))
+    terms = {}
+    for label, label_terms in _learned_data.get("always_redact", {}).items():
+        for term in label_terms:
+            terms.setdefault(term, label)
+    _always_redact_matcher = AhoCorasick(terms)
+
+
+# Änderungszeit der zuletzt geladenen Dateien (siehe refresh_learned_entities)
+_loaded_mtimes = {}
+
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 def load_learned_entities():
     """Lädt die gelernte Entity-Liste aus der JSON-Datei."""
     global _learned_data
+    _loaded_mtimes[LEARNED_ENTITIES_FILE] = _file_mtime(LEARNED_ENTITIES_FILE)
     if os.path.exists(LEARNED_ENTITIES_FILE):
         try:
             with open(LEARNED_ENTITIES_FILE, "r", encoding="utf-8") as f:
@@ -29,6 +67,7 @@ def load_learned_entities():
             print(f"  Gelernte Entities geladen: {LEARNED_ENTITIES_FILE}")
         except Exception as e:
             print(f"  Warnung: Konnte gelernte Entities nicht laden: {e}")
+    _compile_learned_entities()
 
 
 def save_learned_entities():
@@ -36,6 +75,7 @@ def save_learned_entities():
     try:
         with open(LEARNED_ENTITIES_FILE, "w", encoding="utf-8") as f:
             json.dump(_learned_data, f, ensure_ascii=False, indent=2)
+        _loaded_mtimes[LEARNED_ENTITIES_FILE] = _file_mtime(LEARNED_ENTITIES_FILE)
     except Exception as e:
         print(f"  Warnung: Konnte gelernte Entities nicht speichern: {e}")
 
@@ -43,8 +83,9 @@ def save_learned_entities():
 def add_never_redact(text):
     """Fügt einen Begriff zur 'nie schwärzen'-Liste hinzu."""
     text = text.strip()
-    if text and text not in _learned_data["never_redact"]:
+    if text and text not in _never_redact_set:
         _learned_data["never_redact"].append(text)
+        _compile_learned_entities()
         save_learned_entities()
 
 
@@ -53,6 +94,7 @@ def remove_never_redact(text):
     text = text.strip()
     if text in _learned_data["never_redact"]:
         _learned_data["never_redact"].remove(text)
+        _compile_learned_entities()
         save_learned_entities()
 
 
@@ -63,6 +105,7 @@ def add_always_redact(text, label="PER"):
         _learned_data["always_redact"][label] = []
     if text and text not in _learned_data["always_redact"][label]:
         _learned_data["always_redact"][label].append(text)
+        _compile_learned_entities()
         save_learned_entities()
 
 
@@ -71,12 +114,22 @@ def remove_always_redact(text, label="PER"):
     text = text.strip()
     if label in _learned_data["always_redact"] and text in _learned_data["always_redact"][label]:
         _learned_data["always_redact"][label].remove(text)
+        _compile_learned_entities()
         save_learned_entities()
 
 
 def is_learned_never_redact(text):
     """Prüft ob ein Begriff auf der 'nie schwärzen'-Liste steht."""
-    return text.strip() in _learned_data["never_redact"]
+    return text.strip() in _never_redact_set
+
+
+def find_always_redact(text):
+    """
+    Findet alle Vorkommen gelernter 'immer schwärzen'-Begriffe in einem Durchlauf.
+    Gibt nicht überlappende Treffer als (start, end, begriff, label) zurück.
+    """
+    return [(start, end, text[start:end], label)
+            for start, end, label in _always_redact_matcher.find_longest(text)]
 
 
 def get_learned_always_redact():
@@ -92,95 +145,229 @@ def get_learned_data():
 # Beim Import laden
 load_learned_entities()
 
-# ==================== NER-ENGINE LADEN ====================
-# Unterstützte Engines: "flair" (Standard, genauer) und "spacy" (schneller, optional)
+# ==================== NER-ENGINE (LAZY) ====================
+# Unterstützte Engines: "flair" (Standard, genauer), "flair-int8" (dieselben Modelle
+# int8-quantisiert für die CPU, siehe ner_quantize.py) und "spacy" (schneller, optional)
+# Die Modelle werden NICHT beim Import geladen, sondern erst beim ersten
+# extract_entities()-Aufruf, der sie braucht — oder explizit per warmup_ner_engine().
+# Damit zahlt z.B. ein reiner Regex-Lauf oder ein spaCy-Lauf nicht für torch/Flair.
+# Läuft ein NER-Server (ner_server.py) mit derselben Engine, werden die Modelle gar
+# nicht lokal geladen — extract_entities schickt die Texte dann an den Server.
 
-_nlp_engine = None
-_nlp_engine_name = None
+_nlp_engine = "flair"
 _flair_tagger_legal = None
 _flair_tagger_large = None
+_flair_quantized = False  # True, wenn die geladenen Tagger die int8-Variante sind
 _spacy_nlp = None
+# Engines, deren Laden in diesem Prozess gescheitert ist — sie werden nicht erneut
+# versucht, warmup_ner_engine() nimmt direkt spaCy
+_failed_engines = set()
 
+FLAIR_ENGINES = ("flair", "flair-int8")
 
-def load_flair_models():
-    """Lädt die Flair NER-Modelle (legal + large)."""
-    global _flair_tagger_legal, _flair_tagger_large, _nlp_engine, _nlp_engine_name
-    from flair.models import SequenceTagger
+
+def load_flair_models(quantized=False):
+    """Lädt die Flair NER-Modelle (legal + large), optional int8-quantisiert."""
+    global _flair_tagger_legal, _flair_tagger_large, _flair_quantized, _nlp_engine
+    if quantized:
+        from ner_quantize import load_quantized_tagger as load_tagger
+    else:
+        from flair.models import SequenceTagger
+        load_tagger = SequenceTagger.load
+    suffix = " (int8)" if quantized else ""
 
     try:
-        _flair_tagger_legal = SequenceTagger.load("flair/ner-german-legal")
-        print("  Flair-Modell geladen: ner-german-legal")
+        _flair_tagger_legal = load_tagger("flair/ner-german-legal")
+        print(f"  Flair-Modell geladen: ner-german-legal{suffix}")
     except Exception as e:
         print(f"  Warnung: ner-german-legal konnte nicht geladen werden: {e}")
         _flair_tagger_legal = None
 
     try:
-        _flair_tagger_large = SequenceTagger.load("flair/ner-german-large")
-        print("  Flair-Modell geladen: ner-german-large")
+        _flair_tagger_large = load_tagger("flair/ner-german-large")
+        print(f"  Flair-Modell geladen: ner-german-large{suffix}")
     except Exception as e:
         print(f"  Warnung: ner-german-large konnte nicht geladen werden: {e}")
         _flair_tagger_large = None
 
+    _flair_quantized = quantized
     if _flair_tagger_legal or _flair_tagger_large:
-        _nlp_engine = "flair"
-        _nlp_engine_name = "Flair (legal + large)"
+        _nlp_engine = "flair-int8" if quantized else "flair"
     else:
         print("  Keine Flair-Modelle verfügbar, falle auf spaCy zurück.")
         load_spacy_model()
 
 
+# Für die Schwärzung wird nur doc.ents gebraucht — Parser, Lemmatizer, Tagger usw.
+# werden gar nicht erst geladen (spart Ladezeit, Speicher und Rechenzeit pro Text).
+SPACY_EXCLUDED_COMPONENTS = ["tagger", "morphologizer", "parser", "lemmatizer",
+                             "attribute_ruler", "senter"]
+
+# nlp.pipe()-Parameter für die Batch-Verarbeitung
+SPACY_BATCH_SIZE = 64
+SPACY_N_PROCESS = 1
+
+
+def _load_spacy_pipeline(model_name):
+    """Lädt ein spaCy-Modell nur mit den für NER nötigen Komponenten."""
+    import spacy
+    nlp = spacy.load(model_name, exclude=SPACY_EXCLUDED_COMPONENTS)
+    # Eigener tok2vec wird nur gebraucht, wenn der NER-Teil ihn als Listener nutzt
+    if "tok2vec" in nlp.pipe_names:
+        try:
+            if not nlp.get_pipe("tok2vec").listening_components:
+                nlp.disable_pipe("tok2vec")
+        except AttributeError:
+            pass
+    return nlp
+
+
 def load_spacy_model():
     """Lädt das spaCy-Modell als Fallback oder schnelle Alternative."""
-    global _spacy_nlp, _nlp_engine, _nlp_engine_name
-    import spacy
+    global _spacy_nlp, _nlp_engine
     try:
-        _spacy_nlp = spacy.load("de_core_news_lg")
+        _spacy_nlp = _load_spacy_pipeline("de_core_news_lg")
         print("  spaCy-Modell geladen: de_core_news_lg")
     except OSError:
         try:
-            _spacy_nlp = spacy.load("de_core_news_md")
+            _spacy_nlp = _load_spacy_pipeline("de_core_news_md")
             print("  spaCy-Modell geladen: de_core_news_md")
         except OSError:
-            _spacy_nlp = spacy.load("de_core_news_sm")
+            _spacy_nlp = _load_spacy_pipeline("de_core_news_sm")
             print("  spaCy-Modell geladen: de_core_news_sm (Qualität eingeschränkt)")
+    print(f"  spaCy-Pipeline: {', '.join(_spacy_nlp.pipe_names)}")
     _nlp_engine = "spacy"
-    _nlp_engine_name = "spaCy"
+
+
+def set_spacy_pipe_options(batch_size=None, n_process=None):
+    """
+    Stellt die Batch-Parameter für nlp.pipe() ein.
+    n_process > 1 verteilt große Batches auf mehrere Prozesse.
+    """
+    global SPACY_BATCH_SIZE, SPACY_N_PROCESS
+    if batch_size:
+        SPACY_BATCH_SIZE = batch_size
+    if n_process:
+        SPACY_N_PROCESS = n_process
+
+
+# Registry der verfügbaren Engines: Anzeigename, Lader, Lade-Status und geschätzter
+# Speicherbedarf der geladenen Modelle pro Prozess (MB)
+NER_ENGINES = {
+    "flair": {
+        "name": "Flair (legal + large)",
+        "load": load_flair_models,
+        "is_loaded": lambda: _flair_loaded(quantized=False),
+        "memory_mb": 3000,
+    },
+    "flair-int8": {
+        "name": "Flair int8 (legal + large, CPU-optimiert)",
+        "load": lambda: load_flair_models(quantized=True),
+        "is_loaded": lambda: _flair_loaded(quantized=True),
+        "memory_mb": 1200,
+    },
+    "spacy": {
+        "name": "spaCy",
+        "load": load_spacy_model,
+        "is_loaded": lambda: _spacy_nlp is not None,
+        "memory_mb": 800,
+    },
+}
+
+# Speicher eines Worker-Prozesses ohne Modelle (Interpreter, python-docx, fitz; MB)
+WORKER_BASE_MEMORY_MB = 300
+
+
+def _flair_loaded(quantized):
+    if _flair_tagger_legal is None and _flair_tagger_large is None:
+        return False
+    return _flair_quantized == quantized
+
+
+def warmup_ner_engine(engine=None):
+    """
+    Lädt die NER-Modelle vorab (z.B. beim Start der Web-App oder vor einem Batch),
+    damit der erste Aufruf von extract_entities nicht die Ladezeit trägt.
+    engine: "flair", "flair-int8", "spacy" oder None (= aktive Engine)
+    Gibt den Namen der tatsächlich geladenen Engine zurück.
+    """
+    global _nlp_engine
+    # Über set_ner_engine: ein unbekannter Name wird gemeldet, die aktive Engine bleibt
+    if engine is not None and engine != _nlp_engine:
+        set_ner_engine(engine)
+    if NER_ENGINES[_nlp_engine]["is_loaded"]() or _use_ner_server():
+        return get_engine_name()
+    if _nlp_engine in _failed_engines:
+        # z.B. setzt die Pipeline pro Job wieder "flair" — der Fallback wird nur einmal bezahlt
+        _nlp_engine = "spacy"
+        if NER_ENGINES["spacy"]["is_loaded"]():
+            return get_engine_name()
+
+    print("\nLade NER-Modelle...")
+    requested = _nlp_engine
+    if _nlp_engine in FLAIR_ENGINES:
+        try:
+            NER_ENGINES[_nlp_engine]["load"]()
+        except ImportError:
+            print("  Flair nicht installiert. Verwende spaCy.")
+            _nlp_engine = "spacy"
+        except Exception as e:
+            print(f"  Fehler beim Laden von Flair: {e}. Verwende spaCy.")
+            _nlp_engine = "spacy"
+    if _nlp_engine != requested:
+        _failed_engines.add(requested)
+    if not NER_ENGINES[_nlp_engine]["is_loaded"]():
+        NER_ENGINES[_nlp_engine]["load"]()
+    return get_engine_name()
 
 
 def set_ner_engine(engine="flair"):
     """
     Wählt die NER-Engine.
-    engine: "flair" (Standard, genauer) oder "spacy" (schneller)
+    engine: "flair" (Standard, genauer), "flair-int8" (quantisiert, schneller auf der CPU)
+            oder "spacy" (schneller)
+    Die Modelle werden erst bei der ersten Verwendung geladen (siehe warmup_ner_engine).
     """
     global _nlp_engine
-    if engine == "flair":
-        if _flair_tagger_legal is None and _flair_tagger_large is None:
-            load_flair_models()
-        else:
-            _nlp_engine = "flair"
-    elif engine == "spacy":
-        if _spacy_nlp is None:
-            load_spacy_model()
-        else:
-            _nlp_engine = "spacy"
+    if engine not in NER_ENGINES:
+        print(f"  Unbekannte NER-Engine '{engine}', behalte {_nlp_engine}.")
+        return
+    _nlp_engine = engine
     print(f"  NER-Engine: {_nlp_engine}")
 
 
+def get_ner_engine():
+    """Gibt den Schlüssel der aktiven NER-Engine zurück ("flair", "flair-int8" oder "spacy")."""
+    return _nlp_engine
+
+
 def get_engine_name():
     """Gibt den Namen der aktiven NER-Engine zurück."""
-    return _nlp_engine_name or "nicht geladen"
+    engine = NER_ENGINES[_nlp_engine]
+    if engine["is_loaded"]():
+        return engine["name"]
+    if _use_ner_server():
+        return f"{engine['name']} (NER-Server)"
+    return f"{engine['name']} (wird bei Bedarf geladen)"
 
 
-# Standard: Flair laden
-print("\nLade NER-Modelle...")
-try:
-    load_flair_models()
-except ImportError:
-    print("  Flair nicht installiert. Verwende spaCy.")
-    load_spacy_model()
-except Exception as e:
-    print(f"  Fehler beim Laden von Flair: {e}. Verwende spaCy.")
-    load_spacy_model()
+def worker_memory_mb():
+    """
+    Geschätzter Arbeitsspeicher eines Worker-Prozesses mit der aktiven Engine (MB).
+    Bedient ein NER-Server die Engine, laden die Worker keine eigenen Modelle.
+    """
+    client = get_ner_client()
+    if client is not None and client.serves(_nlp_engine):
+        return WORKER_BASE_MEMORY_MB
+    return WORKER_BASE_MEMORY_MB + NER_ENGINES[_nlp_engine]["memory_mb"]
+
+
+def _use_ner_server():
+    """True, wenn die Modelle nicht lokal geladen sind und ein NER-Server die aktive Engine bedient."""
+    if NER_ENGINES[_nlp_engine]["is_loaded"]():
+        return False
+    client = get_ner_client()
+    return client is not None and client.serves(_nlp_engine)
 
 
 # ==================== SENSITIVITÄTSSTUFEN ====================
@@ -259,19 +446,83 @@ COMMON_FALSE_POSITIVES = {
 }
 
 
+# Eigene Whitelist-Ergänzungen (z.B. tausende Behördennamen), optional:
+# {"ORG": [...], "LOC": [...], "MISC": [...], "FALSE_POSITIVES": [...]}
+CUSTOM_WHITELIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_whitelist.json")
+
+# Kompilierte Whitelist: frozensets für exakte Treffer, Aho-Corasick-Automat für
+# "enthält"-Prüfungen bei Organisationen. Wird nach jeder Änderung neu aufgebaut.
+_whitelist_exact = {}
+_false_positives = frozenset()
+_org_contains_matcher = AhoCorasick()
+
+
+def rebuild_whitelist():
+    """Kompiliert die Whitelist-Sets neu (nach Änderungen an WHITELIST_* / COMMON_FALSE_POSITIVES)."""
+    global _whitelist_exact, _false_positives, _org_contains_matcher
+    _whitelist_exact = {
+        "MISC": frozenset(WHITELIST_MISC),
+        "ORG": frozenset(WHITELIST_ORGS),
+        "LOC": frozenset(WHITELIST_LOCS),
+    }
+    _false_positives = frozenset(COMMON_FALSE_POSITIVES)
+    _org_contains_matcher = AhoCorasick(WHITELIST_ORGS)
+
+
+def load_custom_whitelist(path=None):
+    """Ergänzt die Whitelist um Begriffe aus einer JSON-Datei und kompiliert neu."""
+    path = path or CUSTOM_WHITELIST_FILE
+    _loaded_mtimes[path] = _file_mtime(path)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                custom = json.load(f)
+            WHITELIST_ORGS.update(t.strip() for t in custom.get("ORG", []) if t.strip())
+            WHITELIST_LOCS.update(t.strip() for t in custom.get("LOC", []) if t.strip())
+            WHITELIST_MISC.update(t.strip() for t in custom.get("MISC", []) if t.strip())
+            COMMON_FALSE_POSITIVES.update(t.strip() for t in custom.get("FALSE_POSITIVES", []) if t.strip())
+            print(f"  Eigene Whitelist geladen: {path}")
+        except Exception as e:
+            print(f"  Warnung: Konnte eigene Whitelist nicht laden: {e}")
+    rebuild_whitelist()
+
+
+# Nur die eingebauten Listen (ohne eigene Ergänzungen) für die Kaskade: deren
+# Entscheidung fließt in die gecachten Roh-Ergebnisse, darf also nicht von
+# Whitelist-Dateien abhängen (siehe _has_unexplained_names)
+_CASCADE_KNOWN_TERMS = frozenset(WHITELIST_MISC | WHITELIST_ORGS | WHITELIST_LOCS | COMMON_FALSE_POSITIVES)
+_cascade_org_matcher = AhoCorasick(WHITELIST_ORGS)
+_CASCADE_TERMS_HASH = hashlib.sha256("\n".join(sorted(_CASCADE_KNOWN_TERMS)).encode("utf-8")).hexdigest()[:8]
+
+# Beim Import kompilieren (inkl. eigener Ergänzungen, falls vorhanden)
+load_custom_whitelist()
+
+
+def refresh_learned_entities():
+    """
+    Lädt gelernte Entities und eigene Whitelist neu, falls die Dateien seit dem
+    letzten Laden geändert wurden — z.B. durch Korrekturen in der Web-App, während
+    ein langlebiger Worker-Prozess (Job-Queue, Daemon) die alten Listen hält.
+    """
+    if _file_mtime(LEARNED_ENTITIES_FILE) != _loaded_mtimes.get(LEARNED_ENTITIES_FILE):
+        load_learned_entities()
+    if _file_mtime(CUSTOM_WHITELIST_FILE) != _loaded_mtimes.get(CUSTOM_WHITELIST_FILE):
+        load_custom_whitelist()
+
+
 def is_whitelisted(entity_text, entity_label):
     """Prüft ob eine Entity auf der Whitelist steht."""
     text_clean = entity_text.strip()
-    if text_clean in WHITELIST_MISC:
+    if text_clean in _whitelist_exact["MISC"]:
         return True
     if entity_label == "ORG":
-        if text_clean in WHITELIST_ORGS:
+        if text_clean in _whitelist_exact["ORG"]:
+            return True
+        # Enthält einen Whitelist-Begriff (z.B. "Landesgericht für ZRS Wien")
+        if _org_contains_matcher.contains_any(text_clean):
             return True
-        for term in WHITELIST_ORGS:
-            if text_clean.startswith(term) or term in text_clean:
-                return True
     if entity_label == "LOC":
-        if text_clean in WHITELIST_LOCS:
+        if text_clean in _whitelist_exact["LOC"]:
             return True
     return False
 
@@ -290,7 +541,7 @@ def _should_skip_entity(ent_text, ent_label):
         return True
     if _is_grundbuch_fraction(text):
         return True
-    if text in COMMON_FALSE_POSITIVES:
+    if text in _false_positives:
         return True
     return False
 
@@ -361,33 +612,259 @@ def get_regex_patterns(sensitivity="standard"):
     return patterns
 
 
+# Backend für den Regex-Scanner: "re" (Standard) oder "regex" (Paket `regex`)
+REGEX_BACKEND = "re"
+
+# Grundbuch-Brüche (z.B. 128/542, 1/3) — werden von der Regex-Schwärzung ausgenommen
+FRACTION_PATTERN = re.compile(r'\b(\d{1,6}/\d{1,6})\b')
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+class RegexScanner:
+    """
+    Die Regex-Muster einer Sensitivitätsstufe, zu einer Alternation mit benannten
+    Gruppen (p0, p1, ...) kompiliert.
+
+    scan() läuft einmal von links nach rechts über den Text und liefert dieselben
+    Schwärzungen wie das Ersetzen Muster für Muster (pattern.sub nacheinander) —
+    als Spans auf dem Originaltext. Dort, wo die beiden sich unterscheiden
+    können, wird nachgeprüft:
+    - Vorrang: beginnt innerhalb eines Treffers ein Treffer eines früheren Musters,
+      gewinnt dieser (z.B. PLZ-ORT "2021 Max" vor E-MAIL "Max@example.com")
+    - Platzhaltergrenzen: direkt vor und hinter einem Treffer sehen spätere Muster
+      bei pattern.sub dessen Platzhalter statt des Originaltexts (wichtig für Wortgrenzen)
+    scan_all() liefert alle Treffer aller Muster (überlappend, für die PDF-Schwärzung).
+    """
+
+    # Platzhalter beginnen und enden mit einem Nicht-Wortzeichen
+    _BOUNDARY = "]"
+
+    def __init__(self, patterns, backend="re"):
+        module = re
+        if backend == "regex":
+            try:
+                import regex as module
+            except ImportError:
+                print("  Paket 'regex' nicht installiert, verwende 're'.")
+        self.patterns = [(pattern if module is re else module.compile(pattern.pattern, pattern.flags), replacement)
+                         for pattern, replacement in patterns]
+        self.replacements = [replacement for _, replacement in patterns]
+        indexed = [(i, pattern) for i, (pattern, _) in enumerate(self.patterns)]
+        self.combined = module.compile(self._alternation(indexed)) if indexed else None
+        # stronger[i]: alle Muster vor i (Vorrang), weaker[i]: alle Muster nach i
+        self.stronger = [module.compile(self._alternation(indexed[:i])) if i else None
+                         for i in range(len(indexed))]
+        self.weaker = [module.compile(self._alternation(indexed[i + 1:])) if i + 1 < len(indexed) else None
+                       for i in range(len(indexed))]
+        # Muster mit führendem \b können nur an Wortgrenzen beginnen
+        self.unanchored = [i for i, pattern in indexed if not pattern.pattern.startswith(r"\b")]
+        self.stronger_at_boundary = [not any(j < i for j in self.unanchored) for i in range(len(indexed))]
+        self._word_boundary = module.compile(r"\b")
+
+    @classmethod
+    def _alternation(cls, indexed):
+        """
+        Alternation der Muster als benannte Gruppen p<index>. Das führende \\b
+        aufeinanderfolgender Muster wird ausgeklammert — an Stellen ohne Wortgrenze
+        scheitert die Alternation dann mit einer Prüfung statt mit einer pro Muster.
+        """
+        parts, run = [], []
+        for i, pattern in indexed:
+            source = pattern.pattern
+            if source.startswith(r"\b"):
+                run.append(f"(?P<p{i}>{cls._scoped(pattern, source[2:])})")
+                continue
+            if run:
+                parts.append(r"\b(?:" + "|".join(run) + ")")
+                run = []
+            parts.append(f"(?P<p{i}>{cls._scoped(pattern, source)})")
+        if run:
+            parts.append(r"\b(?:" + "|".join(run) + ")")
+        return "|".join(parts)
+
+    @staticmethod
+    def _scoped(pattern, source):
+        """Musterquelle mit den Flags des Musters als lokale Flags (z.B. (?i:...))."""
+        letters = "".join(letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"),
+                                                      (re.DOTALL, "s"))
+                          if pattern.flags & flag)
+        return f"(?{letters}:{source})" if letters else source
+
+    @staticmethod
+    def _index(match):
+        return int(match.lastgroup[1:])
+
+    def _first_stronger(self, text, start, end, index, endpos):
+        """
+        Erster Treffer eines früheren Musters, der in (start, end] beginnt — auch direkt
+        am Ende: dessen Platzhalter begrenzt bei pattern.sub den schwächeren Treffer.
+        """
+        if not index:
+            return None
+        match_at = self.stronger[index].match
+        last = min(end, endpos - 1)
+        if self.stronger_at_boundary[index]:
+            candidates = (m.start() for m in self._word_boundary.finditer(text, start + 1, last + 1))
+        else:
+            candidates = range(start + 1, last + 1)
+        for pos in candidates:
+            m = match_at(text, pos, endpos)
+            if m is not None and m.end() > pos:
+                found = (pos, m.end(), self._index(m))
+                # Der kann seinerseits einen noch früheren Treffer enthalten
+                return self._first_stronger(text, pos, m.end(), found[2], endpos) or found
+        return None
+
+    def _weaker_after_placeholder(self, text, pos, endpos, index):
+        """
+        Treffer eines späteren Musters direkt hinter dem Platzhalter eines Treffers, der
+        auf ein Wortzeichen endet: gesucht wird wie bei pattern.sub hinter dem Platzhalter.
+        """
+        weaker = self.weaker[index]
+        if weaker is None:
+            return None
+        size = 64
+        while True:
+            window = self._BOUNDARY + text[pos:min(endpos, pos + size)]
+            m = weaker.match(window, 1)
+            # Reicht der Treffer bis ans Fensterende, könnte er länger sein
+            if m is None or m.end() < len(window) or pos + size >= endpos:
+                break
+            size *= 4
+        if m is None or m.end() == 1:
+            return None
+        return pos, pos + m.end() - 1, self._index(m)
+
+    def scan(self, text):
+        """Gibt alle Treffer als sortierte, überlappungsfreie Liste von (start, end, platzhalter) zurück."""
+        if self.combined is None:
+            return []
+        return [(start, end, self.replacements[index])
+                for start, end, index in self._scan(text, 0, len(text), None)]
+
+    def _next(self, text, pos, endpos, last_index):
+        """Nächster Treffer ab pos als (start, end, muster_index) oder None."""
+        m = self.combined.search(text, pos, endpos)
+        found = None if m is None else (m.start(), m.end(), self._index(m))
+        if last_index is None or pos >= endpos or not _is_word_char(text[pos - 1]):
+            return found
+        # Direkt hinter dem vorigen Treffer sehen spätere Muster dessen Platzhalter
+        if found is not None and found[0] == pos and found[2] > last_index:
+            found = self._weaker_after_placeholder(text, pos, endpos, last_index)
+            if found is None:
+                m = self.combined.search(text, pos + 1, endpos)
+                found = None if m is None else (m.start(), m.end(), self._index(m))
+        elif (found is None or found[0] > pos) and _is_word_char(text[pos]):
+            found = self._weaker_after_placeholder(text, pos, endpos, last_index) or found
+        return found
+
+    def _scan(self, text, pos, endpos, last_index):
+        spans = []
+        while True:
+            found = self._next(text, pos, endpos, last_index)
+            if found is None:
+                break
+            start, end, index = found
+            if start == end:
+                pos, last_index = end + 1, None
+                continue
+            stronger = self._first_stronger(text, start, end, index, endpos)
+            if stronger is not None:
+                start, end, index = stronger
+            if stronger is not None or (start > pos and _is_word_char(text[start - 1])):
+                # Vor dem Treffer sehen spätere Muster bei pattern.sub dessen Platzhalter:
+                # der Text davor wird mit dieser Grenze noch einmal durchsucht
+                spans.extend(span for span in self._scan(text, pos, start, last_index)
+                             if span[2] > index)
+            spans.append((start, end, index))
+            pos, last_index = end, index
+        return spans
+
+    def scan_all(self, text):
+        """
+        Alle Treffer aller Muster auf dem Originaltext als (start, end, platzhalter), auch
+        überlappend — dieselben wie pattern.finditer Muster für Muster. Ein Treffer eines
+        Musters mit führendem \\b beginnt dort, wo die Alternation einen Treffer findet,
+        oder an einer Wortgrenze innerhalb eines solchen: nur diese Stellen werden im
+        selben Durchlauf nachgeprüft. Muster, die mitten im Wort beginnen können
+        (GEBURTSDATUM), werden einzeln gesucht.
+        """
+        if self.combined is None:
+            return []
+        spans = []
+        free = [0] * len(self.patterns)  # pro Muster: Ende seines letzten Treffers
+        pos = 0
+        while True:
+            m = self.combined.search(text, pos)
+            if m is None:
+                break
+            start, end = m.start(), max(m.end(), m.start() + 1)
+            for boundary in self._word_boundary.finditer(text, start, end):
+                self._collect_at(text, boundary.start(), spans, free)
+            pos = end
+        for index in self.unanchored:
+            pattern, replacement = self.patterns[index]
+            spans.extend((m.start(), m.end(), replacement)
+                         for m in pattern.finditer(text) if m.end() > m.start())
+        return spans
+
+    def _collect_at(self, text, at, spans, free):
+        """Alle Muster mit führendem \\b, die an der Stelle at passen (in Musterreihenfolge)."""
+        alternation = self.combined
+        while alternation is not None:
+            m = alternation.match(text, at)
+            if m is None:
+                return
+            index = self._index(m)
+            if free[index] <= at and m.end() > at and index not in self.unanchored:
+                spans.append((at, m.end(), self.replacements[index]))
+                free[index] = m.end()
+            alternation = self.weaker[index]
+
+
 ACTIVE_REGEX_PATTERNS = get_regex_patterns("standard")
+ACTIVE_REGEX_SCANNER = RegexScanner(ACTIVE_REGEX_PATTERNS, REGEX_BACKEND)
+_active_sensitivity = "standard"
 
 
 def set_sensitivity(sensitivity):
-    global ACTIVE_REGEX_PATTERNS
+    global ACTIVE_REGEX_PATTERNS, ACTIVE_REGEX_SCANNER, _active_sensitivity
     ACTIVE_REGEX_PATTERNS = get_regex_patterns(sensitivity)
+    ACTIVE_REGEX_SCANNER = RegexScanner(ACTIVE_REGEX_PATTERNS, REGEX_BACKEND)
+    _active_sensitivity = sensitivity
 
 
-def redact_regex(text):
-    # Grundbuch-Brüche schützen (z.B. 128/542, 1/3) — temporär ersetzen
-    fraction_pattern = re.compile(r'\b(\d{1,6}/\d{1,6})\b')
-    fractions = {}
-    for i, match in enumerate(fraction_pattern.finditer(text)):
-        placeholder = f"__FRACTION_{i}__"
-        fractions[placeholder] = match.group()
-    for placeholder, original in fractions.items():
-        text = text.replace(original, placeholder, 1)
+def set_regex_backend(backend="re"):
+    """Wählt das Backend für den Regex-Scanner: "re" oder "regex"."""
+    global REGEX_BACKEND
+    REGEX_BACKEND = backend
+    set_sensitivity(_active_sensitivity)
+
+
+def get_active_regex_patterns():
+    """Gibt die Regex-Muster der aktuell gesetzten Sensitivität zurück."""
+    return ACTIVE_REGEX_PATTERNS
 
-    # Regex-Schwärzung anwenden
-    for pattern, replacement in ACTIVE_REGEX_PATTERNS:
-        text = pattern.sub(replacement, text)
 
-    # Brüche wiederherstellen
-    for placeholder, original in fractions.items():
-        text = text.replace(placeholder, original)
+def get_regex_scanner():
+    """Gibt den kombinierten Regex-Scanner der aktuellen Sensitivität zurück."""
+    return ACTIVE_REGEX_SCANNER
 
-    return text
+
+def scan_regex(text):
+    """
+    Alle Regex-Treffer im Text als (start, end, platzhalter), in einem Durchlauf.
+    Grundbuch-Brüche werden vorher längengleich maskiert — die Offsets bleiben gültig.
+    """
+    masked = FRACTION_PATTERN.sub(lambda m: "_" * len(m.group()), text)
+    return ACTIVE_REGEX_SCANNER.scan(masked)
+
+
+def redact_regex(text):
+    return apply_spans(text, scan_regex(text))
 
 
 # ==================== NER-ERKENNUNG ====================
@@ -422,69 +899,60 @@ FLAIR_STANDARD_TAG_MAP = {
 }
 
 
-def _extract_entities_flair(text, mapper):
-    """Extrahiert Entities mit Flair (legal + large Modell kombiniert)."""
-    from flair.data import Sentence
+# Anzahl Sätze pro Forward-Pass bei der Batch-Inferenz
+FLAIR_MINI_BATCH_SIZE = 32
 
-    entities = []
-    seen_spans = set()
-
-    # 1. Legal-Modell (spezialisiert auf Rechtstexte)
-    if _flair_tagger_legal:
-        sentence_legal = Sentence(text)
-        _flair_tagger_legal.predict(sentence_legal)
-
-        for entity in sentence_legal.get_spans("ner"):
-            tag = entity.get_label("ner").value
-            score = entity.get_label("ner").score
-            mapped_label = FLAIR_LEGAL_TAG_MAP.get(tag)
-
-            if mapped_label is None:
-                continue  # Gesetzesreferenzen etc. überspringen
-
-            span_key = (entity.start_position, entity.end_position)
-            if span_key not in seen_spans:
-                seen_spans.add(span_key)
-                entities.append({
-                    "start": entity.start_position,
-                    "end": entity.end_position,
-                    "text": entity.text,
-                    "label": mapped_label,
-                    "score": score,
-                    "source": "legal"
-                })
-
-    # 2. Large-Modell (allgemein stark, ergänzend)
-    if _flair_tagger_large:
-        sentence_large = Sentence(text)
-        _flair_tagger_large.predict(sentence_large)
-
-        for entity in sentence_large.get_spans("ner"):
-            tag = entity.get_label("ner").value
-            score = entity.get_label("ner").score
-            mapped_label = FLAIR_STANDARD_TAG_MAP.get(tag)
-
-            if mapped_label is None:
-                continue
 
-            span_key = (entity.start_position, entity.end_position)
-            if span_key not in seen_spans:
-                seen_spans.add(span_key)
-                entities.append({
-                    "start": entity.start_position,
-                    "end": entity.end_position,
-                    "text": entity.text,
-                    "label": mapped_label,
-                    "score": score,
-                    "source": "large"
-                })
+def _collect_flair_spans(sentence, label_name, tag_map, source, entities, seen_spans):
+    """Übernimmt die vorhergesagten Spans eines Modells in die Entity-Liste."""
+    for entity in sentence.get_spans(label_name):
+        label = entity.get_label(label_name)
+        mapped_label = tag_map.get(label.value)
 
-    return entities
+        if mapped_label is None:
+            continue  # Gesetzesreferenzen, MISC etc. überspringen
+
+        span_key = (entity.start_position, entity.end_position)
+        if span_key not in seen_spans:
+            seen_spans.add(span_key)
+            entities.append({
+                "start": entity.start_position,
+                "end": entity.end_position,
+                "text": entity.text,
+                "label": mapped_label,
+                "score": label.score,
+                "source": source
+            })
 
 
-def _extract_entities_spacy(text, mapper):
-    """Extrahiert Entities mit spaCy (schnellere Alternative)."""
-    doc = _spacy_nlp(text)
+def _extract_entities_flair_batch(texts):
+    """
+    Extrahiert Entities für viele Texte mit Flair (legal + large Modell kombiniert).
+    Jeder Text wird nur einmal tokenisiert; pro Modell gibt es genau einen
+    predict()-Aufruf über alle Sätze (nach Länge sortiert, in Mini-Batches).
+    Gibt pro Eingabetext eine Entity-Liste zurück (gleiche Reihenfolge).
+    """
+    from flair.data import Sentence
+
+    sentences = [Sentence(text) for text in texts]
+    pairs = [(sentence, text) for sentence, text in zip(sentences, texts) if len(sentence) > 0]
+    if pairs:
+        _run_flair_models(pairs)
+
+    results = []
+    for sentence in sentences:
+        entities = []
+        seen_spans = set()
+        if _flair_tagger_legal:
+            _collect_flair_spans(sentence, "ner-legal", FLAIR_LEGAL_TAG_MAP, "legal", entities, seen_spans)
+        if _flair_tagger_large:
+            _collect_flair_spans(sentence, "ner-large", FLAIR_STANDARD_TAG_MAP, "large", entities, seen_spans)
+        results.append(entities)
+    return results
+
+
+def _spacy_doc_entities(doc):
+    """Wandelt die Entities eines spaCy-Docs in unser Entity-Format um."""
     entities = []
     for ent in doc.ents:
         if ent.label_ in ("PER", "ORG", "LOC"):
@@ -509,180 +977,846 @@ def _extract_entities_spacy(text, mapper):
     return entities
 
 
-def extract_entities(text, mapper):
-    """Extrahiert Entities mit der aktiven NER-Engine."""
-    if _nlp_engine == "flair":
-        return _extract_entities_flair(text, mapper)
-    else:
-        return _extract_entities_spacy(text, mapper)
+def _extract_entities_spacy_batch(texts):
+    """
+    Extrahiert Entities für viele Texte per nlp.pipe() (Streaming in Batches).
+    Die Docs kommen in Eingabereihenfolge zurück, die Offsets beziehen sich
+    jeweils auf den Originaltext.
+    """
+    docs = _spacy_nlp.pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS)
+    return [_spacy_doc_entities(doc) for doc in docs]
 
 
-def redact_ner(text, mapper):
+# ==================== KASKADE (FLAIR) ====================
+# Im Kaskaden-Modus läuft zunächst nur ein Modell (Standard: legal) über alle Sätze.
+# Das zweite Modell läuft nur auf Sätzen, in denen das erste unsichere Treffer
+# geliefert hat oder namensartige Wörter (Titel + Name, mehrere großgeschriebene
+# Wörter in Folge, Firmenzusätze) ohne Treffer geblieben sind.
+
+FLAIR_CASCADE = {
+    "enabled": os.getenv("NER_CASCADE", "0") == "1",
+    "first": "legal",        # zuerst laufendes Modell: "legal" oder "large"
+    "min_score": 0.90,       # Treffer darunter gelten als unsicher → zweites Modell
+    "check_names": True,     # unerklärte namensartige Wörter → zweites Modell
+}
+
+# Zähler (pro Prozess; batch_executor sammelt die Zähler der Worker ein)
+_cascade_stats = {"sentences": 0, "second_model": 0, "low_confidence": 0,
+                  "unexplained_names": 0, "skipped": 0}
+
+# Artikel, Pronomen usw. am Satzanfang sind großgeschrieben, aber keine Namen
+_CASCADE_STOPWORDS = (
+    "Der|Die|Das|Dem|Den|Des|Ein|Eine|Einem|Einen|Einer|Eines|Im|Am|Zum|Zur|Vom|Beim|"
+    "Er|Sie|Es|Wir|Ihr|Ich|Dieser|Diese|Dieses|Jeder|Jede|Jedes|Mit|Gemäß|Nach|Für|"
+    "Auf|In|An|Von|Bei|Aus|Zu|Und|Oder|Aber|Wenn|Dass|Da|So"
+)
+_CASCADE_NAME_PATTERNS = (
+    # Titel/Anrede + Name
+    ("title", re.compile(r'\b(?:Herrn?|Frau|Dr\.|Prof\.|Mag\.|RAin?|Notar(?:in)?|'
+                         r'Rechtsanwält(?:in)?|Rechtsanwalt)\s+([A-ZÄÖÜ][\w-]+)')),
+    # Zwei oder mehr großgeschriebene Wörter in Folge (z.B. "Max Mustermann")
+    ("sequence", re.compile(r'\b(?!(?:' + _CASCADE_STOPWORDS + r')\b)'
+                            r'([A-ZÄÖÜ][a-zäöüß]+(?:-[A-ZÄÖÜ][a-zäöüß]+)?'
+                            r'(?:\s+[A-ZÄÖÜ][a-zäöüß]+(?:-[A-ZÄÖÜ][a-zäöüß]+)?)+)')),
+    # Firmenzusätze
+    ("company", re.compile(r'\b(GmbH|AG|KG|OHG|UG|SE|mbH|e\.\s?V\.)(?!\w)')),
+)
+
+
+def set_flair_cascade(enabled=None, first=None, min_score=None, check_names=None):
     """
-    Erkennt PER, ORG und LOC-Entities und ersetzt sie mit konsistenten Platzhaltern.
-    Berücksichtigt Whitelist, Confidence-Threshold und False-Positive-Heuristiken.
+    Konfiguriert den Kaskaden-Modus für Flair.
+    enabled: Kaskade an/aus (aus = beide Modelle auf allen Sätzen)
+    first: "legal" oder "large" — welches Modell immer läuft
+    min_score: Treffer des ersten Modells unter diesem Score lösen das zweite aus
+    check_names: unerklärte namensartige Wörter lösen das zweite aus
     """
-    if not text or not text.strip():
-        return text
+    if enabled is not None:
+        FLAIR_CASCADE["enabled"] = enabled
+    if first in ("legal", "large"):
+        FLAIR_CASCADE["first"] = first
+    if min_score is not None:
+        FLAIR_CASCADE["min_score"] = min_score
+    if check_names is not None:
+        FLAIR_CASCADE["check_names"] = check_names
+
+
+def get_cascade_stats():
+    """Zähler der Kaskade: Sätze, Läufe des zweiten Modells (nach Grund) und übersprungene."""
+    return dict(_cascade_stats)
+
+
+def reset_cascade_stats():
+    for key in _cascade_stats:
+        _cascade_stats[key] = 0
+
+
+def add_cascade_stats(stats):
+    """Addiert Zähler aus einem anderen Prozess (z.B. Worker eines Batches)."""
+    for key, value in (stats or {}).items():
+        if key in _cascade_stats:
+            _cascade_stats[key] += value
+
+
+def _cascade_signature():
+    """Teil der Cache-Signatur: die Kaskade ändert die Ergebnisse."""
+    if not FLAIR_CASCADE["enabled"] or not (_flair_tagger_legal and _flair_tagger_large):
+        return ""
+    return (f"|cascade:{FLAIR_CASCADE['first']}:{FLAIR_CASCADE['min_score']}:"
+            f"{int(FLAIR_CASCADE['check_names'])}:{_CASCADE_TERMS_HASH}")
+
+
+def _has_unexplained_names(text, covered):
+    """
+    True, wenn ein namensartiger Ausschnitt von keinem Treffer des ersten Modells abgedeckt ist.
+    Bekannte Begriffe zählen nur aus den eingebauten Listen — eigene Whitelist und
+    gelernte Entities filtern erst später (_should_redact_entity), sonst hinge der
+    NER-Cache von ihnen ab.
+    """
+    for kind, pattern in _CASCADE_NAME_PATTERNS:
+        for match in pattern.finditer(text):
+            start, end = match.span(1)
+            if any(s < end and start < e for s, e in covered):
+                continue
+            candidate = match.group(1)
+            if kind == "sequence" and (candidate in _CASCADE_KNOWN_TERMS
+                                       or _cascade_org_matcher.contains_any(candidate)):
+                continue
+            return True
+    return False
+
+
+def _cascade_reason(text, sentence, label_name):
+    """Grund, das zweite Modell auf diesem Satz laufen zu lassen, oder None."""
+    covered = []
+    for span in sentence.get_spans(label_name):
+        if span.get_label(label_name).score < FLAIR_CASCADE["min_score"]:
+            return "low_confidence"
+        covered.append((span.start_position, span.end_position))
+    if FLAIR_CASCADE["check_names"] and _has_unexplained_names(text, covered):
+        return "unexplained_names"
+    return None
+
+
+def _run_flair_models(pairs):
+    """
+    Lässt die Flair-Modelle über die (Satz, Text)-Paare laufen — beide auf allen
+    Sätzen oder, im Kaskaden-Modus, das zweite nur auf den Sätzen, die es brauchen.
+    """
+    # Nach Länge sortiert → Mini-Batches aus ähnlich langen Sätzen, wenig Padding
+    by_length = sorted(pairs, key=lambda pair: len(pair[0]))
+    sentences = [sentence for sentence, _ in by_length]
+    models = [(_flair_tagger_legal, "ner-legal"), (_flair_tagger_large, "ner-large")]
+    if FLAIR_CASCADE["first"] == "large":
+        models.reverse()
+    (first, first_label), (second, second_label) = models
+
+    if not FLAIR_CASCADE["enabled"] or not (first and second):
+        # 1. Legal-Modell (spezialisiert auf Rechtstexte), 2. Large-Modell (ergänzend)
+        for tagger, label_name in ((_flair_tagger_legal, "ner-legal"), (_flair_tagger_large, "ner-large")):
+            if tagger:
+                tagger.predict(sentences, mini_batch_size=FLAIR_MINI_BATCH_SIZE, label_name=label_name)
+        return
+
+    first.predict(sentences, mini_batch_size=FLAIR_MINI_BATCH_SIZE, label_name=first_label)
+    needs_second = []
+    for sentence, text in by_length:
+        reason = _cascade_reason(text, sentence, first_label)
+        if reason:
+            _cascade_stats[reason] += 1
+            needs_second.append(sentence)
+    _cascade_stats["sentences"] += len(by_length)
+    _cascade_stats["second_model"] += len(needs_second)
+    _cascade_stats["skipped"] += len(by_length) - len(needs_second)
+    if needs_second:
+        second.predict(needs_second, mini_batch_size=FLAIR_MINI_BATCH_SIZE, label_name=second_label)
+
+
+# ==================== SEGMENTIERUNG ====================
+# Die Texte gehen nicht am Stück ins Modell, sondern als Sätze bzw. begrenzte
+# Fenster (siehe text_segmenter.py). Gleiche Sätze in verschiedenen Texten werden
+# nur einmal gerechnet; die Offsets werden auf den Quelltext zurückgerechnet.
+
+NER_SEGMENTATION = {
+    "enabled": True,
+    "max_chars": 1000,   # längere Sätze werden in Fenster geteilt
+    "overlap": 100,      # Überlappung der Fenster (Zeichen)
+}
+
+
+def set_ner_segmentation(enabled=None, max_chars=None, overlap=None):
+    """Konfiguriert die Segmentierung der NER-Eingaben (an/aus, Fenstergröße, Überlappung)."""
+    if enabled is not None:
+        NER_SEGMENTATION["enabled"] = enabled
+    if max_chars:
+        NER_SEGMENTATION["max_chars"] = max_chars
+    if overlap is not None:
+        NER_SEGMENTATION["overlap"] = overlap
+
+
+def _segmentation_signature():
+    """Teil der Cache-Signatur: andere Segmentierung → andere Ergebnisse."""
+    if not NER_SEGMENTATION["enabled"]:
+        return ""
+    return f"|seg{SEGMENTER_VERSION}:{NER_SEGMENTATION['max_chars']}:{NER_SEGMENTATION['overlap']}"
+
+
+def get_ner_config():
+    """Kaskaden- und Segmentierungs-Einstellungen (gehen mit jeder Anfrage an den NER-Server)."""
+    return {"cascade": dict(FLAIR_CASCADE), "segmentation": dict(NER_SEGMENTATION)}
+
+
+def set_ner_config(config):
+    """Übernimmt Einstellungen aus get_ner_config() (z.B. im NER-Server pro Anfrage)."""
+    set_flair_cascade(**config.get("cascade", {}))
+    set_ner_segmentation(**config.get("segmentation", {}))
 
-    entities = extract_entities(text, mapper)
 
-    # Nach Position sortieren (rückwärts) für sichere Ersetzung
-    entities.sort(key=lambda x: x["start"], reverse=True)
+def get_worker_settings():
+    """
+    Einstellungen dieses Prozesses für neu gestartete Worker-Prozesse — per
+    forkserver/spawn gestartete Worker erben nichts (siehe apply_worker_settings).
+    """
+    import ner_server
+    return {
+        "engine": _nlp_engine,
+        "sensitivity": _active_sensitivity,
+        "regex_backend": REGEX_BACKEND,
+        "ner": get_ner_config(),
+        "cache": {"enabled": NER_CACHE_ENABLED, "path": NER_CACHE_FILE,
+                  "max_entries": NER_CACHE_MAX_ENTRIES, "max_bytes": NER_CACHE_MAX_BYTES},
+        "server": {"mode": ner_server.NER_SERVER_MODE, "socket_path": ner_server.NER_SERVER_SOCKET},
+        "spacy": {"batch_size": SPACY_BATCH_SIZE, "n_process": SPACY_N_PROCESS},
+    }
+
+
+def apply_worker_settings(settings):
+    """Übernimmt get_worker_settings() im Worker (Initializer) und lädt gelernte Entities nach."""
+    global REGEX_BACKEND
+    import ner_server
+    if _nlp_engine != settings["engine"]:
+        set_ner_engine(settings["engine"])
+    REGEX_BACKEND = settings["regex_backend"]
+    set_sensitivity(settings["sensitivity"])
+    set_ner_config(settings["ner"])
+    set_ner_cache(**settings["cache"])
+    ner_server.set_ner_server(**settings["server"])
+    set_spacy_pipe_options(**settings["spacy"])
+    refresh_learned_entities()
+
+
+def _run_segmented(texts, run_engine):
+    """Führt run_engine auf den Segmenten aller Texte aus und setzt die Ergebnisse pro Text zusammen."""
+    segments = [segment_text(text, NER_SEGMENTATION["max_chars"], NER_SEGMENTATION["overlap"])
+                for text in texts]
+    pieces = list(dict.fromkeys(text[seg.start:seg.end]
+                                for text, text_segments in zip(texts, segments)
+                                for seg in text_segments))
+    piece_entities = dict(zip(pieces, run_engine(pieces))) if pieces else {}
+
+    results = []
+    for text, text_segments in zip(texts, segments):
+        entities = []
+        for seg in text_segments:
+            entities.extend(map_entities(piece_entities[text[seg.start:seg.end]], seg))
+        results.append(entities)
+    return results
+
+
+# ==================== NER-CACHE ====================
+# Briefköpfe, Signaturen, Standardklauseln, Fußzeilen und AGB-Seiten wiederholen
+# sich über Dokumente und Läufe hinweg. Die rohen NER-Ergebnisse (mit Scores, vor
+# Whitelist/Confidence-Filter) werden deshalb in einer SQLite-Datei gespeichert.
+# Schlüssel: Hash über normalisierten Text + Engine + Modellversion.
+# Gespeichert werden nur Offsets, Label, Score und Quelle — der Entity-Text wird
+# beim Treffer aus dem aktuellen Text geschnitten (kein Klartext im Cache).
+
+NER_CACHE_ENABLED = True
+NER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ner_cache.sqlite3")
+NER_CACHE_MAX_ENTRIES = 200_000
+NER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Bei Änderungen am gespeicherten Format oder an der Nachbearbeitung erhöhen
+NER_CACHE_FORMAT = 1
+
+# Normalisierung Zeichen für Zeichen (gleiche Länge → Offsets bleiben gültig)
+_NER_CACHE_NORMALIZE = str.maketrans({
+    "\t": " ", "\r": "\n", "\xa0": " ", "\u2007": " ", "\u2009": " ", "\u202f": " ",
+})
+
+_ner_cache = None
+
+
+def get_ner_cache():
+    """Gibt den NER-Cache zurück (wird beim ersten Zugriff geöffnet) oder None, wenn deaktiviert."""
+    global _ner_cache
+    if not NER_CACHE_ENABLED:
+        return None
+    if _ner_cache is None:
+        _ner_cache = SQLiteCache(NER_CACHE_FILE, max_entries=NER_CACHE_MAX_ENTRIES,
+                                 max_bytes=NER_CACHE_MAX_BYTES)
+    return _ner_cache
+
+
+def set_ner_cache(enabled=None, path=None, max_entries=None, max_bytes=None):
+    """
+    Konfiguriert den NER-Cache (an/aus, Datei, Limits).
+    Der Cache wird beim nächsten Zugriff mit den neuen Einstellungen geöffnet.
+    """
+    global NER_CACHE_ENABLED, NER_CACHE_FILE, NER_CACHE_MAX_ENTRIES, NER_CACHE_MAX_BYTES, _ner_cache
+    if enabled is not None:
+        NER_CACHE_ENABLED = enabled
+    if path:
+        NER_CACHE_FILE = path
+    if max_entries:
+        NER_CACHE_MAX_ENTRIES = max_entries
+    if max_bytes:
+        NER_CACHE_MAX_BYTES = max_bytes
+    _ner_cache = None
+
+
+def get_ner_cache_stats():
+    """Treffer/Fehlschläge und Größe des NER-Caches (None, wenn deaktiviert)."""
+    cache = get_ner_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.stats()
+    except sqlite3.Error:
+        return None
+
+
+def _disable_ner_cache(error):
+    """Schaltet den Cache für diesen Prozess ab (z.B. Datei gesperrt oder nicht beschreibbar)."""
+    global NER_CACHE_ENABLED
+    print(f"  Warnung: NER-Cache deaktiviert: {error}")
+    NER_CACHE_ENABLED = False
+
+
+def _ner_model_signature():
+    """Engine und Modellversion — ändert sich eins davon, gelten alte Einträge nicht mehr."""
+    if _nlp_engine in FLAIR_ENGINES:
+        import flair
+        models = []
+        if _flair_tagger_legal:
+            models.append("ner-german-legal")
+        if _flair_tagger_large:
+            models.append("ner-german-large")
+        version = getattr(flair, '__version__', '?')
+        if _flair_quantized:
+            import torch
+            version += f"-int8-torch-{torch.__version__}"
+        return f"flair-{version}:{'+'.join(models)}{_cascade_signature()}{_segmentation_signature()}"
+    import spacy
+    meta = _spacy_nlp.meta
+    return (f"spacy-{spacy.__version__}:{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}"
+            f"{_segmentation_signature()}")
+
+
+def _ner_cache_key(text, signature):
+    normalized = text.translate(_NER_CACHE_NORMALIZE)
+    payload = f"{NER_CACHE_FORMAT}|{signature}|{normalized}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-    redacted = text
+
+def _entities_to_cache(text, entities):
+    """Kompakte Form für den Cache; der Entity-Text nur, falls er vom Textausschnitt abweicht."""
+    entries = []
     for ent in entities:
-        ent_text = ent["text"]
-        ent_label = ent["label"]
-        score = ent["score"]
+        start, end = ent["start"], ent["end"]
+        own_text = ent["text"] if ent["text"] != text[start:end] else None
+        entries.append([start, end, ent["label"], ent["score"], ent["source"], own_text])
+    return entries
 
-        # 0. Gelernt: NIE schwärzen
-        if is_learned_never_redact(ent_text):
-            mapper.skipped_whitelist.append((ent_text, ent_label))
-            continue
 
-        # 1. Whitelist
-        if is_whitelisted(ent_text, ent_label):
-            mapper.skipped_whitelist.append((ent_text, ent_label))
-            continue
+def _entities_from_cache(text, entries):
+    return [{
+        "start": start,
+        "end": end,
+        "text": own_text if own_text is not None else text[start:end],
+        "label": label,
+        "score": score,
+        "source": source
+    } for start, end, label, score, source, own_text in entries]
 
-        # 2. Juristische Personen bei konservativ nicht schwärzen
-        if ent_label == "ORG" and mapper.sensitivity == "konservativ":
-            mapper.skipped_org_juristic.append((ent_text, ent_label))
-            continue
 
-        # 3. Confidence
-        if score < mapper.confidence_threshold:
-            mapper.skipped_low_confidence.append((ent_text, ent_label, score))
-            continue
+# Vorab im Batch berechnete Entities (Text → Entity-Liste), siehe prefetch_entities()
+_prefetched_entities = {}
 
-        # 4. False-Positive-Heuristik
-        if _should_skip_entity(ent_text, ent_label):
-            continue
 
-        placeholder = mapper.get_placeholder(ent_text, ent_label)
+def _run_ner_batch(texts):
+    """Führt die aktive NER-Engine auf allen Texten aus (ohne Cache, segmentiert)."""
+    if _nlp_engine in FLAIR_ENGINES:
+        run_engine = _extract_entities_flair_batch
+    else:
+        run_engine = _extract_entities_spacy_batch
+    with span(f"ner.{_nlp_engine}", texts=len(texts), chars=sum(len(t) for t in texts)):
+        if not NER_SEGMENTATION["enabled"]:
+            return run_engine(texts)
+        return _run_segmented(texts, run_engine)
+
+
+def extract_entities_batch(texts, mapper=None):
+    """
+    Extrahiert Entities für viele Texte auf einmal (Rückgabe in derselben Reihenfolge).
+    Bereits bekannte Texte kommen aus dem NER-Cache; nur der Rest läuft durch das
+    Modell — bei Flair mit einem predict()-Aufruf pro Modell statt einem pro Text.
+    Läuft ein NER-Server, übernimmt er die ganze Anfrage (inkl. Cache) — mit den
+    Kaskaden- und Segmentierungs-Einstellungen dieses Prozesses.
+    """
+    if _use_ner_server():
+        with span("ner.server", texts=len(texts)):
+            remote = get_ner_client().extract(texts, _nlp_engine, get_ner_config())
+        if remote is not None:
+            entities, cascade_stats = remote
+            add_cascade_stats(cascade_stats)
+            return entities
+    warmup_ner_engine()
+    cache = get_ner_cache()
+    if cache is None:
+        return _run_ner_batch(texts)
+
+    signature = _ner_model_signature()
+    keys = [_ner_cache_key(text, signature) for text in texts]
+    try:
+        with span("ner.cache", texts=len(texts)):
+            cached = cache.get_many(keys)
+    except sqlite3.Error as e:
+        _disable_ner_cache(e)
+        return _run_ner_batch(texts)
+
+    # Fehlende Texte (pro Schlüssel nur einmal) durch das Modell schicken
+    missing = {}
+    for text, key in zip(texts, keys):
+        if key not in cached and key not in missing:
+            missing[key] = text
+    if missing:
+        computed = _run_ner_batch(list(missing.values()))
+        new_entries = {key: _entities_to_cache(text, entities)
+                       for (key, text), entities in zip(missing.items(), computed)}
+        cached.update(new_entries)
+        try:
+            cache.put_many(new_entries)
+        except sqlite3.Error as e:
+            _disable_ner_cache(e)
+
+    return [_entities_from_cache(text, cached[key]) for text, key in zip(texts, keys)]
+
+
+def detect_entities_for_texts(texts, mapper=None):
+    """
+    Berechnet die Entities für mehrere Texte in einem Batch und gibt sie als
+    Dict Text → Entity-Liste zurück (z.B. um sie aus einem Worker-Prozess zu liefern).
+    """
+    pending = [t for t in dict.fromkeys(texts) if t and t.strip()]
+    if not pending:
+        return {}
+    return dict(zip(pending, extract_entities_batch(pending, mapper)))
+
+
+def store_prefetched_entities(entities_by_text):
+    """Übernimmt bereits berechnete Entities (Text → Entity-Liste) in den Prefetch-Speicher."""
+    _prefetched_entities.update(entities_by_text)
+
+
+def prefetch_entities(texts, mapper=None):
+    """
+    Führt die NER für alle Text-Einheiten eines Dokuments (Absätze, Tabellenzellen,
+    Kopf-/Fußzeilen, PDF-Seiten, E-Mail-Felder) in einem Batch aus.
+    Spätere extract_entities()-Aufrufe für dieselben Texte nutzen das Ergebnis,
+    bis clear_prefetched_entities() aufgerufen wird.
+    """
+    pending = [t for t in texts if t not in _prefetched_entities]
+    store_prefetched_entities(detect_entities_for_texts(pending, mapper))
+
+
+def clear_prefetched_entities():
+    """Verwirft die vorab berechneten Entities (nach Abschluss eines Dokuments)."""
+    _prefetched_entities.clear()
+
+
+def extract_entities(text, mapper):
+    """Extrahiert Entities mit der aktiven NER-Engine (lädt die Modelle bei Bedarf)."""
+    if text in _prefetched_entities:
+        return [dict(ent) for ent in _prefetched_entities[text]]
+    return extract_entities_batch([text], mapper)[0]
+
+
+def _should_redact_entity(ent, mapper):
+    """
+    Entscheidet ob eine erkannte Entity geschwärzt wird (Lernebene, Whitelist,
+    juristische Personen, Confidence, Heuristik). Übersprungene Entities werden
+    im Mapper protokolliert.
+    """
+    ent_text = ent["text"]
+    ent_label = ent["label"]
+    score = ent["score"]
+
+    # 0. Gelernt: NIE schwärzen
+    if is_learned_never_redact(ent_text):
+        mapper.skipped_whitelist.append((ent_text, ent_label))
+        return False
+
+    # 1. Whitelist
+    if is_whitelisted(ent_text, ent_label):
+        mapper.skipped_whitelist.append((ent_text, ent_label))
+        return False
+
+    # 2. Juristische Personen bei konservativ nicht schwärzen
+    if ent_label == "ORG" and mapper.sensitivity == "konservativ":
+        mapper.skipped_org_juristic.append((ent_text, ent_label))
+        return False
+
+    # 3. Confidence
+    if score < mapper.confidence_threshold:
+        mapper.skipped_low_confidence.append((ent_text, ent_label, score))
+        return False
+
+    # 4. False-Positive-Heuristik
+    if _should_skip_entity(ent_text, ent_label):
+        return False
+
+    return True
+
+
+# ==================== SPAN-BASIERTE SCHWÄRZUNG ====================
+# Alle Detektoren (Regex, NER, "immer schwärzen") liefern Zeichen-Spans auf dem
+# ORIGINALtext. Der SpanComposer löst Überschneidungen und geschützte Bereiche
+# (Grundbuch-Brüche) auf und baut den Ausgabetext in einem einzigen Durchgang.
+# Die NER läuft damit genau einmal pro Text — und nie auf teilweise geschwärztem
+# Text. Die Spans lassen sich außerdem auf die Runs eines DOCX-Absatzes abbilden.
+
+class SpanComposer:
+    """
+    Sammelt Schwärzungs-Spans auf einem Text. Früher hinzugefügte Spans haben
+    Vorrang: ein neuer Span, der einen vorhandenen oder einen geschützten Bereich
+    überschneidet, wird verworfen. Überlappungsprüfung per Binärsuche.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._starts = []
+        self._spans = []  # (start, end, platzhalter) — platzhalter None = geschützt
+
+    def is_free(self, start, end):
+        """True, wenn [start, end) keinen vorhandenen Span überschneidet."""
+        i = bisect_right(self._starts, start)
+        if i > 0 and self._spans[i - 1][1] > start:
+            return False
+        if i < len(self._starts) and self._starts[i] < end:
+            return False
+        return True
+
+    def _insert(self, start, end, replacement):
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._spans.insert(i, (start, end, replacement))
+
+    def protect(self, start, end):
+        """Markiert einen Bereich als geschützt (wird nie geschwärzt)."""
+        if start < end and self.is_free(start, end):
+            self._insert(start, end, None)
+
+    def add(self, start, end, replacement):
+        """Fügt einen Span hinzu, falls der Bereich frei ist. Gibt True bei Erfolg zurück."""
+        if start >= end or not self.is_free(start, end):
+            return False
+        self._insert(start, end, replacement)
+        return True
+
+    def spans(self):
+        """Die zu schwärzenden Spans, sortiert und überlappungsfrei."""
+        return [span for span in self._spans if span[2] is not None]
+
+    def compose(self):
+        """Baut den geschwärzten Text in einem Durchgang."""
+        return apply_spans(self.text, self.spans())
+
+
+def _protect_fractions(composer):
+    for match in FRACTION_PATTERN.finditer(composer.text):
+        composer.protect(match.start(), match.end())
+
+
+def _add_regex_spans(composer):
+    for start, end, replacement in scan_regex(composer.text):
+        composer.add(start, end, replacement)
+
+
+def _add_ner_spans(composer, mapper):
+    entities = sorted(extract_entities(composer.text, mapper), key=lambda x: x["start"])
+    for ent in entities:
+        # Bereits durch Regex/Schutz belegte Bereiche sieht die NER-Stufe nicht
+        if not composer.is_free(ent["start"], ent["end"]):
+            continue
+        if not _should_redact_entity(ent, mapper):
+            continue
+        placeholder = mapper.get_placeholder(ent["text"], ent["label"])
         if placeholder:
-            redacted = redacted[:ent["start"]] + placeholder + redacted[ent["end"]:]
+            composer.add(ent["start"], ent["end"], placeholder)
 
-    return redacted
+
+def _add_always_redact_spans(composer, mapper):
+    # Ein Durchlauf über den Automaten der gelernten Begriffe
+    for start, end, term, label in find_always_redact(composer.text):
+        if composer.is_free(start, end):
+            placeholder = mapper.get_placeholder(term, label)
+            if placeholder:
+                composer.add(start, end, placeholder)
+
+
+def collect_redaction_spans(text, mapper):
+    """
+    Sammelt alle zu schwärzenden Bereiche im Originaltext.
+    Gibt eine sortierte, überlappungsfreie Liste von (start, end, platzhalter) zurück.
+    Vorrang: geschützte Brüche, dann Regex, dann NER, dann gelernte "immer schwärzen"-Begriffe.
+    """
+    if not text or not text.strip():
+        return []
+    composer = SpanComposer(text)
+    _protect_fractions(composer)
+    _add_regex_spans(composer)
+    _add_ner_spans(composer, mapper)
+    _add_always_redact_spans(composer, mapper)
+    return composer.spans()
+
+
+def redact_ner(text, mapper):
+    """
+    Erkennt PER, ORG und LOC-Entities und ersetzt sie mit konsistenten Platzhaltern.
+    Berücksichtigt Whitelist, Confidence-Threshold und False-Positive-Heuristiken.
+    """
+    if not text or not text.strip():
+        return text
+    composer = SpanComposer(text)
+    _add_ner_spans(composer, mapper)
+    return composer.compose()
 
 
 def _apply_always_redact(text, mapper):
     """Wendet die 'immer schwärzen'-Liste an — unabhängig von NER."""
-    always = get_learned_always_redact()
-    for label, terms in always.items():
-        for term in terms:
-            if term in text:
-                placeholder = mapper.get_placeholder(term, label)
-                if placeholder:
-                    text = text.replace(term, placeholder)
-    return text
+    composer = SpanComposer(text)
+    _add_always_redact_spans(composer, mapper)
+    return composer.compose()
 
 
 def redact_text_full(text, mapper):
-    """Wendet zuerst Regex, dann NER, dann gelernte 'immer schwärzen' an."""
-    text = redact_regex(text)
-    text = redact_ner(text, mapper)
-    text = _apply_always_redact(text, mapper)
-    return text
+    """
+    Wendet Regex, NER und gelernte 'immer schwärzen'-Begriffe an — alle Detektoren
+    auf dem Originaltext, Ausgabe in einem Durchgang.
+    """
+    if not text or not text.strip():
+        return text
+    with span("text.redact", chars=len(text)):
+        return apply_spans(text, collect_redaction_spans(text, mapper))
+
+
+def text_ner_inputs(texts):
+    """Die Texte, die redact_text_full() für die gegebenen Texte an die NER gibt."""
+    return [t for t in texts if t and t.strip()]
+
+
+def redact_texts(texts, mapper):
+    """
+    Schwärzt mehrere zusammengehörige Texte (z.B. Betreff, Absender und Text einer
+    E-Mail) mit einem gemeinsamen NER-Batch. Rückgabe in derselben Reihenfolge.
+    """
+    prefetch_entities(text_ner_inputs(texts), mapper)
+    try:
+        return [redact_text_full(t, mapper) for t in texts]
+    finally:
+        clear_prefetched_entities()
+
+
+def apply_spans(text, spans):
+    """Setzt die Platzhalter in einem Durchgang in den Text ein."""
+    pieces = []
+    pos = 0
+    for start, end, replacement in spans:
+        pieces.append(text[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+def _apply_spans_to_runs(run_texts, spans):
+    """
+    Verteilt die Spans auf die Runs eines Absatzes (Run-Offset-Map).
+    Der Platzhalter landet im Run, in dem der Span beginnt; die übrigen vom Span
+    überdeckten Zeichen werden aus den Folge-Runs entfernt. Runs ohne Treffer
+    bleiben unverändert — die Formatierung bleibt erhalten.
+    """
+    full_text = "".join(run_texts)
+    new_texts = []
+    span_idx = 0
+    run_start = 0
+    covered_until = 0  # Ende des zuletzt begonnenen Spans
+    for run_text in run_texts:
+        run_end = run_start + len(run_text)
+        pieces = []
+        pos = max(run_start, min(covered_until, run_end))
+        while span_idx < len(spans) and spans[span_idx][0] < run_end:
+            start, end, replacement = spans[span_idx]
+            pieces.append(full_text[pos:start])
+            pieces.append(replacement)
+            covered_until = end
+            pos = min(end, run_end)
+            span_idx += 1
+        pieces.append(full_text[pos:run_end])
+        new_texts.append("".join(pieces))
+        run_start = run_end
+    return new_texts
 
 
 # ==================== DOCX-VERARBEITUNG ====================
 
-def redact_paragraph(para, mapper):
-    full_text = para.text
-    if not full_text or not full_text.strip():
-        return
+def _paragraph_run_text(para):
+    """Text eines Absatzes, wie er sich aus seinen Runs zusammensetzt."""
+    return "".join(r.text for r in para.runs)
 
-    redacted_full = redact_text_full(full_text, mapper)
-    if redacted_full == full_text:
-        return
 
+def redact_paragraph(para, mapper):
     runs = para.runs
     if len(runs) == 0:
         return
-    if len(runs) == 1:
-        runs[0].text = redacted_full
+    run_texts = [r.text for r in runs]
+    full_text = "".join(run_texts)
+    if not full_text.strip():
+        return
+
+    # Eine Erkennung für den ganzen Absatz — auch Entities über Run-Grenzen hinweg
+    spans = collect_redaction_spans(full_text, mapper)
+    if not spans:
         return
 
-    for r in runs:
-        if r.text and r.text.strip():
-            r.text = redact_text_full(r.text, mapper)
+    for run, old_text, new_text in zip(runs, run_texts, _apply_spans_to_runs(run_texts, spans)):
+        if new_text != old_text:
+            run.text = new_text
 
 
-def process_tables(doc, mapper):
+def _table_paragraphs(doc):
     for table in doc.tables:
         for row in table.rows:
             for cell in row.cells:
                 for para in cell.paragraphs:
-                    redact_paragraph(para, mapper)
+                    yield para
 
 
-def process_headers_and_footers(doc, mapper):
+# Alle Kopf-/Fußzeilen-Varianten eines Abschnitts (Standard, erste Seite, gerade Seiten)
+HEADER_FOOTER_ATTRS = ("header", "first_page_header", "even_page_header",
+                       "footer", "first_page_footer", "even_page_footer")
+
+
+def _header_footer_paragraphs(doc):
+    """
+    Absätze aller Kopf- und Fußzeilen — jeder Header/Footer-Part genau einmal.
+    Mit dem vorigen Abschnitt verknüpfte Kopfzeilen haben keinen eigenen Part
+    (und würden beim Zugriff sonst den Part des Vorgängers erneut liefern);
+    Abschnitte, die denselben Part referenzieren, werden per partname erkannt.
+    """
+    seen_parts = set()
     for section in doc.sections:
-        for para in section.header.paragraphs:
-            redact_paragraph(para, mapper)
-        for para in section.footer.paragraphs:
-            redact_paragraph(para, mapper)
+        for attr in HEADER_FOOTER_ATTRS:
+            header_footer = getattr(section, attr)
+            if header_footer.is_linked_to_previous:
+                continue
+            partname = header_footer.part.partname
+            if partname in seen_parts:
+                continue
+            seen_parts.add(partname)
+            yield from header_footer.paragraphs
 
 
-def process_footnotes(doc, mapper):
+def _footnote_paragraphs(doc):
     if hasattr(doc, "footnotes"):
         try:
             for footnote in doc.footnotes.part.document.paragraphs:
-                redact_paragraph(footnote, mapper)
+                yield footnote
         except Exception:
             pass
 
 
-def process_docx(file_path, output_path, mapper=None):
-    if mapper is None:
-        mapper = EntityMapper()
+def iter_docx_paragraphs(doc):
+    """Alle Absätze eines Dokuments: Fließtext, Tabellen, Kopf-/Fußzeilen, Fußnoten."""
+    yield from doc.paragraphs
+    yield from _table_paragraphs(doc)
+    yield from _header_footer_paragraphs(doc)
+    yield from _footnote_paragraphs(doc)
 
-    doc = Document(file_path)
 
-    for para in doc.paragraphs:
+def docx_ner_inputs(doc):
+    """Die Texte aller Absätze, die bei process_docx() an die NER gehen."""
+    return [_paragraph_run_text(para) for para in iter_docx_paragraphs(doc)]
+
+
+def process_tables(doc, mapper):
+    for para in _table_paragraphs(doc):
         redact_paragraph(para, mapper)
 
-    process_tables(doc, mapper)
-    process_headers_and_footers(doc, mapper)
-    process_footnotes(doc, mapper)
 
-    doc.save(output_path)
+def process_headers_and_footers(doc, mapper):
+    for para in _header_footer_paragraphs(doc):
+        redact_paragraph(para, mapper)
+
+
+def process_footnotes(doc, mapper):
+    for para in _footnote_paragraphs(doc):
+        redact_paragraph(para, mapper)
+
+
+def process_docx(file_path, output_path, mapper=None):
+    if mapper is None:
+        mapper = EntityMapper()
+
+    with span("docx.load", bytes=os.path.getsize(file_path)):
+        doc = Document(file_path)
+
+    # NER für alle Absätze des Dokuments in einem Batch vorab berechnen
+    ner_inputs = docx_ner_inputs(doc)
+    with span("docx.ner", paragraphs=len(ner_inputs)):
+        prefetch_entities(ner_inputs, mapper)
+    try:
+        with span("docx.redact", paragraphs=len(ner_inputs)):
+            for para in doc.paragraphs:
+                redact_paragraph(para, mapper)
+
+            process_tables(doc, mapper)
+            process_headers_and_footers(doc, mapper)
+            process_footnotes(doc, mapper)
+    finally:
+        clear_prefetched_entities()
+
+    with span("docx.save") as save_span:
+        doc.save(output_path)
+        save_span.add(bytes=os.path.getsize(output_path))
     print(f"DOCX erfolgreich geschwärzt: {output_path}")
     return mapper
 
 
+def _set_paragraph_text_api(para, redacted):
+    """Schreibt das API-Ergebnis in den ersten Run und leert die übrigen."""
+    if para.runs:
+        para.runs[0].text = redacted
+        for r in para.runs[1:]:
+            r.text = ""
+    else:
+        para.text = redacted
+
+
 def process_docx_api(file_path, output_path):
     doc = Document(file_path)
 
-    for para in doc.paragraphs:
-        if para.text and para.text.strip():
-            redacted = redact_text_api(para.text)
-            if len(para.runs) == 1:
-                para.runs[0].text = redacted
-            elif len(para.runs) > 1:
-                para.runs[0].text = redacted
-                for r in para.runs[1:]:
-                    r.text = ""
-            else:
-                para.text = redacted
+    # Alle Absätze (Fließtext + Tabellen) sammeln und gleichzeitig an die API schicken
+    paragraphs = [para for para in list(doc.paragraphs) + list(_table_paragraphs(doc))
+                  if para.text and para.text.strip()]
+    redacted_texts = redact_texts_api([para.text for para in paragraphs])
 
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    if para.text and para.text.strip():
-                        redacted = redact_text_api(para.text)
-                        if len(para.runs) >= 1:
-                            para.runs[0].text = redacted
-                            for r in para.runs[1:]:
-                                r.text = ""
+    for para, redacted in zip(paragraphs, redacted_texts):
+        _set_paragraph_text_api(para, redacted)
 
     doc.save(output_path)
     print(f"API-basierte Redaktion abgeschlossen: {output_path}")
 
-
 if __name__ == '__main__':
     input_file = 'input.docx'
     output_file = 'output_redacted.docx'
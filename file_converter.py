@@ -3,9 +3,9 @@
 import os
 import unicodedata
 import re
-from docx2pdf import convert
 from docx import Document
-import subprocess
+from office_converter import get_conversion_service, ConversionError
+from tracing import span
 
 import warnings
 warnings.simplefilter("ignore", category=DeprecationWarning)
@@ -17,47 +17,51 @@ def normalize_filename(filename):
     return only_ascii
 
 def convert_docx_to_pdf(input_file, output_file):
+    """Konvertiert DOCX (oder DOC) nach PDF über den LibreOffice-Konvertierungsdienst."""
     try:
-        # Stelle sicher, dass LibreOffice gefunden wird
-        libreoffice_path = "/Applications/LibreOffice.app/Contents/MacOS/soffice"  # macOS-Pfad
-        if not os.path.exists(libreoffice_path):
-            libreoffice_path = "soffice"  # Falls LibreOffice über PATH verfügbar ist
-
         print(f"🔄 Konvertiere mit LibreOffice: {input_file} → {output_file}")
+        with span("convert.office", documents=1, bytes=os.path.getsize(input_file)):
+            get_conversion_service().convert(input_file, output_file, "pdf")
+        print(f"✅ In PDF umgewandelt: {output_file}")
+    except ConversionError as e:
+        print(f"❌ LibreOffice Fehler: {e}")
+    except Exception as e:
+        print(f"❌ Fehler bei der Umwandlung von DOCX zu PDF: {e}")
 
-        # Lege den Zielordner fest
-        output_folder = os.path.dirname(output_file)
-
-        # Starte LibreOffice headless-Modus zur Konvertierung mit explizitem `--outdir`
-        result = subprocess.run([
-            libreoffice_path, "--headless", "--convert-to", "pdf", "--outdir", output_folder, input_file
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        # Debugging-Ausgabe für Fehleranalyse
-        print("📄 LibreOffice Output:", result.stdout.decode())
 
-        if result.stderr:
-            print("⚠️ LibreOffice Fehler:", result.stderr.decode())  # Nur anzeigen, wenn Fehler vorhanden sind
+def convert_doc_to_pdf(input_doc, output_pdf):
+    """Konvertiert DOC direkt nach PDF (ein Schritt, ohne Zwischen-DOCX)."""
+    convert_docx_to_pdf(input_doc, output_pdf)
 
-        # Überprüfe, ob die Datei tatsächlich im angegebenen Ordner existiert
-        converted_pdf = os.path.join(output_folder, os.path.splitext(os.path.basename(input_file))[0] + ".pdf")
 
-        if os.path.exists(converted_pdf):
-            print(f"✅ DOCX erfolgreich in PDF umgewandelt: {converted_pdf}")
+def convert_office_files(jobs):
+    """
+    Konvertiert mehrere Dateien gemeinsam (verteilt auf die warmen LibreOffice-Instanzen).
+    jobs: Liste von (Eingabepfad, Ausgabepfad, Zielformat "pdf"/"docx")
+    Gibt die Liste der erfolgreich erzeugten Ausgabepfade zurück.
+    """
+    if not jobs:
+        return []
+    print(f"🔄 Konvertiere {len(jobs)} Datei(en) mit LibreOffice...")
+    created = []
+    with span("convert.office", documents=len(jobs)):
+        errors = get_conversion_service().convert_many(jobs)
+    for (input_file, output_file, _), error in zip(jobs, errors):
+        if error is None and os.path.exists(output_file):
+            created.append(output_file)
         else:
-            print(f"❌ Konvertierung abgeschlossen, aber {converted_pdf} wurde nicht gefunden.")
+            print(f"❌ Konvertierung fehlgeschlagen: {input_file} ({error or 'keine Ausgabe'})")
+    return created
+
 
-    except subprocess.CalledProcessError as e:
-        print(f"❌ LibreOffice Fehler: {e}")
-    except Exception as e:
-        print(f"❌ Fehler bei der Umwandlung von DOCX zu PDF: {e}")
 def extract_msg_text(input_file):
     """
     Extrahiert den Text aus einer MSG-Datei und gibt ihn strukturiert zurück.
     Gibt ein Dict zurück: {"sender": ..., "date": ..., "subject": ..., "body": ...}
     """
     import extract_msg
-    msg = extract_msg.Message(input_file)
+    with span("msg.extract", bytes=os.path.getsize(input_file)):
+        msg = extract_msg.Message(input_file)
     return {
         "sender": msg.sender or "",
         "date": str(msg.date or ""),
@@ -71,6 +75,11 @@ def convert_text_to_pdf(text_lines, output_file):
     Erzeugt eine saubere PDF aus einer Liste von Textzeilen.
     Unterstützt automatischen Seitenumbruch und UTF-8.
     """
+    with span("convert.text_pdf", lines=len(text_lines)):
+        _write_text_pdf(text_lines, output_file)
+
+
+def _write_text_pdf(text_lines, output_file):
     from reportlab.pdfgen import canvas
     from reportlab.lib.pagesizes import A4
     from reportlab.pdfbase import pdfmetrics
@@ -146,7 +155,8 @@ def convert_msg_to_pdf(input_file, output_file):
 
 def convert_doc_to_docx(input_doc, output_docx):
     try:
-        subprocess.run(["unoconv", "-f", "docx", "-o", output_docx, input_doc], check=True)
+        with span("convert.office", documents=1, bytes=os.path.getsize(input_doc)):
+            get_conversion_service().convert(input_doc, output_docx, "docx")
         print(f"✅ DOC erfolgreich in DOCX umgewandelt: {output_docx}")
     except Exception as e:
-        print(f"❌ Fehler bei der Umwandlung von DOC zu DOCX: {e}")
\ No newline at end of file
+        print(f"❌ Fehler bei der Umwandlung von DOC zu DOCX: {e}")
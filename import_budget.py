@@ -0,0 +1,90 @@
+"""
+Import-Zeit-Budget für die Einstiegspunkte (main.py und app.py).
+
+Misst in einem frischen Python-Interpreter, wie lange der Import der Module dauert,
+die beim Kaltstart geladen werden, und prüft, dass dabei keine schweren
+ML-Bibliotheken (torch, flair, spacy) mitgeladen werden — die NER-Modelle sollen
+erst bei der ersten Schwärzung geladen werden.
+
+Aufruf:
+    python import_budget.py                 # Standard-Budgets
+    python import_budget.py --scale 2.0     # Budgets für langsame Rechner verdoppeln
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Budget in Sekunden je Einstiegspunkt und die Module, die dieser beim Start importiert.
+# app.py wird nicht direkt importiert (Streamlit-Skript), sondern über seine Start-Importe.
+IMPORT_BUDGETS = {
+    "main.py": {"modules": ["main"], "budget": 1.5},
+    "app.py": {"modules": ["streamlit", "result_spool", "docx_redactor"], "budget": 4.0},
+}
+
+# Diese Module dürfen beim Kaltstart NICHT geladen sein
+HEAVY_MODULES = ["torch", "flair", "spacy", "transformers"]
+
+_MEASURE_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_import(modules):
+    """Importiert die Module in einem frischen Interpreter und gibt Zeit + schwere Module zurück."""
+    snippet = _MEASURE_SNIPPET.format(modules=modules, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unbekannt"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüft das Import-Zeit-Budget der Einstiegspunkte.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Faktor für alle Budgets (z.B. 2.0 auf langsamen Rechnern)")
+    parser.add_argument("--json", dest="json_path", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    report = {}
+    failed = False
+    for entry, cfg in IMPORT_BUDGETS.items():
+        budget = cfg["budget"] * args.scale
+        res = measure_import(cfg["modules"])
+        res["budget"] = budget
+        report[entry] = res
+
+        if "error" in res:
+            print(f"  {entry}: übersprungen ({res['error']})")
+            continue
+
+        ok = res["seconds"] <= budget and not res["heavy"]
+        failed = failed or not ok
+        status = "OK" if ok else "ÜBERSCHRITTEN"
+        print(f"  {entry}: {res['seconds']:.2f}s / Budget {budget:.2f}s — {status}")
+        if res["heavy"]:
+            print(f"    Schwere Module beim Start geladen: {', '.join(res['heavy'])}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Lokale Job-Queue für die Web-App.
+
+- Jeder Verarbeitungslauf wird ein Job mit eigener ID; die Sitzung fragt nur den
+  Status ab (Fortschritt, Ergebnis) und kann den Job abbrechen
+- Die Jobs laufen in langlebigen Worker-Prozessen (NER-Modelle bleiben geladen,
+  globaler Zustand wie Engine/Sensitivität ist pro Prozess getrennt). Jeder
+  Worker behält auch seinen Dokument-Pool (worker_pool) über alle Jobs: Jobs mit
+  mehreren Dokumenten nutzen dessen bereits geladene Modelle
+- Höchstens MAX_CONCURRENT_JOBS Jobs gleichzeitig; jeder Job bekommt einen festen
+  Anteil der Kerne für seine Dokument-Worker — insgesamt höchstens so viele
+  arbeitende Prozesse wie Kerne (keine Überbuchung)
+- Wartende Jobs werden nach Größe eingeplant: kleine Jobs zuerst
+- Abbruch über ein Event (BatchCancelled im Job); nur wenn ein Job danach nicht
+  endet, wird der Worker samt seinem Dokument-Pool (eigene Prozessgruppe) beendet.
+  Jeder Worker meldet über eine eigene Pipe — ein beendeter Worker kann so keine
+  gemeinsam genutzte Queue beschädigen.
+"""
+
+import atexit
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import threading
+import time
+import uuid
+
+MAX_CONCURRENT_JOBS = max(1, min(2, (os.cpu_count() or 1) // 4))
+# So lange darf ein abgebrochener Job noch aufräumen, bevor der Worker beendet wird
+CANCEL_GRACE = 30
+# So lange bleiben fertige Jobs abrufbar (Sekunden)
+JOB_RETENTION = 6 * 3600
+
+
+# ==================== WORKER-PROZESS ====================
+
+def _worker_main(task_queue, event_conn, cancel_event, preload_engine, batch_workers):
+    """Hauptschleife eines Worker-Prozesses: Jobs nacheinander abarbeiten."""
+    import warnings
+    warnings.simplefilter("ignore", category=DeprecationWarning)
+
+    # Eigene Prozessgruppe: der Dokument-Pool des Workers gehört dazu und kann
+    # notfalls gemeinsam mit ihm beendet werden (siehe _kill_worker)
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+
+    from redaction_pipeline import run_pipeline
+    from batch_executor import BatchCancelled
+
+    if preload_engine:
+        from docx_redactor import warmup_ner_engine
+        import worker_pool
+        try:
+            warmup_ner_engine(preload_engine)
+            # Der Dokument-Pool des Workers bleibt über alle Jobs bestehen; seine
+            # Worker laden die Modelle hier einmal statt bei jedem Job
+            if batch_workers > 1:
+                worker_pool.warm_worker_pool(batch_workers, worker_pool.task_settings())
+        except Exception as e:
+            print(f"  Warnung: NER-Modelle konnten nicht vorgeladen werden: {e}")
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id, params = task
+
+        def progress(fraction, text, job_id=job_id):
+            event_conn.send(("progress", job_id, (fraction, text)))
+
+        try:
+            result = run_pipeline(**params, workers=batch_workers, progress=progress,
+                                  cancel=cancel_event.is_set)
+            event_conn.send(("done", job_id, result))
+        except BatchCancelled:
+            event_conn.send(("cancelled", job_id, None))
+        except Exception as e:
+            event_conn.send(("failed", job_id, f"{type(e).__name__}: {e}"))
+
+
+def _kill_worker(worker):
+    """Beendet einen Worker-Prozess samt seinem Dokument-Pool (ganze Prozessgruppe)."""
+    process = worker["process"]
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    elif process.is_alive():
+        process.kill()
+    process.join(timeout=5)
+    worker["events"].close()
+
+
+# ==================== QUEUE ====================
+
+class JobQueue:
+    """Verwaltet Jobs und Worker-Prozesse (eine Instanz pro Server-Prozess)."""
+
+    def __init__(self, max_concurrent=None, preload_engine=None):
+        self.max_concurrent = max_concurrent or MAX_CONCURRENT_JOBS
+        self.preload_engine = preload_engine
+        # Kerne gleichmäßig auf die gleichzeitig laufenden Jobs verteilen: pro Job
+        # Dokument-Worker plus der Queue-Worker selbst (Anwendung/Speichern).
+        # Bei batch_workers == 1 läuft der Job ganz im Queue-Worker (kein Pool).
+        per_job = max(1, (os.cpu_count() or 1) // self.max_concurrent)
+        self.batch_workers = max(1, per_job - 1) if per_job > 2 else 1
+        # spawn statt fork: der Server-Prozess (Streamlit) hat bereits Threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._workers = [self._start_worker() for _ in range(self.max_concurrent)]
+        self._stopped = False
+        threading.Thread(target=self._event_loop, daemon=True).start()
+        atexit.register(self.shutdown)
+
+    def _start_worker(self):
+        events, worker_conn = self._ctx.Pipe(duplex=False)
+        worker = {
+            "tasks": self._ctx.Queue(),
+            "cancel": self._ctx.Event(),
+            "events": events,
+            "job": None,
+        }
+        # Nicht als daemon: der Worker startet selbst Prozesse (Dokument-Pool)
+        worker["process"] = self._ctx.Process(
+            target=_worker_main,
+            args=(worker["tasks"], worker_conn, worker["cancel"],
+                  self.preload_engine, self.batch_workers))
+        worker["process"].start()
+        worker_conn.close()  # nur der Worker schreibt; beendet er sich, meldet die Pipe EOF
+        return worker
+
+    # ---------- API für die Sitzungen ----------
+
+    def submit(self, params, size=0):
+        """
+        Reiht einen Job ein und gibt seine ID zurück.
+        params: Argumente für redaction_pipeline.run_pipeline (ohne workers/progress/cancel)
+        size: Gesamtgröße der Eingaben in Bytes (kleinere Jobs laufen zuerst)
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id, "params": params, "size": size, "state": "queued",
+                "progress": 0.0, "text": "Wartet...", "result": None, "error": None,
+                "created": time.time(), "finished": None, "cancel_at": None,
+            }
+            self._dispatch()
+        return job_id
+
+    def status(self, job_id):
+        """Status eines Jobs als Dict (None, wenn unbekannt) inkl. Position in der Warteschlange."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            info = {key: job[key] for key in ("id", "state", "progress", "text", "result", "error")}
+            if job["state"] == "queued":
+                info["position"] = 1 + sum(1 for other in self._pending() if self._order(other) < self._order(job))
+            return info
+
+    def cancel(self, job_id):
+        """Bricht einen wartenden Job sofort, einen laufenden beim nächsten Prüfpunkt ab."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if job["state"] == "queued":
+                self._finish(job, "cancelled")
+            elif job["state"] == "running" and job["cancel_at"] is None:
+                job["cancel_at"] = time.time()
+                job["text"] = "Wird abgebrochen..."
+                for worker in self._workers:
+                    if worker["job"] == job_id:
+                        worker["cancel"].set()
+
+    def shutdown(self):
+        """Beendet alle Worker-Prozesse."""
+        if self._stopped:
+            return
+        self._stopped = True
+        # Laufende Jobs über das Event abbrechen (BatchCancelled), dann Worker beenden
+        for worker in self._workers:
+            worker["cancel"].set()
+            worker["tasks"].put(None)
+        deadline = time.time() + 5
+        for worker in self._workers:
+            worker["process"].join(timeout=max(0, deadline - time.time()))
+        for worker in self._workers:
+            # Auch bei regulär beendetem Worker: verwaiste Pool-Prozesse der Gruppe mit beenden
+            _kill_worker(worker)
+
+    # ---------- Intern ----------
+
+    @staticmethod
+    def _order(job):
+        return (job["size"], job["created"])
+
+    def _pending(self):
+        return [job for job in self._jobs.values() if job["state"] == "queued"]
+
+    def _finish(self, job, state, result=None, error=None):
+        job["state"] = state
+        job["result"] = result
+        job["error"] = error
+        job["finished"] = time.time()
+        job["params"] = None
+        if state == "done":
+            job["progress"] = 1.0
+        job["text"] = {"done": "Fertig!", "failed": "Fehlgeschlagen",
+                       "cancelled": "Abgebrochen"}.get(state, job["text"])
+
+    def _dispatch(self):
+        """Verteilt wartende Jobs (kleinste zuerst) auf freie Worker. Aufruf mit Lock."""
+        pending = sorted(self._pending(), key=self._order)
+        for worker in self._workers:
+            if not pending:
+                break
+            if worker["job"] is None and worker["process"].is_alive():
+                job = pending.pop(0)
+                worker["cancel"].clear()
+                worker["job"] = job["id"]
+                job["state"] = "running"
+                job["text"] = "Startet..."
+                worker["tasks"].put((job["id"], job["params"]))
+
+    def _release(self, job_id):
+        for worker in self._workers:
+            if worker["job"] == job_id:
+                worker["job"] = None
+
+    def _handle_event(self, kind, job_id, payload):
+        job = self._jobs.get(job_id)
+        if kind == "progress":
+            if job is not None and job["state"] == "running" and job["cancel_at"] is None:
+                job["progress"], job["text"] = payload
+            return
+        self._release(job_id)
+        if job is not None and job["state"] == "running":
+            if kind == "done":
+                self._finish(job, "done", result=payload)
+            elif kind == "failed":
+                self._finish(job, "failed", error=payload)
+            else:
+                self._finish(job, "cancelled")
+
+    def _supervise(self):
+        """Abgestürzte Worker ersetzen, hängende Abbrüche erzwingen, alte Jobs vergessen."""
+        now = time.time()
+        for index, worker in enumerate(self._workers):
+            job = self._jobs.get(worker["job"]) if worker["job"] else None
+            if not worker["process"].is_alive():
+                if job is not None:
+                    self._finish(job, "failed", error="Worker-Prozess unerwartet beendet")
+                _kill_worker(worker)  # verwaiste Pool-Prozesse aufräumen
+                self._workers[index] = self._start_worker()
+            elif job is not None and job["cancel_at"] and now - job["cancel_at"] > CANCEL_GRACE:
+                # Der Job reagiert nicht auf das Cancel-Event → Worker samt Pool beenden
+                _kill_worker(worker)
+                self._finish(job, "cancelled")
+                self._workers[index] = self._start_worker()
+
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["finished"] and now - job["finished"] > JOB_RETENTION]:
+            del self._jobs[job_id]
+
+    def _event_loop(self):
+        while not self._stopped:
+            with self._lock:
+                connections = [worker["events"] for worker in self._workers]
+            try:
+                ready = multiprocessing.connection.wait(connections, timeout=0.5)
+            except (OSError, ValueError):
+                ready = []  # Pipe eines ersetzten Workers bereits geschlossen
+            events = []
+            for conn in ready:
+                try:
+                    events.append(conn.recv())
+                except (EOFError, OSError):
+                    pass  # Worker beendet — _supervise ersetzt ihn
+            with self._lock:
+                if self._stopped:
+                    break
+                for event in events:
+                    self._handle_event(*event)
+                self._supervise()
+                self._dispatch()
@@ -1,49 +1,283 @@
-import openai
+import asyncio
+import hashlib
+import json
 import os
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import SQLiteCache
+from tracing import span
 
 # Setze deinen API-Key hier ODER als Umgebungsvariable
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "Paste_YOUR_API_KEY_HERE")
+# Alternativer Endpunkt (z.B. lokaler Stub-Server mit /chat/completions für Tests)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MODEL = "gpt-4-turbo"
+OPENAI_TEMPERATURE = 0
+
+# Parallelität und Wiederholungen für die Batch-Schwärzung
+API_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+API_MAX_RETRIES = 5
+API_BACKOFF_BASE = 1.0   # Sekunden, verdoppelt sich pro Versuch
+API_BACKOFF_MAX = 30.0
+API_TIMEOUT = 120.0
+
+SYSTEM_PROMPT = (
+    "Du bist ein Datenschutz-Spezialist für deutsche juristische Dokumente. "
+    "Deine Aufgabe ist es, personenbezogene Daten im Text durch '[REDACTED]' zu ersetzen.\n\n"
+    "WAS GESCHWÄRZT WERDEN MUSS:\n"
+    "- Vor- und Nachnamen natürlicher Personen\n"
+    "- Firmennamen und Unternehmensbezeichnungen\n"
+    "- Straßen, Hausnummern, PLZ und Orte (vollständige Adressen)\n"
+    "- E-Mail-Adressen und Telefonnummern\n"
+    "- IBAN, Kontonummern, BIC\n"
+    "- Steuernummern, Sozialversicherungsnummern\n"
+    "- Geburtsdaten\n"
+    "- Handelsregisternummern (HRA/HRB)\n"
+    "- Aktenzeichen die Rückschlüsse auf Parteien erlauben\n"
+    "- Grundbuchnummern\n\n"
+    "WAS NICHT GESCHWÄRZT WERDEN DARF:\n"
+    "- Gerichtsbezeichnungen (z.B. 'Amtsgericht München', 'Landesarbeitsgericht Wien')\n"
+    "- Gesetzesbezeichnungen und Paragraphen (z.B. '§ 823 BGB', 'Art. 6 DSGVO')\n"
+    "- Allgemeine juristische Begriffe und Fachbegriffe\n"
+    "- Datumsangaben die keine Geburtsdaten sind (z.B. Urteilsdaten, Fristen)\n"
+    "- Behördenbezeichnungen\n"
+    "- Berufsbezeichnungen ohne Namen\n\n"
+    "REGELN:\n"
+    "- Originalsprache, Struktur und Formatierung EXAKT beibehalten\n"
+    "- NICHT übersetzen, umformulieren oder zusammenfassen\n"
+    "- Nur '[REDACTED]' als Platzhalter verwenden\n"
+    "- Im Zweifel: lieber NICHT schwärzen (weniger False Positives)"
+)
+
+
+def _build_messages(text):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": text}
+    ]
+
+
+def _response_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
+
+# ==================== ANTWORT-CACHE ====================
+# Wiederholte Kopfzeilen, erneute Läufe nach einem Abbruch oder doppelt
+# hochgeladene Dokumente schicken identische Texte erneut an die API.
+# Die Antworten werden deshalb auf der Platte gespeichert — Schlüssel: Modell,
+# Hash des System-Prompts, Temperatur und Eingabetext.
+# OPENAI_CACHE=0 (oder set_api_cache(enabled=False)) umgeht den Cache.
+
+API_CACHE_ENABLED = os.getenv("OPENAI_CACHE", "1") != "0"
+API_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+API_CACHE_TTL = 30 * 24 * 3600  # Sekunden
+API_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+_api_cache = None
+# Zähler für den aktuellen Lauf (siehe get_api_stats / reset_api_stats)
+_api_stats = {"requests": 0, "calls": 0, "cache_hits": 0, "tokens_used": 0, "tokens_saved": 0}
+
+
+def set_api_cache(enabled=None, path=None, ttl=None, max_bytes=None):
+    """Konfiguriert den API-Antwort-Cache (an/aus, Datei, Lebensdauer, Größe)."""
+    global API_CACHE_ENABLED, API_CACHE_FILE, API_CACHE_TTL, API_CACHE_MAX_BYTES, _api_cache
+    if enabled is not None:
+        API_CACHE_ENABLED = enabled
+    if path:
+        API_CACHE_FILE = path
+    if ttl:
+        API_CACHE_TTL = ttl
+    if max_bytes:
+        API_CACHE_MAX_BYTES = max_bytes
+    _api_cache = None
+
+
+def _get_api_cache():
+    global _api_cache
+    if not API_CACHE_ENABLED:
+        return None
+    if _api_cache is None:
+        _api_cache = SQLiteCache(API_CACHE_FILE, max_bytes=API_CACHE_MAX_BYTES, ttl=API_CACHE_TTL)
+    return _api_cache
+
+
+def _api_cache_key(text):
+    prompt_hash = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()
+    payload = json.dumps([OPENAI_MODEL, prompt_hash, OPENAI_TEMPERATURE, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_lookup(texts):
+    """Gibt ein Dict Text → Antwort für alle Texte zurück, die bereits im Cache sind."""
+    cache = _get_api_cache()
+    _api_stats["requests"] += len(texts)
+    if cache is None or not texts:
+        return {}
+    keys = {text: _api_cache_key(text) for text in texts}
+    try:
+        found = cache.get_many(keys.values())
+    except sqlite3.Error as e:
+        print(f"  Warnung: API-Cache nicht verfügbar: {e}")
+        return {}
+    answers = {}
+    for text, key in keys.items():
+        if key in found:
+            answers[text] = found[key]["content"]
+            _api_stats["cache_hits"] += 1
+            _api_stats["tokens_saved"] += found[key]["tokens"]
+    return answers
+
+
+def _cache_store(results):
+    """Speichert neue Antworten: Liste von (Text, Antwort, verbrauchte Tokens)."""
+    for _, _, tokens in results:
+        _api_stats["calls"] += 1
+        _api_stats["tokens_used"] += tokens
+    cache = _get_api_cache()
+    if cache is None:
+        return
+    entries = {_api_cache_key(text): {"content": content, "tokens": tokens}
+               for text, content, tokens in results if content is not None}
+    try:
+        cache.put_many(entries)
+    except sqlite3.Error as e:
+        print(f"  Warnung: API-Cache nicht verfügbar: {e}")
+
+
+def get_api_stats():
+    """Statistik des aktuellen Laufs: Anfragen, echte API-Aufrufe, Cache-Treffer, Tokens."""
+    return dict(_api_stats)
+
+
+def reset_api_stats():
+    for key in _api_stats:
+        _api_stats[key] = 0
+
+
+# ==================== SYNCHRON (EINZELTEXT) ====================
+
+_sync_client = None
+
+
+def _get_sync_client():
+    """Ein gemeinsam genutzter Client (Keep-Alive) statt eines neuen pro Aufruf."""
+    global _sync_client
+    if _sync_client is None:
+        import openai  # erst bei Bedarf importieren (spart Startzeit)
+        _sync_client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                                     timeout=API_TIMEOUT, max_retries=API_MAX_RETRIES)
+    return _sync_client
+
 
 def redact_text_api(text):
     """
     Sendet Text an die OpenAI API zur Schwärzung sensibler personenbezogener Daten.
     Optimiert für deutsche juristische Dokumente.
     """
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[
-            {"role": "system", "content": (
-                "Du bist ein Datenschutz-Spezialist für deutsche juristische Dokumente. "
-                "Deine Aufgabe ist es, personenbezogene Daten im Text durch '[REDACTED]' zu ersetzen.\n\n"
-                "WAS GESCHWÄRZT WERDEN MUSS:\n"
-                "- Vor- und Nachnamen natürlicher Personen\n"
-                "- Firmennamen und Unternehmensbezeichnungen\n"
-                "- Straßen, Hausnummern, PLZ und Orte (vollständige Adressen)\n"
-                "- E-Mail-Adressen und Telefonnummern\n"
-                "- IBAN, Kontonummern, BIC\n"
-                "- Steuernummern, Sozialversicherungsnummern\n"
-                "- Geburtsdaten\n"
-                "- Handelsregisternummern (HRA/HRB)\n"
-                "- Aktenzeichen die Rückschlüsse auf Parteien erlauben\n"
-                "- Grundbuchnummern\n\n"
-                "WAS NICHT GESCHWÄRZT WERDEN DARF:\n"
-                "- Gerichtsbezeichnungen (z.B. 'Amtsgericht München', 'Landesarbeitsgericht Wien')\n"
-                "- Gesetzesbezeichnungen und Paragraphen (z.B. '§ 823 BGB', 'Art. 6 DSGVO')\n"
-                "- Allgemeine juristische Begriffe und Fachbegriffe\n"
-                "- Datumsangaben die keine Geburtsdaten sind (z.B. Urteilsdaten, Fristen)\n"
-                "- Behördenbezeichnungen\n"
-                "- Berufsbezeichnungen ohne Namen\n\n"
-                "REGELN:\n"
-                "- Originalsprache, Struktur und Formatierung EXAKT beibehalten\n"
-                "- NICHT übersetzen, umformulieren oder zusammenfassen\n"
-                "- Nur '[REDACTED]' als Platzhalter verwenden\n"
-                "- Im Zweifel: lieber NICHT schwärzen (weniger False Positives)"
-            )},
-            {"role": "user", "content": text}
-        ],
-        temperature=0
-    )
+    cached = _cache_lookup([text])
+    if text in cached:
+        return cached[text]
+
+    with span("api.request", texts=1, chars=len(text)):
+        response = _get_sync_client().chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=_build_messages(text),
+            temperature=OPENAI_TEMPERATURE
+        )
 
     redacted_text = response.choices[0].message.content
+    _cache_store([(text, redacted_text, _response_tokens(response))])
     return redacted_text
+
+
+# ==================== ASYNCHRON (VIELE TEXTE) ====================
+# Alle Absätze/Zeilen eines Dokuments werden gleichzeitig verschickt, begrenzt
+# durch ein Semaphor. Ein AsyncOpenAI-Client pro Batch hält die HTTP-Verbindungen
+# offen (Keep-Alive); bei Rate-Limits, Timeouts und Serverfehlern wird mit
+# exponentiellem Backoff (bzw. dem Retry-After-Header) wiederholt.
+
+def _retry_delay(error, attempt):
+    """Wartezeit vor dem nächsten Versuch: Retry-After des Servers oder Backoff mit Jitter."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        try:
+            return min(float(retry_after), API_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            pass
+    delay = min(API_BACKOFF_BASE * (2 ** attempt), API_BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+
+async def _redact_one(client, semaphore, text, retryable):
+    for attempt in range(API_MAX_RETRIES + 1):
+        # Slot nur für die Anfrage selbst — während des Backoffs dürfen andere Texte laufen
+        async with semaphore:
+            try:
+                response = await client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=_build_messages(text),
+                    temperature=OPENAI_TEMPERATURE
+                )
+                return response.choices[0].message.content, _response_tokens(response)
+            except retryable as e:
+                if attempt == API_MAX_RETRIES:
+                    raise
+                delay = _retry_delay(e, attempt)
+        await asyncio.sleep(delay)
+
+
+async def _redact_all(texts):
+    import openai
+    retryable = (openai.RateLimitError, openai.APITimeoutError,
+                 openai.APIConnectionError, openai.InternalServerError)
+    # Wiederholungen übernimmt _redact_one (Backoff ohne Semaphor-Slot), nicht der Client
+    client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL,
+                                timeout=API_TIMEOUT, max_retries=0)
+    semaphore = asyncio.Semaphore(API_MAX_CONCURRENCY)
+    try:
+        # Ein Fehler bricht die übrigen Anfragen nicht ab: deren Antworten sind bezahlt
+        return await asyncio.gather(*(_redact_one(client, semaphore, text, retryable)
+                                      for text in texts), return_exceptions=True)
+    finally:
+        await client.close()
+
+
+def redact_texts_api(texts):
+    """
+    Schwärzt viele Texte gleichzeitig über die API.
+    Gibt die Ergebnisse in derselben Reihenfolge wie die Eingabe zurück;
+    identische Texte werden nur einmal angefragt, bekannte kommen aus dem Cache.
+    Scheitert ein Text endgültig, wird der Fehler geworfen — erst nachdem die
+    erfolgreichen Antworten im Cache gespeichert sind (ein neuer Lauf fragt nur
+    die fehlgeschlagenen Texte erneut an).
+    """
+    unique = list(dict.fromkeys(texts))
+    redacted = _cache_lookup(unique)
+    pending = [text for text in unique if text not in redacted]
+
+    if pending:
+        with span("api.request", texts=len(pending), chars=sum(len(t) for t in pending)):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                results = asyncio.run(_redact_all(pending))
+            else:
+                # Bereits in einer Event-Loop (z.B. eingebettet) → eigene Loop in einem Thread
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    results = executor.submit(asyncio.run, _redact_all(pending)).result()
+
+        answered = [(text, result) for text, result in zip(pending, results)
+                    if not isinstance(result, BaseException)]
+        _cache_store([(text, content, tokens) for text, (content, tokens) in answered])
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            print(f"  {len(errors)} von {len(pending)} API-Anfragen fehlgeschlagen.")
+            raise errors[0]
+        for text, (content, _) in answered:
+            redacted[text] = content
+
+    return [redacted[text] for text in texts]
@@ -1,10 +1,12 @@
 import os
-from docx_redactor import (process_docx, process_docx_api, EntityMapper,
+from docx_redactor import (process_docx_api, EntityMapper,
                             set_sensitivity, set_ner_engine, get_engine_name,
-                            redact_text_full)
-from pdf_redactor import redact_pdf, redact_pdf_api
-from file_converter import (convert_docx_to_pdf, convert_msg_to_pdf, convert_doc_to_docx,
-                            extract_msg_text, convert_text_to_pdf)
+                            get_cascade_stats)
+from pdf_redactor import redact_pdf_api
+from file_converter import convert_office_files
+from batch_executor import make_job, run_batch, default_worker_count
+from llm_api import get_api_stats
+import tracing
 
 import warnings
 warnings.simplefilter("ignore", category=DeprecationWarning)
@@ -16,11 +18,14 @@ def main():
 
     # NER-Engine wählen
     print(f"\nAktive NER-Engine: {get_engine_name()}")
-    engine_choice = input("NER-Engine wechseln? (1=Flair [genauer], 2=spaCy [schneller], Enter=beibehalten): ").strip()
+    engine_choice = input("NER-Engine wechseln? (1=Flair [genauer], 2=spaCy [schneller], "
+                          "3=Flair int8 [CPU-optimiert], Enter=beibehalten): ").strip()
     if engine_choice == "1":
         set_ner_engine("flair")
     elif engine_choice == "2":
         set_ner_engine("spacy")
+    elif engine_choice == "3":
+        set_ner_engine("flair-int8")
 
     # Sensitivitätsstufe wählen
     print("\nSensitivitätsstufe wählen:")
@@ -55,49 +60,33 @@ def main():
     # EntityMapper
     mapper = EntityMapper(sensitivity=sensitivity)
 
+    # Laufzeiten pro Stufe und Dokument erfassen (Bericht am Ende als JSON)
+    tracing.enable_tracing()
+    tracing.reset_batch()
+
+    # Aufträge sammeln (DOCX/MSG in Ordnerreihenfolge, danach die PDFs) und dann
+    # gemeinsam parallel verarbeiten
+    jobs = []
     pdf_files_to_process = []
 
     if convert_to_pdf:
+        # DOCX und DOC (direkt, ohne Zwischen-DOCX) gemeinsam nach PDF konvertieren
+        conversions = []
         for file in os.listdir(folder):
             full_path = os.path.join(folder, file)
             if os.path.isfile(full_path):
                 filename, ext = os.path.splitext(file)
                 ext = ext.lower()
-                if ext == ".docx":
+                if ext in (".docx", ".doc"):
                     output_pdf = os.path.join(conv_folder, filename + ".pdf")
-                    print(f"Konvertiere DOCX -> PDF: {full_path}")
-                    convert_docx_to_pdf(full_path, output_pdf)
-                    if os.path.exists(output_pdf):
-                        pdf_files_to_process.append(output_pdf)
-                    else:
-                        print(f"Konvertierung fehlgeschlagen: {full_path}")
+                    print(f"Konvertierung eingeplant ({ext[1:].upper()} -> PDF): {full_path}")
+                    conversions.append((full_path, output_pdf, "pdf"))
                 elif ext == ".msg":
                     output_pdf = os.path.join(redacted_folder, filename + ".pdf")
-                    print(f"Verarbeite MSG (Text -> Schwärzung -> PDF): {full_path}")
-                    try:
-                        msg_data = extract_msg_text(full_path)
-                        # Text VOR der PDF-Erstellung schwärzen
-                        redacted_lines = [
-                            f"Betreff: {redact_text_full(msg_data['subject'], mapper)}",
-                            f"Von: {redact_text_full(msg_data['sender'], mapper)}",
-                            f"Datum: {msg_data['date']}",
-                            "",
-                            redact_text_full(msg_data["body"], mapper)
-                        ]
-                        convert_text_to_pdf(redacted_lines, output_pdf)
-                        print(f"  MSG geschwärzt und als PDF gespeichert: {output_pdf}")
-                    except Exception as e:
-                        print(f"  Fehler bei MSG-Verarbeitung: {e}")
-                elif ext == ".doc":
-                    docx_path = os.path.join(conv_folder, filename + ".docx")
-                    print(f"Konvertiere DOC -> DOCX: {full_path}")
-                    convert_doc_to_docx(full_path, docx_path)
-                    if os.path.exists(docx_path):
-                        output_pdf = os.path.join(conv_folder, filename + ".pdf")
-                        print(f"Konvertiere DOCX -> PDF: {docx_path}")
-                        convert_docx_to_pdf(docx_path, output_pdf)
-                        if os.path.exists(output_pdf):
-                            pdf_files_to_process.append(output_pdf)
+                    print(f"MSG eingeplant (Text -> Schwärzung -> PDF): {full_path}")
+                    jobs.append(make_job("msg", full_path, output_pdf))
+
+        pdf_files_to_process.extend(convert_office_files(conversions))
 
         for file in os.listdir(folder):
             full_path = os.path.join(folder, file)
@@ -105,6 +94,13 @@ def main():
                 pdf_files_to_process.append(full_path)
 
     else:
+        # Alle DOC-Dateien vorab gemeinsam nach DOCX konvertieren
+        convert_office_files([
+            (os.path.join(folder, file), os.path.join(conv_folder, os.path.splitext(file)[0] + ".docx"), "docx")
+            for file in os.listdir(folder)
+            if os.path.isfile(os.path.join(folder, file)) and file.lower().endswith(".doc")
+        ])
+
         for file in os.listdir(folder):
             full_path = os.path.join(folder, file)
             if os.path.isfile(full_path):
@@ -116,49 +112,38 @@ def main():
 
                 elif ext == ".docx":
                     output_docx = os.path.join(redacted_folder, file)
-                    print(f"Verarbeite DOCX: {full_path}")
                     if use_api_initial:
+                        print(f"Verarbeite DOCX: {full_path}")
                         process_docx_api(full_path, output_docx)
                     else:
-                        mapper = process_docx(full_path, output_docx, mapper)
+                        jobs.append(make_job("docx", full_path, output_docx))
 
                 elif ext == ".doc":
                     docx_path = os.path.join(conv_folder, filename + ".docx")
-                    print(f"Konvertiere DOC -> DOCX: {full_path}")
-                    convert_doc_to_docx(full_path, docx_path)
                     if os.path.exists(docx_path):
                         output_docx = os.path.join(redacted_folder, filename + ".docx")
-                        print(f"Verarbeite DOCX: {docx_path}")
                         if use_api_initial:
+                            print(f"Verarbeite DOCX: {docx_path}")
                             process_docx_api(docx_path, output_docx)
                         else:
-                            mapper = process_docx(docx_path, output_docx, mapper)
+                            jobs.append(make_job("docx", docx_path, output_docx))
 
                 elif ext == ".msg":
                     output_pdf = os.path.join(redacted_folder, filename + ".pdf")
-                    print(f"Verarbeite MSG (Text -> Schwärzung -> PDF): {full_path}")
-                    try:
-                        msg_data = extract_msg_text(full_path)
-                        # Text VOR der PDF-Erstellung schwärzen
-                        redacted_lines = [
-                            f"Betreff: {redact_text_full(msg_data['subject'], mapper)}",
-                            f"Von: {redact_text_full(msg_data['sender'], mapper)}",
-                            f"Datum: {msg_data['date']}",
-                            "",
-                            redact_text_full(msg_data["body"], mapper)
-                        ]
-                        convert_text_to_pdf(redacted_lines, output_pdf)
-                        print(f"  MSG geschwärzt und als PDF gespeichert: {output_pdf}")
-                    except Exception as e:
-                        print(f"  Fehler bei MSG-Verarbeitung: {e}")
+                    jobs.append(make_job("msg", full_path, output_pdf))
 
     # PDF-Verarbeitung
     for pdf_file in pdf_files_to_process:
         base = os.path.basename(pdf_file)
         output_file = os.path.join(redacted_folder, base)
         if os.path.exists(pdf_file):
-            print(f"Verarbeite PDF: {pdf_file}")
-            mapper = redact_pdf(pdf_file, output_file, mapper)
+            jobs.append(make_job("pdf", pdf_file, output_file))
+
+    # Alle Aufträge verarbeiten (parallel, Platzhalter wie bei serieller Verarbeitung)
+    if jobs:
+        workers = default_worker_count()
+        print(f"\nVerarbeite {len(jobs)} Dokument(e) mit {workers} Worker-Prozess(en)...")
+        mapper = run_batch(jobs, mapper, workers=workers)
 
     # API-Nachbearbeitung
     use_api_final = input("\nGeschwärzte Dokumente zusätzlich über OpenAI API verarbeiten? (j/n): ").strip().lower() == 'j'
@@ -184,6 +169,21 @@ def main():
     print(f"  NER-Engine: {get_engine_name()}")
     print(f"  Sensitivität: {sensitivity}")
     print(f"  Dateien im Ordner: {redacted_folder}")
+    api_stats = get_api_stats()
+    if api_stats["requests"]:
+        print(f"  API: {api_stats['requests']} Anfragen, {api_stats['calls']} Aufrufe, "
+              f"{api_stats['cache_hits']} aus Cache ({api_stats['tokens_saved']} Tokens gespart)")
+    cascade_stats = get_cascade_stats()
+    if cascade_stats["sentences"]:
+        print(f"  Kaskade: zweites Modell auf {cascade_stats['second_model']} von "
+              f"{cascade_stats['sentences']} Sätzen ({cascade_stats['skipped']} übersprungen)")
+    trace_path = os.path.join(folder, "trace_report.json")
+    trace = tracing.write_report(trace_path)
+    print(f"  Laufzeiten ({trace['wall_seconds']:.1f}s gesamt, Bericht: {trace_path}):")
+    for line in tracing.summary_lines(trace):
+        print(f"    {line}")
+    for profile in trace["profiles"]:
+        print(f"    Profil (langsames Dokument): {profile}")
     print("=" * 60)
 
     total_entities = len(mapper.person_mapping) + len(mapper.org_mapping) + len(mapper.loc_mapping)
@@ -223,4 +223,10 @@ def main():
     print("\n" + "=" * 60)
 
 if __name__ == '__main__':
-    main()
+    import sys
+    if len(sys.argv) > 1:
+        # Mit Argumenten: Headless-Betrieb (Eingangsordner überwachen), siehe watch_daemon.py
+        from watch_daemon import main as daemon_main
+        daemon_main(sys.argv[1:])
+    else:
+        main()
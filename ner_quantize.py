@@ -0,0 +1,222 @@
+"""
+int8-quantisierte Flair-Modelle für die CPU (Engine "flair-int8").
+
+- Die linearen und LSTM-Schichten der Tagger werden dynamisch auf int8 quantisiert
+  (torch.quantization.quantize_dynamic) — kleiner und auf der CPU deutlich schneller
+- Einmaliger Export: die Gewichte (state_dict) der quantisierten Modelle werden neben
+  den Flair-Modellen gespeichert (Standard: <flair.cache_root>/quantized). Beim Laden
+  wird das Original-Modell quantisiert und die Gewichte mit torch.load(weights_only=True)
+  übernommen — aus dem Modellordner wird kein Pickle-Code ausgeführt
+- Paritätsprüfung: vergleicht die Entities des quantisierten mit dem Original-Modell
+
+Aufruf:
+    python ner_quantize.py export [--force]
+    python ner_quantize.py check [--input datei.docx datei.txt ...]
+
+Auswahl der Engine: set_ner_engine("flair-int8")
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+FLAIR_MODELS = ("flair/ner-german-legal", "flair/ner-german-large")
+
+# Zielordner für die quantisierten Modelle (Standard: neben dem Flair-Cache)
+QUANTIZED_DIR = os.getenv("FLAIR_INT8_DIR") or None
+
+# Beispielsätze für die Paritätsprüfung (ohne eigene Eingabedateien)
+PARITY_SAMPLES = [
+    "Der Kläger Max Mustermann, wohnhaft in der Hauptstraße 12 in 80331 München, vertreten durch Rechtsanwältin Dr. Eva Schmidt, erhebt Klage gegen die Müller Bau GmbH.",
+    "Das Landgericht Hamburg hat mit Urteil vom 12.03.2021 die Klage gemäß § 823 Abs. 1 BGB abgewiesen.",
+    "Die Beklagte, die Schneider & Partner KG mit Sitz in Köln, wird durch ihren Geschäftsführer Thomas Weber vertreten.",
+    "Zeugin Anna Becker bestätigte, dass sie Herrn Jürgen Fischer am Bahnhof in Frankfurt am Main getroffen habe.",
+    "Der Antrag der Erblasserin Gertrud Hoffmann auf Eintragung im Grundbuch von Wien-Döbling wurde vom Bezirksgericht zurückgewiesen.",
+    "Gemäß Art. 6 Abs. 1 lit. f DSGVO ist die Verarbeitung rechtmäßig, wenn sie zur Wahrung berechtigter Interessen erforderlich ist.",
+    "Die Siemens AG und die Deutsche Bahn AG schlossen am 1. Januar 2020 in Berlin einen Rahmenvertrag.",
+    "Herr Dipl.-Ing. Klaus-Peter Zimmermann aus Graz ist als Sachverständiger für das Oberlandesgericht Stuttgart tätig.",
+]
+
+
+# ==================== EXPORT / LADEN ====================
+
+def quantized_dir():
+    if QUANTIZED_DIR:
+        return QUANTIZED_DIR
+    import flair
+    return os.path.join(str(flair.cache_root), "quantized")
+
+
+def artifact_path(model_name):
+    """Pfad der quantisierten Gewichte; torch- und Flair-Version gehören zum Namen (Format der Parameter)."""
+    import flair
+    import torch
+    slug = model_name.replace("/", "--")
+    versions = f"torch-{torch.__version__}.flair-{getattr(flair, '__version__', '?')}"
+    return os.path.join(quantized_dir(), f"{slug}.int8-state.{versions}.pt")
+
+
+def quantize_tagger(tagger):
+    """Gibt eine dynamisch int8-quantisierte Kopie des Taggers zurück (nur CPU)."""
+    import torch
+    tagger.eval()
+    return torch.quantization.quantize_dynamic(
+        tagger.to("cpu"), {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU}, dtype=torch.qint8)
+
+
+def export_quantized(model_name, force=False):
+    """Quantisiert ein Flair-Modell und speichert seine Gewichte (state_dict). Gibt den Pfad zurück."""
+    import torch
+    from flair.models import SequenceTagger
+
+    path = artifact_path(model_name)
+    if os.path.exists(path) and not force:
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    started = time.time()
+    quantized = quantize_tagger(SequenceTagger.load(model_name))
+    # Atomar schreiben: ein abgebrochener Export hinterlässt keine halbe Datei
+    tmp_path = path + ".tmp"
+    torch.save(quantized.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+    print(f"  {model_name}: int8-Modell gespeichert ({os.path.getsize(path) / 1024 / 1024:.0f} MB, "
+          f"{time.time() - started:.0f}s) → {path}")
+    return path
+
+
+def load_quantized_tagger(model_name):
+    """
+    Quantisiert das Original-Modell und übernimmt die gespeicherten int8-Gewichte
+    (nur Tensoren, weights_only=True); fehlen sie, werden sie einmalig erzeugt.
+    Lassen sie sich nicht laden, bleibt es bei der frisch quantisierten Variante.
+    """
+    import torch
+    from flair.models import SequenceTagger
+
+    path = artifact_path(model_name)
+    if not os.path.exists(path):
+        print(f"  Kein int8-Modell für {model_name} gefunden, quantisiere einmalig...")
+        export_quantized(model_name)
+    tagger = quantize_tagger(SequenceTagger.load(model_name))
+    try:
+        tagger.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+    except (pickle.UnpicklingError, RuntimeError) as e:
+        print(f"  Warnung: int8-Gewichte {path} nicht übernommen ({e}), verwende frisch quantisiertes Modell.")
+    return tagger
+
+
+# ==================== PARITÄTSPRÜFUNG ====================
+
+def _read_inputs(paths):
+    """Texte aus .docx (Absätze, Tabellen, Kopf-/Fußzeilen) und .txt (eine Zeile pro Text)."""
+    texts = []
+    for path in paths:
+        if path.lower().endswith(".docx"):
+            from docx import Document
+            from docx_redactor import docx_ner_inputs
+            texts.extend(docx_ner_inputs(Document(path)))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                texts.extend(line.strip() for line in f)
+    return [t for t in dict.fromkeys(texts) if t and t.strip()]
+
+
+def _predict_spans(tagger, texts):
+    """Alle vorhergesagten Spans als Dict (Textindex, Start, Ende, Tag) → Score, plus Laufzeit."""
+    from flair.data import Sentence
+    from docx_redactor import FLAIR_MINI_BATCH_SIZE
+
+    sentences = [Sentence(text) for text in texts]
+    non_empty = [s for s in sentences if len(s) > 0]
+    started = time.perf_counter()
+    tagger.predict(non_empty, mini_batch_size=FLAIR_MINI_BATCH_SIZE, label_name="ner")
+    elapsed = time.perf_counter() - started
+
+    spans = {}
+    for index, sentence in enumerate(sentences):
+        for span in sentence.get_spans("ner"):
+            label = span.get_label("ner")
+            spans[(index, span.start_position, span.end_position, label.value)] = label.score
+    return spans, elapsed
+
+
+def parity_check(texts=None, model_names=FLAIR_MODELS):
+    """
+    Vergleicht pro Modell die Entities von Original und int8-Variante
+    (gleiche Spans und gleiches Tag = Übereinstimmung). Gibt ein Dict pro Modell zurück.
+    """
+    from flair.models import SequenceTagger
+
+    texts = texts or PARITY_SAMPLES
+    report = {}
+    for model_name in model_names:
+        reference, ref_seconds = _predict_spans(SequenceTagger.load(model_name), texts)
+        quantized, q_seconds = _predict_spans(load_quantized_tagger(model_name), texts)
+        report[model_name] = dict(compare_spans(reference, quantized, ref_seconds, q_seconds),
+                                  texts=len(texts))
+    return report
+
+
+def compare_spans(reference, quantized, ref_seconds, q_seconds):
+    """Kennzahlen für zwei Span-Dicts (Schlüssel → Score) aus _predict_spans()."""
+    matched = reference.keys() & quantized.keys()
+    precision = len(matched) / len(quantized) if quantized else 1.0
+    recall = len(matched) / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    score_diff = (sum(abs(reference[k] - quantized[k]) for k in matched) / len(matched)) if matched else 0.0
+    return {
+        "reference_entities": len(reference),
+        "quantized_entities": len(quantized),
+        "matched": len(matched),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "mean_score_diff": round(score_diff, 4),
+        "reference_seconds": round(ref_seconds, 2),
+        "quantized_seconds": round(q_seconds, 2),
+        "speedup": round(ref_seconds / q_seconds, 2) if q_seconds else None,
+    }
+
+
+def print_parity_report(report):
+    for model_name, r in report.items():
+        print(f"\n{model_name} ({r['texts']} Texte)")
+        print(f"  Entities: Original {r['reference_entities']}, int8 {r['quantized_entities']}, "
+              f"übereinstimmend {r['matched']}")
+        print(f"  Übereinstimmung: Precision {r['precision']:.1%}, Recall {r['recall']:.1%}, F1 {r['f1']:.1%}")
+        print(f"  Ø Score-Abweichung: {r['mean_score_diff']:.4f}")
+        print(f"  Laufzeit: Original {r['reference_seconds']:.2f}s, int8 {r['quantized_seconds']:.2f}s"
+              + (f" (Faktor {r['speedup']:.1f})" if r["speedup"] else ""))
+
+
+# ==================== CLI ====================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="int8-quantisierte Flair-Modelle erzeugen und prüfen")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Modelle quantisieren und neben den Flair-Modellen speichern")
+    export.add_argument("--force", action="store_true", help="vorhandene int8-Modelle neu erzeugen")
+
+    check = sub.add_parser("check", help="Entities von Original und int8-Modell vergleichen")
+    check.add_argument("--input", nargs="*", default=[], help=".docx- oder .txt-Dateien (Standard: Beispielsätze)")
+    check.add_argument("--json", help="Bericht zusätzlich als JSON speichern")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        for model_name in FLAIR_MODELS:
+            print(export_quantized(model_name, force=args.force))
+        return 0
+
+    report = parity_check(_read_inputs(args.input) if args.input else None)
+    print_parity_report(report)
+    if args.json:
+        import json
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,430 @@
+"""
+Lokaler NER-Server: ein Prozess pro Rechner hält die NER-Modelle im Speicher.
+
+- CLI, Streamlit-Worker und Skripte schicken ihre Texte über einen Unix-Socket,
+  statt jeweils eine eigene (mehrere GB große) Kopie der Flair-Modelle zu laden
+- Gleichzeitige Anfragen werden für wenige Millisekunden gesammelt und gemeinsam
+  durch das Modell geschickt (Micro-Batching → ein predict() für alle Clients)
+- Kaskade und Segmentierung bestimmt der Client: seine Einstellungen gehen mit jeder
+  Anfrage mit, nur Anfragen mit gleichen Einstellungen werden zusammen gerechnet;
+  die Kaskaden-Zähler kommen mit der Antwort zurück
+- Ist kein Server erreichbar, rechnet extract_entities wie bisher im eigenen Prozess
+
+Start:
+    python ner_server.py --engine flair
+    python ner_server.py --engine spacy --socket /run/anonymizer/ner.sock
+
+Protokoll: pro Nachricht 4 Byte Länge (big endian) + JSON (UTF-8).
+    {"op": "extract", "engine": "flair", "texts": [...], "config": {...}}
+        → {"ok": true, "entities": [[...], ...], "cascade": {...}}
+    {"op": "info"}                                       → {"ok": true, "engine": ..., "stats": {...}}
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+
+NER_SERVER_SOCKET = os.getenv("NER_SERVER_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"anonymizer-ner-{os.getuid()}.sock")
+# "auto": Server nutzen, wenn erreichbar; "off": immer im eigenen Prozess rechnen
+NER_SERVER_MODE = os.getenv("NER_SERVER", "auto")
+# So lange wird nach einem Verbindungsfehler nicht erneut versucht (Sekunden)
+NER_SERVER_RETRY = 30
+NER_SERVER_TIMEOUT = 300
+
+# Micro-Batching: so lange nach der ersten Anfrage auf weitere warten
+BATCH_WINDOW = 0.005
+BATCH_MAX_TEXTS = 512
+
+_HEADER = struct.Struct(">I")
+
+
+# ==================== PROTOKOLL ====================
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Verbindung geschlossen")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+# ==================== CLIENT ====================
+
+class NERClient:
+    """
+    Verbindung zum NER-Server (eine pro Thread, nach fork neu aufgebaut).
+    Alle Methoden geben bei Fehlern None zurück — der Aufrufer rechnet dann lokal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._retry_at = 0.0
+        self._info = None
+        self._info_at = 0.0
+        self._connected = False
+        self._warned = False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(NER_SERVER_TIMEOUT)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._local.conn = sock
+        self._local.pid = os.getpid()
+        return sock
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+
+    def request(self, payload):
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            sock = self._connection()
+            send_message(sock, payload)
+            response = recv_message(sock)
+        except (OSError, EOFError, ValueError) as e:
+            self._drop_connection()
+            self._retry_at = time.monotonic() + NER_SERVER_RETRY
+            self._info = None
+            # Nur melden, wenn der Server vorher erreichbar war (kein Server = Normalfall)
+            if self._connected and not self._warned:
+                print(f"  Warnung: NER-Server nicht mehr erreichbar ({e}), rechne im eigenen Prozess.")
+                self._warned = True
+            return None
+        self._connected = True
+        return response
+
+    def info(self):
+        """Engine, Modellname und Statistik des Servers (einige Sekunden zwischengespeichert)."""
+        if self._info is None or time.monotonic() - self._info_at > NER_SERVER_RETRY:
+            response = self.request({"op": "info"})
+            self._info = response if response and response.get("ok") else None
+            self._info_at = time.monotonic()
+        return self._info
+
+    def serves(self, engine):
+        """True, wenn der Server läuft und die gewünschte Engine geladen hat."""
+        info = self.info()
+        return info is not None and info.get("engine") == engine
+
+    def extract(self, texts, engine, config=None):
+        """
+        (Entity-Listen für alle Texte in gleicher Reihenfolge, Kaskaden-Zähler) oder None.
+        config: Kaskaden-/Segmentierungs-Einstellungen (docx_redactor.get_ner_config())
+        """
+        if not self.serves(engine):
+            return None
+        payload = {"op": "extract", "engine": engine, "texts": list(texts)}
+        if config is not None:
+            payload["config"] = config
+        response = self.request(payload)
+        if not response or not response.get("ok"):
+            if response:
+                print(f"  Warnung: NER-Server meldet Fehler: {response.get('error')}")
+            return None
+        return response["entities"], response.get("cascade") or {}
+
+
+_client = None
+
+
+def get_ner_client():
+    """Gibt den Client zurück oder None, wenn der Server-Modus abgeschaltet ist."""
+    global _client
+    if NER_SERVER_MODE == "off":
+        return None
+    if _client is None or _client.path != NER_SERVER_SOCKET:
+        _client = NERClient(NER_SERVER_SOCKET)
+    return _client
+
+
+def set_ner_server(mode=None, socket_path=None):
+    """Konfiguriert die Nutzung des NER-Servers ("auto" oder "off") und den Socket-Pfad."""
+    global NER_SERVER_MODE, NER_SERVER_SOCKET, _client
+    if mode is not None:
+        NER_SERVER_MODE = mode
+    if socket_path:
+        NER_SERVER_SOCKET = socket_path
+    _client = None
+
+
+# ==================== MICRO-BATCHING ====================
+
+def _split_counts(counts, weights):
+    """Teilt Zähler anteilig (nach weights) auf, ohne dass in der Summe etwas verloren geht."""
+    total = sum(weights)
+    parts = [{} for _ in weights]
+    for key, value in counts.items():
+        if not total:
+            shares = [0] * len(weights)
+        else:
+            exact = [value * weight / total for weight in weights]
+            shares = [int(share) for share in exact]
+            # Rest an die größten Nachkommaanteile verteilen
+            by_remainder = sorted(range(len(weights)), key=lambda i: shares[i] - exact[i])
+            for i in by_remainder[:value - sum(shares)]:
+                shares[i] += 1
+        for part, share in zip(parts, shares):
+            part[key] = share
+    return parts
+
+
+class MicroBatcher:
+    """
+    Sammelt Anfragen aller Verbindungen und rechnet sie gemeinsam.
+    Nach der ersten Anfrage wird höchstens `window` Sekunden auf weitere gewartet
+    (oder bis max_texts Texte beisammen sind); ein einzelner Thread führt das Modell aus.
+    Zusammen gerechnet werden nur Anfragen mit gleicher config — run_batch(texts, config)
+    gibt (Ergebnisse, Zähler) zurück; die Zähler werden anteilig nach Textzahl verteilt.
+    """
+
+    def __init__(self, run_batch, window=BATCH_WINDOW, max_texts=BATCH_MAX_TEXTS):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_texts = max_texts
+        self._queue = queue.Queue()
+        self._deferred = []   # Anfragen mit anderer config, kommen im nächsten Batch dran
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "texts": 0, "max_batch": 0, "busy_seconds": 0.0}
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, texts, config=None):
+        """Blockiert, bis die Entities für texts berechnet sind; gibt (Entities, Zähler) zurück."""
+        slot = {"texts": texts, "config": config, "key": json.dumps(config, sort_keys=True),
+                "done": threading.Event(), "result": None, "counts": {}, "error": None}
+        self._queue.put(slot)
+        slot["done"].wait()
+        if slot["error"] is not None:
+            raise slot["error"]
+        return slot["result"], slot["counts"]
+
+    def _collect(self):
+        pending, self._deferred = self._deferred, []
+        first = pending.pop(0) if pending else self._queue.get()
+        batch = [first]
+        count = len(first["texts"])
+        # Zurückgestellte Anfragen zuerst (Reihenfolge bleibt erhalten)
+        for slot in pending:
+            if slot["key"] == first["key"] and count < self.max_texts:
+                batch.append(slot)
+                count += len(slot["texts"])
+            else:
+                self._deferred.append(slot)
+        deadline = time.monotonic() + self.window
+        while count < self.max_texts:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                slot = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if slot["key"] != first["key"]:
+                self._deferred.append(slot)
+                continue
+            batch.append(slot)
+            count += len(slot["texts"])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            texts = [text for slot in batch for text in slot["texts"]]
+            started = time.monotonic()
+            try:
+                results, counts = self.run_batch(texts, batch[0]["config"]) if texts else ([], {})
+            except Exception as e:
+                for slot in batch:
+                    slot["error"] = e
+                    slot["done"].set()
+                continue
+            offset = 0
+            shares = _split_counts(counts, [len(slot["texts"]) for slot in batch])
+            for slot, share in zip(batch, shares):
+                slot["result"] = results[offset:offset + len(slot["texts"])]
+                slot["counts"] = share
+                offset += len(slot["texts"])
+                slot["done"].set()
+            with self._lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(texts)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(texts))
+                self.stats["busy_seconds"] += time.monotonic() - started
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["avg_batch"] = round(stats["texts"] / stats["batches"], 1) if stats["batches"] else 0.0
+        stats["busy_seconds"] = round(stats["busy_seconds"], 2)
+        return stats
+
+
+# ==================== SERVER ====================
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Eine Verbindung: beliebig viele Anfragen nacheinander, bis der Client schließt."""
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (EOFError, OSError, ValueError):
+                return
+            try:
+                response = server.dispatch(message)
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class NERServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, engine, window=BATCH_WINDOW, max_texts=BATCH_MAX_TEXTS):
+        import docx_redactor
+        self.engine = engine
+        self._redactor = docx_redactor
+        self.batcher = MicroBatcher(self._run_batch, window, max_texts)
+        # Einstellungen beim Start — gelten für Clients, die keine config mitschicken
+        self.default_config = docx_redactor.get_ner_config()
+        self.started = time.time()
+        super().__init__(path, _RequestHandler)
+
+    def server_bind(self):
+        # Der Socket entsteht gleich mit 0600 — ein chmod nach bind() ließe ein
+        # Zeitfenster, in dem andere lokale Benutzer sich verbinden könnten
+        previous = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(previous)
+
+    def _run_batch(self, texts, config):
+        """Rechnet einen Batch mit den Einstellungen des Clients (nur im Batcher-Thread)."""
+        self._redactor.set_ner_config(config or self.default_config)
+        before = self._redactor.get_cascade_stats()
+        entities = self._redactor.extract_entities_batch(texts)
+        after = self._redactor.get_cascade_stats()
+        return entities, {key: after[key] - before[key] for key in after}
+
+    def dispatch(self, message):
+        op = message.get("op")
+        if op == "info":
+            return {"ok": True, "engine": self.engine,
+                    "engine_name": self._redactor.get_engine_name(),
+                    "uptime_seconds": round(time.time() - self.started, 1),
+                    "stats": self.batcher.snapshot(),
+                    "cascade": self._redactor.get_cascade_stats()}
+        if op == "extract":
+            if message.get("engine") != self.engine:
+                return {"ok": False, "error": f"Server hat Engine '{self.engine}' geladen"}
+            entities, cascade = self.batcher.submit(message.get("texts") or [], message.get("config"))
+            return {"ok": True, "entities": entities, "cascade": cascade}
+        return {"ok": False, "error": f"Unbekannte Operation: {op}"}
+
+
+def _socket_in_use(path):
+    """True, wenn unter path bereits ein Server antwortet."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def run_server(path=None, engine="flair", window=BATCH_WINDOW, max_texts=BATCH_MAX_TEXTS):
+    """Lädt die Modelle und bedient Anfragen, bis SIGTERM/Strg+C kommt."""
+    path = path or NER_SERVER_SOCKET
+    # Der Server selbst rechnet immer lokal
+    set_ner_server(mode="off")
+
+    import docx_redactor
+    if os.path.exists(path):
+        if _socket_in_use(path):
+            print(f"Unter {path} läuft bereits ein NER-Server.")
+            return 1
+        os.remove(path)
+
+    docx_redactor.set_ner_engine(engine)
+    docx_redactor.warmup_ner_engine()
+    # Falls Flair nicht geladen werden konnte, ist spaCy aktiv
+    engine = docx_redactor.get_ner_engine()
+
+    server = NERServer(path, engine, window, max_texts)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"NER-Server bereit: {path} ({docx_redactor.get_engine_name()}, "
+          f"Batch-Fenster {window * 1000:.0f} ms, max. {max_texts} Texte)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+        stats = server.batcher.snapshot()
+        print(f"NER-Server beendet: {stats['requests']} Anfragen, {stats['texts']} Texte in "
+              f"{stats['batches']} Batches (Ø {stats['avg_batch']} Texte pro Batch)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler NER-Server mit Micro-Batching")
+    parser.add_argument("--engine", choices=("flair", "flair-int8", "spacy"), default="flair")
+    parser.add_argument("--socket", default=None, help=f"Socket-Pfad (Standard: {NER_SERVER_SOCKET})")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="Wartezeit für das Sammeln gleichzeitiger Anfragen")
+    parser.add_argument("--max-batch", type=int, default=BATCH_MAX_TEXTS,
+                        help="höchstens so viele Texte pro Modell-Aufruf")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Flair-Kaskade für Clients ohne eigene Einstellung "
+                             "(sonst gilt die Einstellung des Clients)")
+    args = parser.parse_args(argv)
+    if args.cascade:
+        import docx_redactor
+        docx_redactor.set_flair_cascade(enabled=True)
+    return run_server(args.socket, args.engine, args.window_ms / 1000, args.max_batch)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
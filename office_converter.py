@@ -0,0 +1,375 @@
+"""
+Konvertierungsdienst mit vorgewärmten LibreOffice-Instanzen.
+
+- N Instanzen, jede mit eigenem Benutzerprofil (-env:UserInstallation), damit sich
+  gleichzeitige Konvertierungen nicht gegenseitig blockieren
+- Ist das Python-Modul `uno` verfügbar, laufen die Instanzen dauerhaft und bekommen
+  die Dateien über einen lokalen UNO-Socket (kein Kaltstart pro Datei)
+- Sonst: mehrere Dateien pro soffice-Aufruf (Batch) mit bereits initialisiertem Profil
+- Zeitlimit pro Datei (auch im Batch: ohne neue Ausgabedatei innerhalb des Limits
+  gilt der Aufruf als hängend); hängende Instanzen werden beendet und neu gestartet
+- DOC → PDF direkt in einem Schritt (ohne Umweg über DOCX)
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Anzahl gleichzeitiger LibreOffice-Instanzen
+OFFICE_INSTANCES = max(1, min(4, (os.cpu_count() or 1) // 2))
+# Zeitlimit pro Datei in Sekunden
+OFFICE_JOB_TIMEOUT = 120
+# Wartezeit auf den UNO-Socket einer frisch gestarteten Instanz
+OFFICE_STARTUP_TIMEOUT = 60
+# So oft wird im Batch-Betrieb nach neuen Ausgabedateien geschaut (Sekunden)
+OFFICE_POLL_INTERVAL = 0.5
+
+# Zielformat → (Export-Filter für UNO, Ziel für --convert-to)
+OUTPUT_FILTERS = {
+    "pdf": ("writer_pdf_Export", "pdf"),
+    "docx": ("MS Word 2007 XML", "docx"),
+}
+
+
+def find_soffice():
+    """Sucht die LibreOffice-Programmdatei (macOS-Pfad, sonst PATH)."""
+    mac_path = "/Applications/LibreOffice.app/Contents/MacOS/soffice"
+    if os.path.exists(mac_path):
+        return mac_path
+    return shutil.which("soffice") or shutil.which("libreoffice") or "soffice"
+
+
+def _uno_available():
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _popen(args, capture=True):
+    """Startet soffice in einer eigenen Prozessgruppe (soffice startet soffice.bin als Kindprozess)."""
+    output = subprocess.PIPE if capture else subprocess.DEVNULL
+    return subprocess.Popen(args, stdout=output, stderr=output,
+                            start_new_session=hasattr(os, "killpg"))
+
+
+def _kill(process):
+    """Beendet soffice samt Kindprozessen."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def _profile_url(path):
+    return "file://" + os.path.abspath(path).replace(os.sep, "/")
+
+
+class ConversionError(Exception):
+    pass
+
+
+# ==================== INSTANZ ====================
+
+class OfficeInstance:
+    """Eine LibreOffice-Instanz mit eigenem Profil."""
+
+    def __init__(self, soffice, use_uno):
+        self.soffice = soffice
+        self.use_uno = use_uno
+        self.profile_dir = tempfile.mkdtemp(prefix="lo_profile_")
+        self.process = None
+        self.port = None
+        self._desktop = None
+
+    def _base_args(self):
+        return [self.soffice, f"-env:UserInstallation={_profile_url(self.profile_dir)}",
+                "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+                "--nofirststartwizard"]
+
+    # ---------- UNO-Betrieb ----------
+
+    def start(self):
+        """Startet die Instanz (nur im UNO-Betrieb dauerhaft) und verbindet sich."""
+        if not self.use_uno or self.process is not None:
+            return
+        import uno
+        self.port = _free_port()
+        accept = f"socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        # Dauerhaft laufend → Ausgabe verwerfen (volle Pipes würden soffice blockieren)
+        self.process = _popen(self._base_args() + [f"--accept={accept}"], capture=False)
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + OFFICE_STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:{accept}")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError("LibreOffice-Instanz konnte nicht gestartet werden")
+                time.sleep(0.25)
+        self._desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def stop(self):
+        """Beendet die Instanz (das Profil bleibt für einen Neustart erhalten)."""
+        self._desktop = None
+        if self.process is not None:
+            _kill(self.process)
+            self.process = None
+
+    def restart(self):
+        print("  LibreOffice-Instanz hängt — wird neu gestartet.")
+        self.stop()
+        self.start()
+
+    def _uno_convert(self, input_path, output_path, output_format):
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        doc = self._desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+            (prop("Hidden", True), prop("ReadOnly", True)))
+        if doc is None:
+            raise ConversionError(f"Datei konnte nicht geöffnet werden: {input_path}")
+        try:
+            doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                           (prop("FilterName", OUTPUT_FILTERS[output_format][0]),))
+        finally:
+            doc.close(True)
+
+    def convert_uno(self, input_path, output_path, output_format):
+        """Konvertiert eine Datei über UNO; bei Zeitüberschreitung wird die Instanz neu gestartet."""
+        self.start()
+        # Watchdog: beendet die Instanz, falls der Aufruf hängt (der UNO-Aufruf bricht dann ab)
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            self.stop()
+
+        watchdog = threading.Timer(OFFICE_JOB_TIMEOUT, on_timeout)
+        watchdog.start()
+        try:
+            self._uno_convert(input_path, output_path, output_format)
+        except Exception as e:
+            if timed_out.is_set():
+                self.start()
+                raise ConversionError(f"Zeitüberschreitung nach {OFFICE_JOB_TIMEOUT}s: {input_path}")
+            # Verbindung verloren → Instanz für den nächsten Auftrag neu starten
+            if self.process is None or self.process.poll() is not None:
+                self.restart()
+            raise ConversionError(str(e))
+        finally:
+            watchdog.cancel()
+
+    # ---------- Batch-Betrieb (ohne UNO) ----------
+
+    def convert_batch(self, input_paths, output_format, outdir):
+        """
+        Konvertiert mehrere Dateien in einem soffice-Aufruf nach outdir.
+        Zeitlimit pro Datei: entsteht OFFICE_JOB_TIMEOUT Sekunden lang keine neue
+        Ausgabedatei, wird der Aufruf beendet — eine hängende Datei blockiert den
+        Batch also höchstens einmal das Limit, nicht das Limit × Anzahl Dateien.
+        """
+        args = self._base_args() + ["--convert-to", OUTPUT_FILTERS[output_format][1],
+                                    "--outdir", outdir] + list(input_paths)
+        process = _popen(args)
+        produced = len(os.listdir(outdir))
+        deadline = time.monotonic() + OFFICE_JOB_TIMEOUT
+        while True:
+            try:
+                _, stderr = process.communicate(timeout=OFFICE_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                count = len(os.listdir(outdir))
+                if count > produced:
+                    produced = count
+                    deadline = time.monotonic() + OFFICE_JOB_TIMEOUT
+                elif time.monotonic() > deadline:
+                    _kill(process)
+                    raise ConversionError(f"Zeitüberschreitung nach {OFFICE_JOB_TIMEOUT}s ohne Fortschritt")
+        if process.returncode != 0:
+            raise ConversionError(stderr.decode(errors="replace").strip()
+                                  or f"soffice beendet mit Code {process.returncode}")
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+# ==================== DIENST ====================
+
+class ConversionService:
+    """Verteilt Konvertierungsaufträge auf N LibreOffice-Instanzen."""
+
+    def __init__(self, instances=None, soffice=None, use_uno=None):
+        self.soffice = soffice or find_soffice()
+        self.use_uno = _uno_available() if use_uno is None else use_uno
+        count = instances or OFFICE_INSTANCES
+        self.instances = [OfficeInstance(self.soffice, self.use_uno) for _ in range(count)]
+        self._free = queue.Queue()
+        for instance in self.instances:
+            self._free.put(instance)
+
+    def _with_instance(self, func, *args):
+        instance = self._free.get()
+        try:
+            return func(instance, *args)
+        finally:
+            self._free.put(instance)
+
+    def _convert_one_uno(self, instance, job):
+        input_path, output_path, output_format = job
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        instance.convert_uno(input_path, output_path, output_format)
+
+    def _convert_chunk_cli(self, instance, chunk, output_format):
+        """Ein soffice-Aufruf für mehrere Dateien; Ergebnisse an die Zielpfade verschieben."""
+        errors = {}
+        outdir = tempfile.mkdtemp(prefix="lo_out_")
+        try:
+            remaining = list(range(len(chunk)))
+            while remaining:
+                try:
+                    instance.convert_batch([chunk[i][0] for i in remaining], output_format, outdir)
+                    break
+                except ConversionError as e:
+                    # soffice arbeitet die Dateien der Reihe nach ab: die erste ohne
+                    # Ausgabe ist die fehlerhafte — sie fällt aus, der Rest läuft erneut
+                    remaining = [i for i in remaining if not os.path.exists(
+                        self._cli_output(outdir, chunk[i][0], output_format))]
+                    if remaining:
+                        errors[remaining.pop(0)] = e
+            for i, (input_path, output_path, _) in enumerate(chunk):
+                if i in errors:
+                    continue
+                produced = self._cli_output(outdir, input_path, output_format)
+                if os.path.exists(produced):
+                    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+                    shutil.move(produced, output_path)
+                else:
+                    errors[i] = ConversionError(f"Keine Ausgabe erzeugt: {input_path}")
+        finally:
+            shutil.rmtree(outdir, ignore_errors=True)
+        return errors
+
+    @staticmethod
+    def _cli_output(outdir, input_path, output_format):
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(outdir, f"{base}.{OUTPUT_FILTERS[output_format][1]}")
+
+    def _cli_chunks(self, jobs):
+        """
+        Teilt die Aufträge in Batches pro Instanz und Zielformat. Dateien mit gleichem
+        Basisnamen kommen in verschiedene Batches (soffice benennt nach dem Basisnamen).
+        """
+        chunks = []
+        for output_format in OUTPUT_FILTERS:
+            indexed = [(i, job) for i, job in enumerate(jobs) if job[2] == output_format]
+            per_instance = [[] for _ in self.instances]
+            names = [set() for _ in self.instances]
+            for n, (i, job) in enumerate(indexed):
+                base = os.path.splitext(os.path.basename(job[0]))[0]
+                slot = n % len(self.instances)
+                if base in names[slot]:
+                    chunks.append((output_format, [(i, job)]))
+                    continue
+                names[slot].add(base)
+                per_instance[slot].append((i, job))
+            chunks.extend((output_format, chunk) for chunk in per_instance if chunk)
+        return chunks
+
+    def convert_many(self, jobs):
+        """
+        Konvertiert viele Dateien parallel.
+        jobs: Liste von (Eingabepfad, Ausgabepfad, Zielformat "pdf"/"docx")
+        Gibt pro Auftrag None (Erfolg) oder die Fehlermeldung zurück.
+        """
+        results = [None] * len(jobs)
+        if not jobs:
+            return results
+
+        with ThreadPoolExecutor(max_workers=len(self.instances)) as pool:
+            if self.use_uno:
+                futures = {pool.submit(self._with_instance, self._convert_one_uno, job): [i]
+                           for i, job in enumerate(jobs)}
+            else:
+                futures = {}
+                for output_format, chunk in self._cli_chunks(jobs):
+                    future = pool.submit(self._with_instance, self._convert_chunk_cli,
+                                         [job for _, job in chunk], output_format)
+                    futures[future] = [i for i, _ in chunk]
+
+            for future, indices in futures.items():
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = {n: e for n in range(len(indices))}
+                for n, error in (outcome or {}).items():
+                    results[indices[n]] = str(error)
+        return results
+
+    def convert(self, input_path, output_path, output_format="pdf"):
+        """Konvertiert eine Datei; wirft ConversionError bei Fehlern."""
+        error = self.convert_many([(input_path, output_path, output_format)])[0]
+        if error:
+            raise ConversionError(error)
+
+    def close(self):
+        for instance in self.instances:
+            instance.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_conversion_service():
+    """Gemeinsamer Konvertierungsdienst (Instanzen werden beim ersten Auftrag gestartet)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConversionService()
+            atexit.register(shutdown_conversion_service)
+        return _service
+
+
+def shutdown_conversion_service():
+    """Beendet alle LibreOffice-Instanzen und löscht ihre Profile."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+            _service = None
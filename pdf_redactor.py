@@ -1,154 +1,348 @@
 import fitz  # PyMuPDF
+import os
 import re
-from docx_redactor import (EntityMapper, ACTIVE_REGEX_PATTERNS,
-                            extract_entities, is_whitelisted, _should_skip_entity,
-                            _is_grundbuch_fraction, is_learned_never_redact,
-                            get_learned_always_redact)
-from llm_api import redact_text_api
+from docx_redactor import (EntityMapper, get_regex_scanner,
+                            extract_entities, _should_redact_entity,
+                            _is_grundbuch_fraction, find_always_redact,
+                            prefetch_entities, clear_prefetched_entities)
+from llm_api import redact_texts_api
+import worker_pool
+from tracing import span, add_document_counts
 
+# Seiten pro NER-Batch (begrenzt den Speicher für Zeichen-Indizes bei großen PDFs)
+PDF_PAGE_CHUNK = 32
 
-def redact_pdf(file_path, output_path, mapper=None):
+# Parallelmodus erst ab dieser Seitenzahl (darunter überwiegt der Pool-Overhead)
+PDF_PARALLEL_MIN_PAGES = 16
+
+FRACTION_PATTERN = re.compile(r'\d{1,6}\s*/\s*\d{1,6}')
+
+TITLE_PATTERN = re.compile(
+    r'\b(?:Herr|Frau|Dr\.|Prof\.|Mag\.|RA|RAin)\s+[A-ZÄÖÜ][a-zäöüß]+(?:\s+[A-ZÄÖÜ][a-zäöüß]+)?\b'
+)
+
+
+class PageTextIndex:
+    """
+    Zeichen-Index einer PDF-Seite: der extrahierte Seitentext plus die Bounding-Box
+    jedes Zeichens. Ein erkannter Span (start, end) im Seitentext wird per direktem
+    Lookup zu Schwärzungs-Rechtecken — ohne page.search_for() und nur für genau
+    diese Fundstelle.
+    """
+
+    def __init__(self, page):
+        chars = []
+        boxes = []
+        lines = []
+        line_no = 0
+        raw = page.get_text("rawdict", flags=fitz.TEXTFLAGS_TEXT)
+        for block in raw.get("blocks", []):
+            if block.get("type", 0) != 0:
+                continue  # nur Textblöcke
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    for char in span.get("chars", []):
+                        chars.append(char["c"])
+                        boxes.append(char["bbox"])
+                        lines.append(line_no)
+                # Zeilenende wie bei page.get_text()
+                chars.append("\n")
+                boxes.append(None)
+                lines.append(line_no)
+                line_no += 1
+        self.text = "".join(chars)
+        self._boxes = boxes
+        self._lines = lines
+
+    def rects(self, start, end):
+        """Gibt die Rechtecke für den Textbereich [start, end) zurück (eines pro Zeile)."""
+        rects = []
+        current_line = None
+        current = None
+        for i in range(start, end):
+            box = self._boxes[i]
+            # Zeilenumbrüche und Leerzeichen am Rand nicht mitschwärzen
+            if box is None or self.text[i].isspace():
+                continue
+            if self._lines[i] != current_line:
+                if current is not None:
+                    rects.append(current)
+                current_line = self._lines[i]
+                current = fitz.Rect(box)
+            else:
+                current |= box
+        if current is not None:
+            rects.append(current)
+        return rects
+
+
+def _protected_numbers(page_text):
+    """Zähler und Nenner von Brüchen (Grundbuch-Anteile) auf der Seite."""
+    protected = set()
+    for frac_match in FRACTION_PATTERN.finditer(page_text):
+        for part in re.split(r'\s*/\s*', frac_match.group()):
+            part = part.strip()
+            if part:
+                protected.add(part)
+    return protected
+
+
+def _detect_page_spans(page_text, mapper):
+    """
+    Erkennt alle zu schwärzenden Bereiche im Seitentext.
+    Gibt eine sortierte Liste von (start, end) Zeichen-Offsets zurück.
+    """
+    protected_numbers = _protected_numbers(page_text)
+    spans = set()
+
+    # === 1. Regex-basierte Schwärzung ===
+    # Alle Treffer aller Muster (auch überlappend) — geschwärzt wird die Vereinigung
+    for start, end, replacement in get_regex_scanner().scan_all(page_text):
+        matched_str = page_text[start:end]
+        # Grundbuch-Brüche (128/542) nicht schwärzen
+        if _is_grundbuch_fraction(matched_str):
+            continue
+        # Auch Teile von Brüchen schützen (Zähler/Nenner einzeln)
+        if matched_str.strip() in protected_numbers:
+            continue
+        spans.add((start, end))
+
+    # === 2. NER-basierte Schwärzung (Flair oder spaCy) ===
+    for ent in extract_entities(page_text, mapper):
+        ent_text = ent["text"].strip()
+        if not _should_redact_entity(dict(ent, text=ent_text), mapper):
+            continue
+        # Bruch-Bestandteile nicht schwärzen
+        if len(ent_text) > 1 and ent_text not in protected_numbers:
+            spans.add((ent["start"], ent["end"]))
+            mapper.get_placeholder(ent_text, ent["label"])
+
+    # === 3. Titel + Name Muster (konservativ) ===
+    for match in TITLE_PATTERN.finditer(page_text):
+        spans.add(match.span())
+
+    # === 4. Gelernte "immer schwärzen"-Begriffe ===
+    for start, end, term, label in find_always_redact(page_text):
+        spans.add((start, end))
+        mapper.get_placeholder(term, label)
+
+    return sorted(spans)
+
+
+def _page_mapper(sensitivity, confidence_threshold):
+    mapper = EntityMapper(sensitivity=sensitivity)
+    mapper.confidence_threshold = confidence_threshold
+    return mapper
+
+
+def _detect_pages(doc, first, last, sensitivity, confidence_threshold):
+    """
+    Erkennung für die Seiten [first, last) eines geöffneten Dokuments.
+    Gibt pro Seite ein Ergebnis zurück: Schwärzungs-Rechtecke sowie die erkannten
+    bzw. übersprungenen Entities (aus einem eigenen Mapper pro Seite, damit die
+    Ergebnisse später in Seitenreihenfolge zusammengeführt werden können).
+    """
+    results = []
+    # Seiten blockweise: Zeichen-Index aufbauen, NER für den Block in einem Batch rechnen
+    for chunk_start in range(first, last, PDF_PAGE_CHUNK):
+        pages = [doc[i] for i in range(chunk_start, min(chunk_start + PDF_PAGE_CHUNK, last))]
+        with span("pdf.extract", pages=len(pages)):
+            indices = [PageTextIndex(page) for page in pages]
+        with span("pdf.ner", pages=len(pages)):
+            prefetch_entities([index.text for index in indices])
+        try:
+            with span("pdf.locate", pages=len(pages)):
+                for page, index in zip(pages, indices):
+                    page_mapper = _page_mapper(sensitivity, confidence_threshold)
+                    rects = []
+                    if index.text.strip():
+                        for start, end in _detect_page_spans(index.text, page_mapper):
+                            rects.extend(tuple(rect) for rect in index.rects(start, end))
+                    results.append({
+                        "page": page.number,
+                        "rects": rects,
+                        "entities": {
+                            "PER": list(page_mapper.person_mapping),
+                            "ORG": list(page_mapper.org_mapping),
+                            "LOC": list(page_mapper.loc_mapping),
+                        },
+                        "skipped_whitelist": page_mapper.skipped_whitelist,
+                        "skipped_low_confidence": page_mapper.skipped_low_confidence,
+                        "skipped_org_juristic": page_mapper.skipped_org_juristic,
+                    })
+        finally:
+            clear_prefetched_entities()
+    return results
+
+
+def _merge_page_result(mapper, result):
+    """Überträgt das Ergebnis einer Seite in den gemeinsamen EntityMapper."""
+    for label, texts in result["entities"].items():
+        for text in texts:
+            mapper.get_placeholder(text, label)
+    mapper.skipped_whitelist.extend(result["skipped_whitelist"])
+    mapper.skipped_low_confidence.extend(result["skipped_low_confidence"])
+    mapper.skipped_org_juristic.extend(result["skipped_org_juristic"])
+
+
+def _apply_page_redactions(page, rects):
+    for rect in rects:
+        page.add_redact_annot(fitz.Rect(rect), fill=(0, 0, 0))
+    if rects:
+        page.apply_redactions()
+
+
+# ==================== PARALLELMODUS ====================
+
+def _detect_page_range(file_path, first, last, sensitivity, confidence_threshold):
+    """Worker: öffnet ein eigenes fitz-Handle und erkennt die Seiten [first, last)."""
+    doc = fitz.open(file_path)
+    try:
+        if last is None:
+            last = doc.page_count
+        return _detect_pages(doc, first, last, sensitivity, confidence_threshold)
+    finally:
+        doc.close()
+
+
+def detect_pdf(file_path, sensitivity, confidence_threshold):
+    """Erkennung für ein ganzes PDF ohne zu schwärzen (z.B. in einem Batch-Worker)."""
+    return _detect_page_range(file_path, 0, None, sensitivity, confidence_threshold)
+
+
+def _apply_pdf_results(doc, results, mapper):
+    add_document_counts(pages=doc.page_count)
+    # Zusammenführen in Seitenreihenfolge → Platzhalter wie bei sequentieller Verarbeitung
+    with span("pdf.apply", pages=len(results)):
+        for result in sorted(results, key=lambda r: r["page"]):
+            _merge_page_result(mapper, result)
+            _apply_page_redactions(doc[result["page"]], result["rects"])
+
+
+def _save_pdf(doc, output_path):
+    with span("pdf.save") as save_span:
+        doc.save(output_path)
+        save_span.add(bytes=os.path.getsize(output_path))
+
+
+def apply_pdf_detection(file_path, output_path, results, mapper):
+    """Wendet ein Ergebnis von detect_pdf() an und speichert das geschwärzte PDF."""
+    doc = fitz.open(file_path)
+    _apply_pdf_results(doc, results, mapper)
+    _save_pdf(doc, output_path)
+    print(f"PDF-Redaktion abgeschlossen: {output_path}")
+    return mapper
+
+
+def _detect_pages_parallel(file_path, page_count, mapper, workers):
+    """
+    Verteilt die Erkennung in zusammenhängenden Seitenbereichen auf die Worker des
+    langlebigen Pools (worker_pool) — die Modelle sind dort nach dem ersten PDF geladen.
+    """
+    workers = worker_pool.worker_limit(workers)
+    # Etwas mehr Bereiche als Worker, damit ungleich dichte Seiten sich ausgleichen
+    range_size = max(1, -(-page_count // (workers * 2)))
+    ranges = [(first, min(first + range_size, page_count))
+              for first in range(0, page_count, range_size)]
+
+    settings = worker_pool.task_settings(sensitivity=mapper.sensitivity)
+    futures = [worker_pool.submit_task(workers, settings, _detect_page_range, file_path, first, last,
+                                       mapper.sensitivity, mapper.confidence_threshold)
+               for first, last in ranges]
+    results = []
+    try:
+        for future in futures:
+            results.extend(future.result())
+    finally:
+        for future in futures:
+            future.cancel()
+    return sorted(results, key=lambda r: r["page"])
+
+
+def redact_pdf(file_path, output_path, mapper=None, workers=None):
     """
     Liest eine PDF-Datei, erkennt sensible Daten per Regex UND NER (Flair/spaCy)
     und schwärzt die entsprechenden Bereiche.
+    workers: Anzahl Prozesse für die seitenparallele Erkennung (None/1 = sequentiell).
     """
     if mapper is None:
         mapper = EntityMapper()
 
     doc = fitz.open(file_path)
 
-    # Brüche im gesamten Dokument sammeln (für Schutz)
-    fraction_pattern = re.compile(r'\d{1,6}\s*/\s*\d{1,6}')
-
-    for page in doc:
-        page_text = page.get_text()
-        if not page_text or not page_text.strip():
-            continue
+    if workers and workers > 1 and doc.page_count >= PDF_PARALLEL_MIN_PAGES:
+        # Die Stufen der Worker-Prozesse werden nicht einzeln erfasst
+        with span("pdf.detect_parallel", pages=doc.page_count):
+            results = _detect_pages_parallel(file_path, doc.page_count, mapper, workers)
+    else:
+        results = _detect_pages(doc, 0, doc.page_count,
+                                mapper.sensitivity, mapper.confidence_threshold)
 
-        # Alle Bruch-Bestandteile auf dieser Seite sammeln
-        protected_numbers = set()
-        for frac_match in fraction_pattern.finditer(page_text):
-            frac_text = frac_match.group()
-            # Zähler und Nenner einzeln schützen
-            parts = re.split(r'\s*/\s*', frac_text)
-            for part in parts:
-                part = part.strip()
-                if part:
-                    protected_numbers.add(part)
-
-        redaction_areas = []
-
-        # === 1. Regex-basierte Schwärzung ===
-        for pattern, replacement in ACTIVE_REGEX_PATTERNS:
-            for match in pattern.finditer(page_text):
-                matched_str = match.group()
-                # Grundbuch-Brüche (128/542) nicht schwärzen
-                if _is_grundbuch_fraction(matched_str):
-                    continue
-                # Auch Teile von Brüchen schützen (Zähler/Nenner einzeln)
-                if matched_str.strip() in protected_numbers:
-                    continue
-                areas = page.search_for(matched_str)
-                redaction_areas.extend(areas)
-
-        # === 2. NER-basierte Schwärzung (Flair oder spaCy) ===
-        entities = extract_entities(page_text, mapper)
-        for ent in entities:
-            ent_text = ent["text"].strip()
-            ent_label = ent["label"]
-            score = ent["score"]
-
-            # Gelernt: NIE schwärzen
-            if is_learned_never_redact(ent_text):
-                mapper.skipped_whitelist.append((ent_text, ent_label))
-                continue
-            if is_whitelisted(ent_text, ent_label):
-                mapper.skipped_whitelist.append((ent_text, ent_label))
-                continue
-            # Juristische Personen bei konservativ nicht schwärzen
-            if ent_label == "ORG" and mapper.sensitivity == "konservativ":
-                mapper.skipped_org_juristic.append((ent_text, ent_label))
-                continue
-            if score < mapper.confidence_threshold:
-                mapper.skipped_low_confidence.append((ent_text, ent_label, score))
-                continue
-            if _should_skip_entity(ent_text, ent_label):
-                continue
+    _apply_pdf_results(doc, results, mapper)
 
-            if len(ent_text) > 1:
-                # Bruch-Bestandteile nicht schwärzen
-                if ent_text in protected_numbers:
-                    continue
-                areas = page.search_for(ent_text)
-                redaction_areas.extend(areas)
-
-        # === 3. Titel + Name Muster (konservativ) ===
-        title_pattern = re.compile(
-            r'\b(?:Herr|Frau|Dr\.|Prof\.|Mag\.|RA|RAin)\s+[A-ZÄÖÜ][a-zäöüß]+(?:\s+[A-ZÄÖÜ][a-zäöüß]+)?\b'
-        )
-        for match in title_pattern.finditer(page_text):
-            areas = page.search_for(match.group())
-            redaction_areas.extend(areas)
-
-        # === 4. Gelernte "immer schwärzen"-Begriffe ===
-        always = get_learned_always_redact()
-        for label, terms in always.items():
-            for term in terms:
-                if term in page_text:
-                    areas = page.search_for(term)
-                    redaction_areas.extend(areas)
-
-        # Schwärzung anwenden
-        for rect in redaction_areas:
-            page.add_redact_annot(rect, fill=(0, 0, 0))
-        page.apply_redactions()
-
-    doc.save(output_path)
+    _save_pdf(doc, output_path)
     print(f"PDF-Redaktion abgeschlossen: {output_path}")
     return mapper
 
 
+def _api_redacted_chunks(paragraph, redacted_paragraph):
+    """Originalwort-Folgen, die in der API-Antwort durch [REDACTED] ersetzt wurden."""
+    original_words = paragraph.split()
+    redacted_words = redacted_paragraph.split()
+    chunks = []
+
+    i = 0
+    while i < len(original_words):
+        if i < len(redacted_words) and '[REDACTED]' in redacted_words[i]:
+            redact_start = i
+            j = i + 1
+            while j < len(redacted_words) and '[REDACTED]' in redacted_words[j]:
+                j += 1
+            original_chunk = ' '.join(original_words[redact_start:redact_start + (j - i)])
+            if original_chunk:
+                chunks.append(original_chunk)
+            i = j
+        else:
+            i += 1
+    return chunks
+
+
 def redact_pdf_api(input_pdf, output_pdf):
     """
     Verarbeitet ein PDF über die OpenAI API und wendet echte Schwärzung an.
+    Alle Zeilen des Dokuments werden gleichzeitig angefragt (siehe redact_texts_api).
     """
     try:
         doc = fitz.open(input_pdf)
 
+        # 1. Zeilen aller Seiten sammeln
+        page_paragraphs = []
         for page in doc:
             text = page.get_text("text")
             if not text or not text.strip():
                 continue
-
             paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
+            paragraphs = [p for p in paragraphs if len(p) >= 5]
+            if paragraphs:
+                page_paragraphs.append((page, paragraphs))
 
+        # 2. Gleichzeitig an die API schicken (Ergebnisse in Eingabereihenfolge)
+        all_paragraphs = [p for _, paragraphs in page_paragraphs for p in paragraphs]
+        redacted_iter = iter(redact_texts_api(all_paragraphs))
+
+        # 3. Schwärzungen pro Seite anwenden
+        for page, paragraphs in page_paragraphs:
+            changed = False
             for paragraph in paragraphs:
-                if len(paragraph) < 5:
+                redacted_paragraph = next(redacted_iter)
+                if redacted_paragraph == paragraph:
                     continue
-
-                redacted_paragraph = redact_text_api(paragraph)
-
-                if redacted_paragraph != paragraph:
-                    original_words = paragraph.split()
-                    redacted_words = redacted_paragraph.split()
-
-                    i = 0
-                    while i < len(original_words):
-                        if i < len(redacted_words) and '[REDACTED]' in redacted_words[i]:
-                            redact_start = i
-                            j = i + 1
-                            while j < len(redacted_words) and '[REDACTED]' in redacted_words[j]:
-                                j += 1
-                            original_chunk = ' '.join(original_words[redact_start:redact_start + (j - i)])
-                            if original_chunk:
-                                areas = page.search_for(original_chunk)
-                                for rect in areas:
-                                    page.add_redact_annot(rect, fill=(0, 0, 0))
-                            i = j
-                        else:
-                            i += 1
-
-                    page.apply_redactions()
+                for original_chunk in _api_redacted_chunks(paragraph, redacted_paragraph):
+                    for rect in page.search_for(original_chunk):
+                        page.add_redact_annot(rect, fill=(0, 0, 0))
+                        changed = True
+            if changed:
+                page.apply_redactions()
 
         doc.save(output_pdf)
         print(f"API-basierte PDF-Schwärzung abgeschlossen: {output_pdf}")
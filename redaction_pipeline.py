@@ -0,0 +1,185 @@
+"""
+Verarbeitungs-Pipeline der Web-App (ohne Streamlit):
+Konvertierung → Schwärzung (parallel über alle Dokumente) → optionale API-Nachbearbeitung.
+
+Läuft in einem Worker-Prozess der Job-Queue (siehe job_queue.py). Fortschritt
+wird über einen Callback gemeldet, Abbruch über eine Abfrage-Funktion geprüft.
+"""
+
+import os
+import shutil
+
+from docx_redactor import (process_docx_api, EntityMapper, set_sensitivity,
+                           set_ner_engine, get_ner_engine, warmup_ner_engine,
+                           set_flair_cascade, get_cascade_stats, reset_cascade_stats,
+                           refresh_learned_entities)
+from pdf_redactor import redact_pdf_api
+from file_converter import convert_office_files
+from batch_executor import make_job, run_batch, default_worker_count, BatchCancelled
+from llm_api import reset_api_stats, get_api_stats
+import tracing
+
+
+def prepare_work_dir(work_dir):
+    """Legt die Unterordner input/converted/redacted an und gibt sie zurück."""
+    dirs = {name: os.path.join(work_dir, name) for name in ("input", "converted", "redacted")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    return dirs
+
+
+def _collect_jobs(input_dir, conv_dir, redacted_dir, convert_pdf):
+    """
+    Plant Konvertierungen und Schwärzungsaufträge für alle Dateien im Eingabeordner.
+    Gibt (Konvertierungen, [(Auftrag, Ergebnis-Info)]) zurück.
+    """
+    jobs = []
+    pdf_files_to_process = []
+    conversions = []
+
+    for file in os.listdir(input_dir):
+        full_path = os.path.join(input_dir, file)
+        if not os.path.isfile(full_path):
+            continue
+
+        filename, ext = os.path.splitext(file)
+        ext = ext.lower()
+
+        if ext == ".docx":
+            if convert_pdf:
+                # DOCX -> PDF konvertieren, dann PDF schwärzen
+                output_pdf = os.path.join(conv_dir, filename + ".pdf")
+                conversions.append((full_path, output_pdf, "pdf"))
+                pdf_files_to_process.append((output_pdf, filename))
+            else:
+                # DOCX direkt schwärzen
+                output_docx = os.path.join(redacted_dir, file)
+                jobs.append((make_job("docx", full_path, output_docx),
+                             {"name": file, "path": output_docx, "type": "docx"}))
+
+        elif ext == ".doc":
+            if convert_pdf:
+                # DOC -> PDF direkt in einem Schritt
+                output_pdf = os.path.join(conv_dir, filename + ".pdf")
+                conversions.append((full_path, output_pdf, "pdf"))
+                pdf_files_to_process.append((output_pdf, filename))
+            else:
+                # DOC -> DOCX -> schwärzen
+                docx_path = os.path.join(conv_dir, filename + ".docx")
+                conversions.append((full_path, docx_path, "docx"))
+                output_docx = os.path.join(redacted_dir, filename + ".docx")
+                jobs.append((make_job("docx", docx_path, output_docx),
+                             {"name": filename + ".docx", "path": output_docx, "type": "docx"}))
+
+        elif ext == ".msg":
+            # MSG: Text extrahieren -> schwärzen -> PDF
+            output_pdf = os.path.join(redacted_dir, filename + ".pdf")
+            jobs.append((make_job("msg", full_path, output_pdf),
+                         {"name": filename + ".pdf", "path": output_pdf, "type": "pdf"}))
+
+        elif ext == ".pdf":
+            pdf_files_to_process.append((full_path, filename))
+
+    for pdf_path, pdf_name in pdf_files_to_process:
+        output_pdf = os.path.join(redacted_dir, pdf_name + ".pdf")
+        jobs.append((make_job("pdf", pdf_path, output_pdf),
+                     {"name": pdf_name + ".pdf", "path": output_pdf, "type": "pdf"}))
+
+    return conversions, jobs
+
+
+def run_pipeline(work_dir, engine, sensitivity, convert_pdf, use_api_post, cascade=False,
+                 workers=None, progress=None, cancel=None, trace=True):
+    """
+    Verarbeitet alle Dateien in work_dir/input; die Ergebnisse landen in work_dir/redacted.
+    cascade: Flair-Kaskade (zweites Modell nur wo nötig, siehe set_flair_cascade)
+    trace: Laufzeiten pro Stufe und Dokument erfassen (siehe tracing.py)
+    progress: optionaler Callback progress(anteil 0..1, text)
+    cancel: optionale Funktion, die True liefert, wenn abgebrochen werden soll
+    Gibt ein Dict mit results, mapper, warnings, api_stats, cascade_stats und trace zurück.
+    Wirft BatchCancelled bei Abbruch.
+    """
+    def report(fraction, text):
+        if progress:
+            progress(fraction, text)
+
+    def check_cancel():
+        if cancel and cancel():
+            raise BatchCancelled()
+
+    # Engine & Sensitivität setzen (Modelle bleiben im Worker-Prozess geladen)
+    if get_ner_engine() != engine:
+        set_ner_engine(engine)
+    set_sensitivity(sensitivity)
+    set_flair_cascade(enabled=cascade)
+    reset_cascade_stats()
+    # Korrekturen aus der Web-App (anderer Prozess) übernehmen
+    refresh_learned_entities()
+    tracing.enable_tracing(trace)
+    tracing.reset_batch()
+
+    dirs = prepare_work_dir(work_dir)
+    mapper = EntityMapper(sensitivity=sensitivity)
+    warnings = []
+
+    report(0.0, "Bereite Dateien vor...")
+    conversions, jobs = _collect_jobs(dirs["input"], dirs["converted"], dirs["redacted"], convert_pdf)
+
+    # === Konvertierungen gemeinsam (warme LibreOffice-Instanzen) ===
+    if conversions:
+        check_cancel()
+        report(0.05, f"Konvertiere {len(conversions)} Datei(en)...")
+        converted = set(convert_office_files(conversions))
+        for input_path, output_path, _ in conversions:
+            if output_path not in converted:
+                warnings.append(f"Konvertierung fehlgeschlagen: {os.path.basename(input_path)}")
+        jobs = [(job, res) for job, res in jobs if os.path.exists(job["input"])]
+
+    # === Schwärzung (parallel über alle Dokumente) ===
+    check_cancel()
+    warmup_ner_engine()
+    results = []
+    job_results = {id(job): res for job, res in jobs}
+
+    def on_progress(done, total, job, error):
+        name = os.path.basename(job["input"])
+        report(0.1 + 0.8 * done / total, f"Geschwärzt: {name}")
+        if error is not None:
+            warnings.append(f"Verarbeitung fehlgeschlagen für {name}: {error}")
+        else:
+            results.append(job_results[id(job)])
+
+    report(0.1, f"Schwärze {len(jobs)} Dokument(e)...")
+    if jobs:
+        mapper = run_batch([job for job, _ in jobs], mapper,
+                           workers=workers or default_worker_count(),
+                           progress=on_progress, cancel=cancel)
+
+    # === Optional: API-Nachbearbeitung ===
+    api_stats = None
+    if use_api_post:
+        report(0.9, "API-Nachbearbeitung...")
+        reset_api_stats()
+        for res in results:
+            check_cancel()
+            if res["type"] == "docx":
+                api_path = res["path"].replace(".docx", "_api.docx")
+                process_docx_api(res["path"], api_path)
+                res["path"] = api_path
+                res["name"] = res["name"].replace(".docx", "_api.docx")
+            elif res["type"] == "pdf":
+                api_path = res["path"].replace(".pdf", "_api.pdf")
+                redact_pdf_api(res["path"], api_path)
+                res["path"] = api_path
+                res["name"] = res["name"].replace(".pdf", "_api.pdf")
+        api_stats = get_api_stats()
+
+    # Eingaben und Zwischenstände verwerfen, nur die Ergebnisse bleiben im Arbeitsordner
+    shutil.rmtree(dirs["input"], ignore_errors=True)
+    shutil.rmtree(dirs["converted"], ignore_errors=True)
+
+    report(1.0, "Verarbeitung abgeschlossen!")
+    return {"work_dir": work_dir, "results": results, "mapper": mapper,
+            "warnings": warnings, "api_stats": api_stats,
+            "cascade_stats": get_cascade_stats() if cascade else None,
+            "trace": tracing.batch_report() if trace else None}
@@ -0,0 +1,167 @@
+"""
+Persistenter Ergebnis-Cache auf SQLite-Basis (z.B. für NER-Ergebnisse).
+
+- Schlüssel: beliebige Strings (typischerweise ein Hash über Text + Modellversion)
+- Werte: JSON-serialisierbare Objekte
+- Verdrängung: LRU nach letztem Zugriff, begrenzt über Anzahl und Gesamtgröße
+- Optional: Ablaufzeit (TTL) ab dem Speichern
+- Zähler für Treffer/Fehlschläge pro Prozess
+
+Die Verbindung wird pro Prozess geöffnet, damit der Cache auch aus
+Worker-Prozessen (fork) heraus sicher genutzt werden kann.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+
+class SQLiteCache:
+    """
+    Schlüssel-Wert-Cache in einer SQLite-Datei mit LRU- und Größenbegrenzung.
+    ttl: Lebensdauer eines Eintrags in Sekunden (None = unbegrenzt)
+    """
+
+    # Verdrängung nur alle N Schreibvorgänge prüfen (spart Abfragen)
+    EVICT_EVERY = 200
+
+    def __init__(self, path, max_entries=200_000, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._conn_pid = None
+        self._writes_since_evict = 0
+
+    # ---------- Verbindung ----------
+
+    def _connection(self):
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL DEFAULT 0,"
+                " last_access REAL NOT NULL)"
+            )
+            # Ältere Cache-Dateien ohne Erstellungszeitpunkt nachrüsten
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "created" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    # ---------- Lesen ----------
+
+    def get_many(self, keys):
+        """Gibt ein Dict Schlüssel → Wert für alle gefundenen Schlüssel zurück."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+        conn = self._connection()
+        now = time.time()
+        expired = []
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value, created FROM entries WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, value, created in rows:
+                if self.ttl is not None and now - created > self.ttl:
+                    expired.append((key,))
+                    continue
+                found[key] = json.loads(value)
+        if expired:
+            conn.executemany("DELETE FROM entries WHERE key = ?", expired)
+            conn.commit()
+        if found:
+            conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                             [(now, key) for key in found])
+            conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        """Gibt den Wert zurück oder None, wenn der Schlüssel nicht im Cache ist."""
+        return self.get_many([key]).get(key)
+
+    # ---------- Schreiben ----------
+
+    def put_many(self, items):
+        """Speichert mehrere Schlüssel-Wert-Paare in einer Transaktion."""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            rows.append((key, payload, len(payload), now, now))
+        if not rows:
+            return
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, size, created, last_access)"
+            " VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        self._writes_since_evict += len(rows)
+        if self._writes_since_evict >= self.EVICT_EVERY:
+            self.evict()
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    # ---------- Verwaltung ----------
+
+    def evict(self):
+        """Entfernt abgelaufene und verdrängt die am längsten nicht genutzten Einträge bis zu den Limits."""
+        self._writes_since_evict = 0
+        conn = self._connection()
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            conn.commit()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Auf 90 % der Limits verkleinern, damit nicht bei jedem Schreiben verdrängt wird
+        target_count = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+        removed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if count <= target_count and total <= target_bytes:
+                break
+            removed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM entries")
+        conn.commit()
+
+    def stats(self):
+        """Treffer/Fehlschläge dieses Prozesses sowie Größe des Caches."""
+        conn = self._connection()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
@@ -0,0 +1,67 @@
+"""
+Spool-Verzeichnisse der Web-App (ohne Streamlit, leicht zu importieren).
+
+- Die Ergebnisse einer Sitzung liegen auf der Platte, nicht im Session-State
+- Ein neuer Lauf verwirft den vorigen; verwaiste Verzeichnisse (Browser
+  geschlossen) werden nach SPOOL_MAX_AGE beim nächsten Lauf gelöscht
+- Das ZIP aller Ergebnisse wird einmalig im Spool gebaut
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+SPOOL_ROOT = os.path.join(tempfile.gettempdir(), "dsgvo_redaction_spool")
+SPOOL_MAX_AGE = 12 * 3600  # Sekunden seit der letzten Nutzung
+
+# Bereits komprimierte Formate werden im ZIP nur gespeichert, nicht erneut komprimiert
+ZIP_STORED_EXTENSIONS = (".pdf", ".docx")
+
+
+def cleanup_stale_spools():
+    """Löscht Spool-Verzeichnisse, die länger als SPOOL_MAX_AGE nicht genutzt wurden."""
+    if not os.path.isdir(SPOOL_ROOT):
+        return
+    cutoff = time.time() - SPOOL_MAX_AGE
+    for name in os.listdir(SPOOL_ROOT):
+        path = os.path.join(SPOOL_ROOT, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def discard_spool(spool_dir):
+    """Löscht das Spool-Verzeichnis einer Sitzung samt Ergebnissen (None wird ignoriert)."""
+    if spool_dir:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+def create_spool(previous=None):
+    """Verwirft den vorigen Spool (falls angegeben) und legt ein neues Verzeichnis an."""
+    discard_spool(previous)
+    cleanup_stale_spools()
+    os.makedirs(SPOOL_ROOT, exist_ok=True)
+    return tempfile.mkdtemp(prefix="session_", dir=SPOOL_ROOT)
+
+
+def touch_spool(spool_dir):
+    """Markiert den Spool als genutzt (sonst gilt er nach SPOOL_MAX_AGE als verwaist)."""
+    if spool_dir and os.path.isdir(spool_dir):
+        os.utime(spool_dir)
+
+
+def build_results_zip(results, spool_dir):
+    """Baut das ZIP aller Ergebnisse einmalig im Spool-Verzeichnis und gibt den Pfad zurück."""
+    zip_path = os.path.join(spool_dir, "redacted_documents.zip")
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for res in results:
+            if res["name"].lower().endswith(ZIP_STORED_EXTENSIONS):
+                compress_type = zipfile.ZIP_STORED
+            else:
+                compress_type = zipfile.ZIP_DEFLATED
+            zf.write(res["path"], res["name"], compress_type=compress_type)
+    return zip_path
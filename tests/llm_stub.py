@@ -0,0 +1,121 @@
+"""
+Minimaler lokaler Chat-Completions-Server (OpenAI-kompatibel) für Tests von llm_api.
+
+- POST .../chat/completions antwortet mit "[STUB] <Text der user-Nachricht>"
+- Verhalten pro Text einstellbar: Verzögerung, Fehlerstatus für die ersten N Versuche
+  (z.B. 429 mit Retry-After), siehe StubServer.script()
+- Jede Anfrage wird mit Zeitstempel protokolliert (StubServer.calls), dazu die
+  höchste Zahl gleichzeitig offener Anfragen (StubServer.max_in_flight)
+
+Manuell: python tests/llm_stub.py --port 8765
+         OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python ...
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("content-length", 0)))
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(body)
+        text = request["messages"][-1]["content"]
+        status, headers, delay = stub.begin(text)
+        try:
+            if delay:
+                time.sleep(delay)
+            if status != 200:
+                self._send(status, {"error": {"message": f"stub status {status}", "type": "stub"}}, headers)
+                return
+            content = f"[STUB] {text}"
+            self._send(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": len(text), "completion_tokens": len(content),
+                          "total_tokens": len(text) + len(content)},
+            })
+        finally:
+            stub.end()
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer:
+    """Startet den Server in einem Thread auf 127.0.0.1 (freier Port, falls port=0)."""
+
+    def __init__(self, port=0):
+        self._lock = threading.Lock()
+        self._scripts = {}
+        self.calls = []          # (Text, Startzeit, Status)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def script(self, text, delay=0.0, fail=0, status=429, retry_after=None):
+        """Verhalten für einen Text: erst `fail` Fehlerantworten (status), dann Erfolg."""
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self._scripts[text] = {"delay": delay, "fail": fail, "status": status, "headers": headers}
+
+    def begin(self, text):
+        with self._lock:
+            script = self._scripts.get(text, {"delay": 0.0, "fail": 0})
+            status, headers = 200, {}
+            if script["fail"] > 0:
+                script["fail"] -= 1
+                status, headers = script["status"], script["headers"]
+            self.calls.append((text, time.monotonic(), status))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return status, headers, script["delay"]
+
+    def end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def attempts(self, text):
+        return [(started, status) for t, started, status in self.calls if t == text]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Chat-Completions-Stub")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = StubServer(args.port).start()
+    print(f"Stub bereit: OPENAI_BASE_URL={server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
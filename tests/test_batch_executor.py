@@ -0,0 +1,95 @@
+"""
+run_batch reiht nur ein begrenztes Fenster von Aufträgen ein: der Speicher für
+fertige, noch nicht angewendete Ergebnisse bleibt begrenzt, Abbrechen greift sofort.
+Große Aufträge werden zuerst eingereiht.
+"""
+
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_executor
+from docx_redactor import EntityMapper
+
+
+class _FakePool:
+    """Statt Prozessen: Ergebnis sofort fertig, eingereihte Aufträge werden gezählt."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_task(self, workers, settings, fn, job, *args):
+        self.submitted.append(job["input"])
+        future = Future()
+        future.set_result({"entities": []})
+        return future
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = _FakePool()
+    monkeypatch.setattr(batch_executor.worker_pool, "submit_task", pool.submit_task)
+    monkeypatch.setattr(batch_executor.worker_pool, "worker_limit", lambda workers: workers)
+    return [pool]
+
+
+def _jobs(count):
+    return [batch_executor.make_job("docx", f"in{i}.docx", f"out{i}.docx") for i in range(count)]
+
+
+def _sized_jobs(tmp_path, sizes):
+    jobs = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"in{i}.docx"
+        path.write_bytes(b"x" * size)
+        jobs.append(batch_executor.make_job("docx", str(path), str(tmp_path / f"out{i}.docx")))
+    return jobs
+
+
+def test_submissions_stay_within_window(fake_pool, monkeypatch):
+    applied = []
+    outstanding = []
+
+    def apply_job(job, detection, mapper):
+        applied.append(job["input"])
+        outstanding.append(len(fake_pool[0].submitted) - len(applied) + 1)
+
+    monkeypatch.setattr(batch_executor, "apply_job", apply_job)
+    jobs = _jobs(20)
+    batch_executor.run_batch(jobs, EntityMapper(), workers=3)
+
+    assert applied == [job["input"] for job in jobs]
+    assert fake_pool[0].submitted == applied
+    assert max(outstanding) <= batch_executor.SUBMIT_WINDOW * 3
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_largest_jobs_go_first_in_both_modes(fake_pool, monkeypatch, tmp_path, workers):
+    applied = []
+    monkeypatch.setattr(batch_executor, "apply_job",
+                        lambda job, detection, mapper: applied.append(os.path.basename(job["input"])))
+    monkeypatch.setattr(batch_executor, "_detect_job_traced", lambda *args: {"entities": []})
+    # Das größte Dokument steht zuletzt; gleich große behalten ihre Reihenfolge
+    jobs = _sized_jobs(tmp_path, [10, 300, 10, 50, 10, 5000])
+
+    batch_executor.run_batch(jobs, EntityMapper(), workers=workers)
+
+    assert applied == ["in5.docx", "in1.docx", "in3.docx", "in0.docx", "in2.docx", "in4.docx"]
+    if workers > 1:
+        assert [os.path.basename(p) for p in fake_pool[0].submitted] == applied
+
+
+def test_cancel_stops_submitting(fake_pool, monkeypatch):
+    applied = []
+    monkeypatch.setattr(batch_executor, "apply_job", lambda job, detection, mapper: applied.append(job))
+
+    with pytest.raises(batch_executor.BatchCancelled):
+        batch_executor.run_batch(_jobs(50), EntityMapper(), workers=2,
+                                 cancel=lambda: len(applied) >= 5)
+
+    assert len(applied) == 5
+    assert len(fake_pool[0].submitted) <= 5 + batch_executor.SUBMIT_WINDOW * 2
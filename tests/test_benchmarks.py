@@ -0,0 +1,87 @@
+"""
+Benchmark-Harness: reproduzierbarer Korpus, ein kompletter Lauf ohne NER-Engine
+auf einem Mini-Korpus und der Vergleich zweier Läufe.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("docx")
+pytest.importorskip("fitz")
+
+import corpus
+import docx_redactor
+import ner_server
+import run_benchmarks
+
+
+@pytest.fixture
+def isolated_settings(monkeypatch):
+    """run_benchmarks() schaltet Cache und NER-Server ab — danach wiederherstellen."""
+    monkeypatch.setattr(ner_server, "NER_SERVER_MODE", ner_server.NER_SERVER_MODE)
+    monkeypatch.setattr(docx_redactor, "NER_CACHE_ENABLED", docx_redactor.NER_CACHE_ENABLED)
+    yield
+    docx_redactor.set_ner_cache()
+    ner_server.set_ner_server()
+
+
+def _texts(manifest):
+    return [doc["texts"] for doc in manifest["documents"]]
+
+
+def test_corpus_is_reproducible_per_seed(tmp_path):
+    first = corpus.generate_corpus(str(tmp_path / "a"), 2, 2, 3, seed=5, pdf=False)
+    again = corpus.generate_corpus(str(tmp_path / "b"), 2, 2, 3, seed=5, pdf=False)
+    other = corpus.generate_corpus(str(tmp_path / "c"), 2, 2, 3, seed=6, pdf=False)
+
+    assert _texts(first) == _texts(again) and _texts(first) != _texts(other)
+    assert [doc["kind"] for doc in first["documents"]].count("email") == 3
+    for doc in first["documents"]:
+        path = os.path.join(str(tmp_path / "a"), doc.get("docx") or doc["email"])
+        assert os.path.getsize(path) > 0
+        # Jede eingesetzte personenbezogene Angabe steht auch im Text
+        joined = "\n".join(doc["texts"])
+        assert all(value in joined for values in doc["pii"].values() for value in values)
+
+
+def test_full_run_without_ner_engine(tmp_path, isolated_settings):
+    corpus_dir = str(tmp_path / "korpus")
+    corpus.generate_corpus(corpus_dir, 2, 1, 4, seed=3)
+
+    result = run_benchmarks.run_benchmarks(corpus_dir, engines=[], convert_limit=0)
+
+    stages = result["stages"]
+    assert stages["conversion"] == {"skipped": "abgeschaltet mit --convert 0"}
+    for name in ("pdf_extract", "regex", "text_full", "docx_apply", "docx_save",
+                 "pdf_locate", "pdf_apply", "pdf_save"):
+        assert stages[name]["seconds"] >= 0 and stages[name]["items"] > 0, name
+    assert stages["pdf_extract"]["chars"] > 0 and stages["docx_save"]["bytes"] > 0
+    assert not any(name.startswith("ner") for name in stages)
+
+    pii = result["pii_emails"]
+    assert pii["ner_engine"] is None and pii["known"] > 0
+    assert 0 < pii["redacted"] <= pii["known"]   # Regex allein findet E-Mail, Telefon, IBAN ...
+    json.dumps(result)
+
+
+def test_compare_reports_throughput_ratio(capsys):
+    timer = run_benchmarks.StageTimer()
+    timer.run("regex", "texts", lambda: (40, {"chars": 4000}))
+    timer.skip("conversion", "LibreOffice nicht gefunden")
+    current = {"stages": timer.stages, "peak_rss_mb": 210.0}
+    assert current["stages"]["regex"]["items"] == 40 and current["stages"]["regex"]["chars"] == 4000
+
+    current["stages"]["regex"]["per_second"] = 200.0
+    baseline = {"commit": "abc1234", "timestamp": "2026-01-01T10:00:00", "peak_rss_mb": 200.0,
+                "stages": {"regex": {"per_second": 100.0}}}
+    run_benchmarks.compare(current, baseline)
+
+    out = capsys.readouterr().out
+    assert "abc1234" in out and "(2.00x)" in out and "conversion" not in out.split("Vergleich")[1]
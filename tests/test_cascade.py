@@ -0,0 +1,37 @@
+"""
+Die Kaskaden-Entscheidung fließt in die gecachten Roh-Ergebnisse — sie darf daher
+nicht von eigener Whitelist oder gelernten Entities abhängen.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+
+
+@pytest.fixture
+def custom_terms():
+    added = {"Erika Beispiel", "Musterbach Verwaltung"}
+    docx_redactor.COMMON_FALSE_POSITIVES.update(added)
+    docx_redactor.WHITELIST_ORGS.add("Musterbach Verwaltung")
+    docx_redactor.rebuild_whitelist()
+    yield
+    docx_redactor.COMMON_FALSE_POSITIVES.difference_update(added)
+    docx_redactor.WHITELIST_ORGS.discard("Musterbach Verwaltung")
+    docx_redactor.rebuild_whitelist()
+
+
+def test_builtin_terms_do_not_trigger():
+    assert not docx_redactor._has_unexplained_names("Vorlage an den Oberster Gerichtshof.", [])
+    assert not docx_redactor._has_unexplained_names("Die Europäische Kommission entschied.", [])
+
+
+def test_custom_whitelist_does_not_change_decision(custom_terms):
+    signature = docx_redactor._cascade_signature()
+    assert docx_redactor._has_unexplained_names("Zeugin ist Erika Beispiel.", [])
+    assert docx_redactor._has_unexplained_names("Antrag der Musterbach Verwaltung.", [])
+    assert docx_redactor._cascade_signature() == signature
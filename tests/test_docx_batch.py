@@ -0,0 +1,84 @@
+"""
+DOCX-Verarbeitung mit einem NER-Batch pro Dokument: Fließtext, Tabellen und
+Kopf-/Fußzeilen gehen gemeinsam an die Engine — jeder Header/Footer-Part genau einmal.
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+docx = pytest.importorskip("docx")
+
+import docx_redactor
+
+NAME = re.compile(r"Erika Beispiel|Hans Muster")
+
+
+@pytest.fixture
+def ner_batches(monkeypatch):
+    """Schein-Engine ohne Cache und Server: protokolliert jeden Batch."""
+    batches = []
+
+    def run_ner_batch(texts):
+        batches.append(list(texts))
+        return [[{"start": m.start(), "end": m.end(), "text": m.group(), "label": "PER",
+                  "score": 0.95, "source": "flair"} for m in NAME.finditer(text)] for text in texts]
+
+    monkeypatch.setattr(docx_redactor, "_run_ner_batch", run_ner_batch)
+    monkeypatch.setattr(docx_redactor, "_use_ner_server", lambda: False)
+    monkeypatch.setattr(docx_redactor, "warmup_ner_engine", lambda engine=None: None)
+    monkeypatch.setattr(docx_redactor, "NER_CACHE_ENABLED", False)
+    return batches
+
+
+def _document(path, second_section_header=None):
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Kanzlei – Akt Erika Beispiel"
+    document.sections[0].footer.paragraphs[0].text = "Seite 1"
+    document.add_paragraph("Die Klägerin Erika Beispiel erhebt Klage.")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Zeuge"
+    table.cell(0, 1).text = "Hans Muster"
+    document.add_section()
+    if second_section_header:
+        header = document.sections[1].header
+        header.is_linked_to_previous = False
+        header.paragraphs[0].text = second_section_header
+    document.add_paragraph("Zweiter Abschnitt ohne Namen.")
+    document.save(path)
+    return path
+
+
+def test_whole_document_goes_to_the_engine_in_one_batch(tmp_path, ner_batches):
+    path = _document(str(tmp_path / "klage.docx"))
+    output = str(tmp_path / "klage_geschwaerzt.docx")
+    mapper = docx_redactor.process_docx(path, output)
+
+    assert len(ner_batches) == 1
+    (batch,) = ner_batches
+    assert "Die Klägerin Erika Beispiel erhebt Klage." in batch and "Hans Muster" in batch
+    # Der verknüpfte Header des zweiten Abschnitts ist derselbe Part → nur einmal
+    assert batch.count("Kanzlei – Akt Erika Beispiel") == 1
+    assert len(batch) == len(set(batch))
+
+    result = docx.Document(output)
+    assert result.paragraphs[0].text == "Die Klägerin Person A erhebt Klage."
+    assert result.tables[0].cell(0, 1).text == "Person B"
+    assert result.sections[0].header.paragraphs[0].text == "Kanzlei – Akt Person A"
+    assert list(mapper.person_mapping) == ["Erika Beispiel", "Hans Muster"]
+
+
+def test_unlinked_header_of_later_section_is_included(tmp_path, ner_batches):
+    path = _document(str(tmp_path / "zwei.docx"), second_section_header="Beilage Hans Muster")
+    texts = docx_redactor.docx_ner_inputs(docx.Document(path))
+    assert texts.count("Kanzlei – Akt Erika Beispiel") == 1
+    assert texts.count("Beilage Hans Muster") == 1
+    assert texts.count("Seite 1") == 1
+
+    output = str(tmp_path / "zwei_geschwaerzt.docx")
+    docx_redactor.process_docx(path, output)
+    assert docx.Document(output).sections[1].header.paragraphs[0].text == "Beilage Person B"
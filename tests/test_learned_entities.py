@@ -0,0 +1,50 @@
+"""
+Langlebige Worker-Prozesse (Job-Queue, Daemon) müssen Korrekturen übernehmen,
+die ein anderer Prozess in die Datei der gelernten Entities geschrieben hat.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+
+
+@pytest.fixture
+def learned_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "learned_entities.json")
+    monkeypatch.setattr(docx_redactor, "LEARNED_ENTITIES_FILE", path)
+    yield path
+    monkeypatch.undo()
+    docx_redactor.load_learned_entities()
+
+
+def _write(path, never_redact, always_redact):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"never_redact": never_redact, "always_redact": always_redact}, f)
+    # Änderungszeit sicher verschieben (grobe Zeitauflösung mancher Dateisysteme)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+def test_refresh_picks_up_changes_from_other_process(learned_file):
+    _write(learned_file, [], {"PER": [], "ORG": [], "LOC": []})
+    docx_redactor.load_learned_entities()
+    assert not docx_redactor.is_learned_never_redact("Musterfirma")
+
+    _write(learned_file, ["Musterfirma"], {"PER": ["Erika Beispiel"], "ORG": [], "LOC": []})
+    docx_redactor.refresh_learned_entities()
+    assert docx_redactor.is_learned_never_redact("Musterfirma")
+    assert docx_redactor.find_always_redact("Zeugin Erika Beispiel")[0][2] == "Erika Beispiel"
+
+
+def test_refresh_without_change_keeps_state(learned_file):
+    _write(learned_file, ["Musterfirma"], {"PER": [], "ORG": [], "LOC": []})
+    docx_redactor.load_learned_entities()
+    docx_redactor.add_never_redact("Beispiel AG")   # eigene Änderung, gespeichert
+    docx_redactor.refresh_learned_entities()
+    assert docx_redactor.is_learned_never_redact("Beispiel AG")
@@ -0,0 +1,114 @@
+"""
+Batch-Schwärzung über die API gegen den lokalen Stub (tests/llm_stub.py):
+Reihenfolge der Ergebnisse, Wiederholungen und Backoff.
+"""
+
+import os
+import sys
+
+import pytest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS))
+sys.path.insert(0, TESTS)
+
+pytest.importorskip("openai")
+
+import llm_api
+from llm_stub import StubServer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubServer().start()
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(llm_api, "OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(llm_api, "OPENAI_API_KEY", "stub")
+    monkeypatch.setattr(llm_api, "API_BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(llm_api, "API_MAX_RETRIES", 3)
+    llm_api.set_api_cache(enabled=False)
+    llm_api.reset_api_stats()
+    yield server
+    server.stop()
+    llm_api.set_api_cache(enabled=True)
+
+
+def test_results_keep_input_order(stub):
+    texts = [f"Absatz {i}" for i in range(12)]
+    for i, text in enumerate(texts):
+        stub.script(text, delay=0.01 * (12 - i))   # spätere Texte antworten zuerst
+    texts.append("Absatz 3")                           # Duplikat wird nur einmal angefragt
+
+    results = llm_api.redact_texts_api(texts)
+
+    assert results == [f"[STUB] {text}" for text in texts]
+    assert len(stub.calls) == 12
+    assert llm_api.get_api_stats()["calls"] == 12
+
+
+def test_concurrency_is_bounded(stub, monkeypatch):
+    monkeypatch.setattr(llm_api, "API_MAX_CONCURRENCY", 3)
+    texts = [f"Zeile {i}" for i in range(10)]
+    for text in texts:
+        stub.script(text, delay=0.05)
+    llm_api.redact_texts_api(texts)
+    assert 1 < stub.max_in_flight <= 3
+
+
+def test_retries_with_backoff(stub):
+    stub.script("Rate-Limit", fail=2, status=429)
+    stub.script("Serverfehler", fail=1, status=500)
+
+    results = llm_api.redact_texts_api(["Rate-Limit", "Serverfehler", "Ok"])
+
+    assert results == ["[STUB] Rate-Limit", "[STUB] Serverfehler", "[STUB] Ok"]
+    attempts = stub.attempts("Rate-Limit")
+    assert [status for _, status in attempts] == [429, 429, 200]
+    # Backoff mit Jitter: Basis * 2^Versuch * [0.5, 1)
+    first_gap = attempts[1][0] - attempts[0][0]
+    second_gap = attempts[2][0] - attempts[1][0]
+    assert first_gap >= 0.05 * 0.5
+    assert second_gap >= 0.05 * 2 * 0.5
+    assert [status for _, status in stub.attempts("Serverfehler")] == [500, 200]
+
+
+def test_retry_after_header_is_honoured(stub):
+    stub.script("Warten", fail=1, status=429, retry_after=0.3)
+    llm_api.redact_texts_api(["Warten"])
+    (first, _), (second, _) = stub.attempts("Warten")
+    assert second - first >= 0.3
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.script("Kaputt", fail=10, status=500)
+    import openai
+    with pytest.raises(openai.InternalServerError):
+        llm_api.redact_texts_api(["Kaputt"])
+    assert len(stub.attempts("Kaputt")) == llm_api.API_MAX_RETRIES + 1
+
+
+def test_backoff_releases_concurrency_slot(stub, monkeypatch):
+    # Ein Slot: während "Langsam" auf den Retry wartet, muss "Schnell" laufen dürfen
+    monkeypatch.setattr(llm_api, "API_MAX_CONCURRENCY", 1)
+    stub.script("Langsam", fail=1, status=429, retry_after=0.5)
+
+    llm_api.redact_texts_api(["Langsam", "Schnell"])
+
+    (_, _), (retried, _) = stub.attempts("Langsam")
+    ((started, _),) = stub.attempts("Schnell")
+    assert started < retried
+
+
+def test_failed_text_does_not_discard_finished_answers(stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_api, "API_CACHE_FILE", str(tmp_path / "api.sqlite3"))
+    monkeypatch.setattr(llm_api, "API_MAX_RETRIES", 0)
+    llm_api.set_api_cache(enabled=True)
+    stub.script("Kaputt", fail=1, status=500)
+    import openai
+    with pytest.raises(openai.InternalServerError):
+        llm_api.redact_texts_api(["Gut", "Kaputt", "Auch gut"])
+
+    # Zweiter Lauf: nur der fehlgeschlagene Text geht erneut an die API
+    results = llm_api.redact_texts_api(["Gut", "Kaputt", "Auch gut"])
+    assert len(results) == 3
+    assert [len(stub.attempts(text)) for text in ("Gut", "Kaputt", "Auch gut")] == [1, 2, 1]
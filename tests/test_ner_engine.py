@@ -0,0 +1,65 @@
+"""
+Laden der NER-Engine: scheitert Flair, wird einmal auf spaCy zurückgefallen — spätere
+Aufrufe (z.B. jeder Job setzt wieder "flair") versuchen Flair nicht erneut.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+
+
+class _FakeSpacy:
+    meta = {"lang": "de", "name": "fake", "version": "0"}
+    pipe_names = ["ner"]
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Flair-Lader scheitert, spaCy-Lader klappt; protokolliert jeden Ladeversuch."""
+    calls = []
+
+    def load_flair(quantized=False):
+        calls.append("flair-int8" if quantized else "flair")
+        raise ImportError("No module named 'flair'")
+
+    def load_spacy():
+        calls.append("spacy")
+        docx_redactor._spacy_nlp = _FakeSpacy()
+        docx_redactor._nlp_engine = "spacy"
+
+    engines = {key: dict(value) for key, value in docx_redactor.NER_ENGINES.items()}
+    engines["flair"]["load"] = load_flair
+    engines["flair-int8"]["load"] = lambda: load_flair(quantized=True)
+    engines["spacy"]["load"] = load_spacy
+    monkeypatch.setattr(docx_redactor, "NER_ENGINES", engines)
+    monkeypatch.setattr(docx_redactor, "_use_ner_server", lambda: False)
+    monkeypatch.setattr(docx_redactor, "_spacy_nlp", None)
+    monkeypatch.setattr(docx_redactor, "_failed_engines", set())
+    monkeypatch.setattr(docx_redactor, "_nlp_engine", "flair")
+    return calls
+
+
+def test_failed_flair_is_loaded_only_once(loads):
+    assert docx_redactor.warmup_ner_engine() == "spaCy"
+    assert docx_redactor.get_ner_engine() == "spacy"
+
+    # Wie redaction_pipeline pro Job: Engine wieder auf "flair" setzen und laden
+    for _ in range(3):
+        docx_redactor.set_ner_engine("flair")
+        assert docx_redactor.warmup_ner_engine() == "spaCy"
+    assert docx_redactor.warmup_ner_engine("flair") == "spaCy"
+    assert loads == ["flair", "spacy"]
+
+
+def test_other_flair_variant_is_still_tried(loads):
+    docx_redactor.warmup_ner_engine("flair")
+    docx_redactor.warmup_ner_engine("flair-int8")
+    docx_redactor.warmup_ner_engine("flair-int8")
+    # spaCy ist schon geladen — nur der int8-Versuch kommt hinzu
+    assert loads == ["flair", "spacy", "flair-int8"]
+    assert docx_redactor._failed_engines == {"flair", "flair-int8"}
@@ -0,0 +1,89 @@
+"""
+Paritätsprüfung der int8-Modelle: Kennzahlen aus den Spans von Original und
+quantisiertem Tagger, Eingabetexte aus .docx- und .txt-Dateien. Gespeichert werden
+nur die int8-Gewichte, geladen mit weights_only=True.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ner_quantize
+
+
+def test_compare_spans_counts_matches_by_span_and_tag():
+    reference = {(0, 4, 18, "PER"): 0.99, (0, 40, 47, "LOC"): 0.95, (1, 4, 21, "ORG"): 0.90}
+    quantized = {(0, 4, 18, "PER"): 0.97, (0, 40, 47, "ORG"): 0.60,   # anderes Tag
+                 (1, 4, 21, "ORG"): 0.86, (2, 0, 5, "PER"): 0.51}
+    result = ner_quantize.compare_spans(reference, quantized, ref_seconds=3.0, q_seconds=1.2)
+
+    assert (result["reference_entities"], result["quantized_entities"], result["matched"]) == (3, 4, 2)
+    assert result["precision"] == 0.5 and result["recall"] == 0.6667
+    assert result["f1"] == pytest.approx(0.5714, abs=1e-4)
+    assert result["mean_score_diff"] == 0.03
+    assert result["speedup"] == 2.5
+
+
+def test_compare_spans_without_entities_is_full_parity():
+    result = ner_quantize.compare_spans({}, {}, ref_seconds=0.4, q_seconds=0.0)
+    assert (result["precision"], result["recall"], result["f1"]) == (1.0, 1.0, 1.0)
+    assert result["speedup"] is None
+
+
+def test_parity_report_per_model(monkeypatch, capsys):
+    flair_models = pytest.importorskip("flair.models")
+    predictions = {
+        "original": ({(0, 0, 3, "PER"): 0.9, (1, 2, 8, "LOC"): 0.8}, 2.0),
+        "int8": ({(0, 0, 3, "PER"): 0.88}, 0.5),
+    }
+    monkeypatch.setattr(flair_models.SequenceTagger, "load", staticmethod(lambda name: "original"))
+    monkeypatch.setattr(ner_quantize, "load_quantized_tagger", lambda name: "int8")
+    monkeypatch.setattr(ner_quantize, "_predict_spans", lambda tagger, texts: predictions[tagger])
+
+    report = ner_quantize.parity_check(["Max klagt.", "In Wien."], model_names=("flair/ner-german-legal",))
+    r = report["flair/ner-german-legal"]
+    assert (r["texts"], r["matched"], r["recall"], r["speedup"]) == (2, 1, 0.5, 4.0)
+
+    ner_quantize.print_parity_report(report)
+    assert "Recall 50.0%" in capsys.readouterr().out
+
+
+def test_inputs_from_docx_and_txt_are_deduplicated(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("Der Kläger Max Mustermann erhebt Klage.")
+    document.add_paragraph("")
+    document.sections[0].header.paragraphs[0].text = "Akt 12 Cg 34/21"
+    document.save(str(tmp_path / "klage.docx"))
+    with open(tmp_path / "saetze.txt", "w", encoding="utf-8") as f:
+        f.write("Der Kläger Max Mustermann erhebt Klage.\n\n  Zeugin Anna Becker.  \n")
+
+    texts = ner_quantize._read_inputs([str(tmp_path / "klage.docx"), str(tmp_path / "saetze.txt")])
+    assert texts == ["Der Kläger Max Mustermann erhebt Klage.", "Akt 12 Cg 34/21", "Zeugin Anna Becker."]
+
+
+def test_export_stores_only_weights_and_load_uses_weights_only(tmp_path, monkeypatch):
+    torch = pytest.importorskip("torch")
+    flair_models = pytest.importorskip("flair.models")
+
+    def original(name):
+        torch.manual_seed(7)
+        return torch.nn.Sequential(torch.nn.Linear(8, 4), torch.nn.ReLU(), torch.nn.Linear(4, 2))
+
+    monkeypatch.setattr(flair_models.SequenceTagger, "load", staticmethod(original))
+    monkeypatch.setattr(ner_quantize, "QUANTIZED_DIR", str(tmp_path))
+    path = ner_quantize.export_quantized("flair/ner-german-legal")
+    assert os.path.dirname(path) == str(tmp_path) and ".int8-state." in path
+
+    loads = []
+    real_load = torch.load
+    monkeypatch.setattr(torch, "load", lambda *args, **kwargs: loads.append(kwargs) or real_load(*args, **kwargs))
+    tagger = ner_quantize.load_quantized_tagger("flair/ner-german-legal")
+
+    assert [kwargs.get("weights_only") for kwargs in loads] == [True]
+    sample = torch.ones(1, 8)
+    expected = ner_quantize.quantize_tagger(original("flair/ner-german-legal"))(sample)
+    assert torch.equal(tagger(sample), expected)
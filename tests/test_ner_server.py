@@ -0,0 +1,69 @@
+"""
+Micro-Batching im NER-Server: nur Anfragen mit gleichen Einstellungen werden
+zusammen gerechnet, die Kaskaden-Zähler gehen anteilig an die Anfragen zurück.
+Der Socket ist von Anfang an nur für den Eigentümer zugänglich.
+"""
+
+import os
+import stat
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ner_server import MicroBatcher, NERServer, _split_counts
+
+
+def test_split_counts_keeps_totals():
+    parts = _split_counts({"sentences": 7, "skipped": 1, "second_model": 0}, [1, 1, 1])
+    assert sum(part["sentences"] for part in parts) == 7
+    assert sum(part["skipped"] for part in parts) == 1
+    assert all(part["second_model"] == 0 for part in parts)
+    assert _split_counts({"sentences": 4}, [3, 1]) == [{"sentences": 3}, {"sentences": 1}]
+
+
+def test_batches_only_combine_equal_configs():
+    calls = []
+    release = threading.Event()
+
+    def run_batch(texts, config):
+        release.wait(5)
+        calls.append((list(texts), config))
+        return [f"{config['cascade']}:{text}" for text in texts], {"sentences": len(texts)}
+
+    batcher = MicroBatcher(run_batch, window=0.2)
+    results = {}
+
+    def submit(name, texts, cascade):
+        results[name] = batcher.submit(texts, {"cascade": cascade})
+
+    threads = [threading.Thread(target=submit, args=args) for args in (
+        ("a", ["a1", "a2"], True), ("b", ["b1"], False), ("c", ["c1"], True))]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert results["a"] == (["True:a1", "True:a2"], {"sentences": 2})
+    assert results["b"] == (["False:b1"], {"sentences": 1})
+    assert results["c"] == (["True:c1"], {"sentences": 1})
+    for texts, config in calls:
+        assert all(text[0] in ("a", "c") for text in texts) == config["cascade"]
+    assert sum(len(texts) for texts, _ in calls) == 4
+
+
+def test_socket_is_created_owner_only(tmp_path, monkeypatch):
+    path = str(tmp_path / "ner.sock")
+    modes = []
+    monkeypatch.setattr(os, "chmod", lambda *args, **kwargs: modes.append(args))
+    previous = os.umask(0o000)
+    try:
+        server = NERServer(path, "spacy")
+        try:
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+            assert modes == []                     # ohne nachträgliches chmod
+        finally:
+            server.server_close()
+    finally:
+        assert os.umask(previous) == 0o000     # Umask des Prozesses wiederhergestellt
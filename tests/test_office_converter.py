@@ -0,0 +1,74 @@
+"""
+Batch-Konvertierung ohne UNO mit einem Ersatz-soffice: eine hängende Datei darf
+den Batch nur einmal das Zeitlimit kosten und nur selbst ausfallen.
+"""
+
+import os
+import sys
+import textwrap
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import office_converter
+from office_converter import ConversionService
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "killpg"), reason="Prozessgruppen nur unter POSIX")
+
+# Ersatz für soffice: "konvertiert" durch Kopieren, hängt bei Dateien mit "haengt" im Namen
+FAKE_SOFFICE = textwrap.dedent(f"""\
+    #!{sys.executable}
+    import os, shutil, sys, time
+    args = sys.argv[1:]
+    fmt = args[args.index("--convert-to") + 1]
+    outdir = args[args.index("--outdir") + 1]
+    for path in args[args.index("--outdir") + 2:]:
+        if "haengt" in os.path.basename(path):
+            time.sleep(60)
+        base = os.path.splitext(os.path.basename(path))[0]
+        shutil.copy(path, os.path.join(outdir, base + "." + fmt))
+        time.sleep(0.3)
+""")
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    soffice = tmp_path / "soffice"
+    soffice.write_text(FAKE_SOFFICE)
+    soffice.chmod(0o755)
+    monkeypatch.setattr(office_converter, "OFFICE_JOB_TIMEOUT", 1.0)
+    monkeypatch.setattr(office_converter, "OFFICE_POLL_INTERVAL", 0.05)
+    service = ConversionService(instances=1, soffice=str(soffice), use_uno=False)
+    yield service
+    service.close()
+
+
+def _jobs(tmp_path, names):
+    jobs = []
+    for name in names:
+        path = tmp_path / f"{name}.docx"
+        path.write_text(name)
+        jobs.append((str(path), str(tmp_path / "out" / f"{name}.pdf"), "pdf"))
+    return jobs
+
+
+def test_slow_batch_without_hang_is_not_cut_off(service, tmp_path):
+    # 5 Dateien × 0.3 s dauern länger als ein Zeitlimit von 1 s — es gibt aber Fortschritt
+    jobs = _jobs(tmp_path, [f"akte{i}" for i in range(5)])
+    assert service.convert_many(jobs) == [None] * 5
+    assert all(os.path.exists(output) for _, output, _ in jobs)
+
+
+def test_hung_file_costs_one_timeout(service, tmp_path):
+    jobs = _jobs(tmp_path, ["akte1", "haengt", "akte2", "akte3"])
+    started = time.monotonic()
+    results = service.convert_many(jobs)
+    elapsed = time.monotonic() - started
+
+    assert [result is None for result in results] == [True, False, True, True]
+    assert "Zeitüberschreitung" in results[1]
+    assert not os.path.exists(jobs[1][1])
+    # Ein Limit plus die eigentliche Arbeit — bisher: Limit × Anzahl Dateien, dann Einzelversuche
+    assert elapsed < 1.0 * 3
@@ -0,0 +1,135 @@
+"""
+PDF-Schwärzung über den Zeichen-Index: Rechtecke pro Zeile für Treffer über einen
+Zeilenumbruch hinweg und gleiche Ergebnisse an den Grenzen der Seitenblöcke
+(PDF_PAGE_CHUNK). Die NER ist abgeschaltet — geprüft wird die Abbildung auf Boxen.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fitz = pytest.importorskip("fitz")
+
+import docx_redactor
+import pdf_redactor
+from pdf_redactor import PageTextIndex
+
+
+@pytest.fixture(autouse=True)
+def no_ner(monkeypatch):
+    prefetched = []
+    monkeypatch.setattr(pdf_redactor, "prefetch_entities", lambda texts, mapper=None: prefetched.append(texts))
+    monkeypatch.setattr(pdf_redactor, "extract_entities", lambda text, mapper: [])
+    docx_redactor.set_sensitivity("standard")
+    return prefetched
+
+
+def _make_pdf(path, pages):
+    """pages: pro Seite eine Liste von (y, zeilentext)."""
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page(width=400, height=300)
+        for y, line in lines:
+            page.insert_text((40, y), line, fontsize=11)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def _close(rect, expected, tolerance=1.5):
+    return all(abs(a - b) <= tolerance for a, b in zip(rect, expected))
+
+
+def test_match_across_line_break_gets_one_rect_per_line(tmp_path):
+    path = _make_pdf(str(tmp_path / "zeilen.pdf"), [[
+        (60, "Die Klägerin, wohnhaft Hauptstraße"),
+        (80, "12 in Musterdorf, beantragt:"),
+    ]])
+    page = fitz.open(path)[0]
+    index = PageTextIndex(page)
+    start = index.text.index("Hauptstraße")
+    end = index.text.index("12 in") + len("12")
+
+    rects = index.rects(start, end)
+    assert len(rects) == 2
+    assert _close(rects[0], page.search_for("Hauptstraße")[0])
+    assert _close(rects[1], page.search_for("12")[0])
+    # Die Regex-Adresse reicht über den Zeilenumbruch — geschwärzt werden genau diese Boxen
+    ((span_start, span_end),) = pdf_redactor._detect_page_spans(index.text, docx_redactor.EntityMapper())
+    assert span_start == start and index.rects(span_start, span_end) == rects
+
+
+def test_rects_skip_surrounding_whitespace(tmp_path):
+    path = _make_pdf(str(tmp_path / "rand.pdf"), [[(60, "Kontakt:  max@example.com  danke")]])
+    page = fitz.open(path)[0]
+    index = PageTextIndex(page)
+    start = index.text.index("max@")
+    (rect,) = index.rects(start - 2, start + len("max@example.com") + 2)
+    assert _close(rect, page.search_for("max@example.com")[0])
+    assert index.rects(start - 2, start) == []
+
+
+def _chunk_pdf(tmp_path, page_count):
+    pages = []
+    for number in range(page_count):
+        pages.append([(40 + 10 * number, f"Seite {number + 1}, Kontakt"),
+                      (60 + 10 * number, f"person{number}@example.com Tel. 0664 12345{number}")])
+    return _make_pdf(str(tmp_path / "seiten.pdf"), pages)
+
+
+def test_results_do_not_depend_on_chunk_boundaries(tmp_path, monkeypatch, no_ner):
+    path = _chunk_pdf(tmp_path, 5)
+    doc = fitz.open(path)
+
+    monkeypatch.setattr(pdf_redactor, "PDF_PAGE_CHUNK", 2)
+    chunked = pdf_redactor._detect_pages(doc, 1, 5, "standard", 0.8)
+    assert [len(texts) for texts in no_ner] == [2, 2]          # Seiten 1-2 und 3-4
+    monkeypatch.setattr(pdf_redactor, "PDF_PAGE_CHUNK", 32)
+    whole = pdf_redactor._detect_pages(doc, 1, 5, "standard", 0.8)
+
+    assert [r["page"] for r in chunked] == [1, 2, 3, 4]
+    assert [r["rects"] for r in chunked] == [r["rects"] for r in whole]
+    # Seite 3 ist die erste des zweiten Blocks: ihre Treffer liegen auf ihren eigenen Glyphen
+    page = doc[3]
+    rects = chunked[2]["rects"]
+    assert len(rects) == 2
+    assert _close(rects[0], page.search_for("person3@example.com")[0])
+    assert _close(rects[1], page.search_for("0664 123453")[0])
+
+
+def test_redacted_pdf_no_longer_contains_the_matches(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_redactor, "PDF_PAGE_CHUNK", 2)
+    path = _chunk_pdf(tmp_path, 3)
+    output = str(tmp_path / "geschwaerzt.pdf")
+    pdf_redactor.redact_pdf(path, output)
+
+    doc = fitz.open(output)
+    for number, page in enumerate(doc):
+        text = page.get_text()
+        assert f"Seite {number + 1}, Kontakt" in text
+        assert "@example.com" not in text and "0664" not in text
+
+
+def test_detection_uses_the_index_instead_of_search_for(tmp_path, monkeypatch):
+    path = _make_pdf(str(tmp_path / "grundbuch.pdf"), [[
+        (60, "Grundbuch EZ 128/542, Anteil 1/3"),
+        (80, "Frau Erika Beispiel, Tel. 0664 123456"),
+    ]])
+
+    page = fitz.open(path)[0]
+    expected = [page.search_for("Frau Erika Beispiel")[0], page.search_for("0664 123456")[0]]
+    fraction = page.search_for("128/542")[0]
+
+    def no_search(*args, **kwargs):
+        raise AssertionError("page.search_for() aufgerufen")
+
+    monkeypatch.setattr(fitz.Page, "search_for", no_search)
+    (result,) = pdf_redactor._detect_pages(fitz.open(path), 0, 1, "standard", 0.8)
+
+    assert len(result["rects"]) == 2
+    assert all(_close(rect, wanted) for rect, wanted in zip(result["rects"], expected))
+    # Grundbuch-Anteile bleiben stehen
+    assert not any(fitz.Rect(rect).intersects(fraction) for rect in result["rects"])
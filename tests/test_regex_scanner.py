@@ -0,0 +1,113 @@
+"""
+Der RegexScanner muss dieselben Schwärzungen liefern wie das frühere Ersetzen
+Muster für Muster (pattern.sub nacheinander, frühere Muster haben Vorrang).
+"""
+
+import os
+import random
+import re
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import docx_redactor
+from corpus import make_contract, make_pleading, make_email, document_texts
+
+
+def sequential_redact(text, patterns):
+    """Referenz: die ursprüngliche Implementierung von redact_regex()."""
+    fraction_pattern = re.compile(r'\b(\d{1,6}/\d{1,6})\b')
+    fractions = {}
+    for i, match in enumerate(fraction_pattern.finditer(text)):
+        fractions[f"__FRACTION_{i}__"] = match.group()
+    for placeholder, original in fractions.items():
+        text = text.replace(original, placeholder, 1)
+    for pattern, replacement in patterns:
+        text = pattern.sub(replacement, text)
+    for placeholder, original in fractions.items():
+        text = text.replace(placeholder, original)
+    return text
+
+
+# Eingaben, bei denen ein früher beginnender, schwächerer Treffer einen stärkeren verdecken könnte
+PRIORITY_CASES = [
+    ("Beginn 2021 Max@example.com", "Beginn 2021 [E-MAIL REDACTED]"),
+    ("Frist 2024 Hauptstraße 7", "Frist 2024 [ADRESSE REDACTED]"),
+    ("Tel 0664 12 345678 A 123", "Tel 0664 [SOZVERSNR REDACTED]"),
+]
+
+EXTRA_TEXTS = [
+    "EZ 128/542 KG 01234 Innere Stadt, Tel. +43 1 5123456",
+    "geb. am 12.03.1980 in 1010 Wien, Steuernummer 12/345/67890",
+    "IBAN DE89 3704 0044 0532 0130 00, HRB 12345, max.muster@kanzlei.de",
+    "",
+]
+
+# Grenzfälle am Platzhalter: ein späteres Muster sieht nach einem Ersetzen "]" statt Wortzeichen
+BOUNDARY_TEXTS = [
+    "DE89 3704 0044 0532 0130 00Max@example.com",
+    "Ringstr. 12a(0) 664 123",
+    "12.03.1980geb. 1.1.20",
+    "Hauptstraße 7b1010 Wien geb.12.03.1980",
+]
+
+
+def _corpus_texts(count=20, seed=7):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        for spec in (make_contract(rng, i), make_pleading(rng, i), make_email(rng, i)):
+            texts.extend(document_texts(spec))
+    return texts
+
+
+@pytest.fixture(autouse=True)
+def restore_sensitivity():
+    yield
+    docx_redactor.set_sensitivity("standard")
+
+
+@pytest.mark.parametrize("text,expected", PRIORITY_CASES)
+def test_earlier_pattern_wins(text, expected):
+    docx_redactor.set_sensitivity("standard")
+    assert docx_redactor.redact_regex(text) == expected
+
+
+@pytest.mark.parametrize("sensitivity", ["konservativ", "standard", "aggressiv"])
+def test_matches_sequential_substitution(sensitivity):
+    docx_redactor.set_sensitivity(sensitivity)
+    patterns = docx_redactor.get_active_regex_patterns()
+    texts = [text for text, _ in PRIORITY_CASES] + EXTRA_TEXTS + BOUNDARY_TEXTS + _corpus_texts()
+    for text in texts:
+        assert docx_redactor.redact_regex(text) == sequential_redact(text, patterns), text
+
+
+def test_spans_are_sorted_and_disjoint():
+    scanner = docx_redactor.get_regex_scanner()
+    for text in _corpus_texts(count=5):
+        spans = scanner.scan(text)
+        assert spans == sorted(spans)
+        for (_, end, _), (start, _, _) in zip(spans, spans[1:]):
+            assert end <= start
+
+
+def test_scan_all_keeps_overlapping_matches():
+    # PDF-Schwärzung: alle Treffer aller Muster, auch der schwächere PLZ-ORT-Treffer
+    scanner = docx_redactor.get_regex_scanner()
+    replacements = {r for _, _, r in scanner.scan_all("Beginn 2021 Max@example.com")}
+    assert replacements == {"[E-MAIL REDACTED]", "[PLZ-ORT REDACTED]"}
+
+
+@pytest.mark.parametrize("sensitivity", ["konservativ", "aggressiv"])
+def test_scan_all_matches_each_pattern_on_its_own(sensitivity):
+    docx_redactor.set_sensitivity(sensitivity)
+    scanner = docx_redactor.get_regex_scanner()
+    for text in BOUNDARY_TEXTS + EXTRA_TEXTS + _corpus_texts(count=5):
+        expected = [(m.start(), m.end(), replacement)
+                    for pattern, replacement in scanner.patterns
+                    for m in pattern.finditer(text) if m.end() > m.start()]
+        assert sorted(scanner.scan_all(text)) == sorted(expected), text
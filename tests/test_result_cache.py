@@ -0,0 +1,128 @@
+"""
+Persistenter Ergebnis-Cache: Treffer/Fehlschläge, Ablaufzeit, Verdrängung nach
+Größe — und der NER-Cache darauf, der bei geänderter Modell-Signatur neu rechnet.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+import result_cache
+from result_cache import SQLiteCache
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+# ==================== SQLITECACHE ====================
+
+def test_hits_and_misses(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many({"a": {"wert": 1}, "b": [1, 2, "ä"]})
+
+    assert cache.get_many(["a", "b", "c", "a"]) == {"a": {"wert": 1}, "b": [1, 2, "ä"]}
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+    # Eine zweite Instanz (z.B. nächster Lauf) liest dieselbe Datei
+    assert SQLiteCache(cache.path).get("b") == [1, 2, "ä"]
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.put("alt", "x")
+    clock.now += 30
+    cache.put("neu", "y")
+    clock.now += 45
+
+    assert cache.get_many(["alt", "neu"]) == {"neu": "y"}
+    assert cache.stats()["entries"] == 1   # Abgelaufenes wird beim Lesen gelöscht
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=1000)
+    for i in range(8):
+        cache.put(f"k{i}", "x" * 100)
+        clock.now += 1
+    cache.get("k0")                     # k0 zuletzt genutzt → bleibt
+    clock.now += 1
+    cache.put_many({"k8": "x" * 100, "k9": "x" * 100, "k10": "x" * 100})
+    cache.evict()
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 900
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None and cache.get("k10") is not None
+
+
+def test_entry_limit_is_enforced_periodically(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteCache, "EVICT_EVERY", 10)
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=20)
+    for i in range(50):
+        cache.put(f"k{i}", i)
+    assert cache.stats()["entries"] <= 20
+
+
+# ==================== NER-CACHE ====================
+
+@pytest.fixture
+def ner_cache(tmp_path, monkeypatch):
+    """NER ohne Modell: jeder Text liefert eine Entity über das erste Wort."""
+    calls = []
+
+    def run_ner_batch(texts):
+        calls.append(list(texts))
+        return [[{"start": 0, "end": len(t.split()[0]), "text": t.split()[0],
+                  "label": "PER", "score": 0.9, "source": "flair"}] for t in texts]
+
+    monkeypatch.setattr(docx_redactor, "_use_ner_server", lambda: False)
+    monkeypatch.setattr(docx_redactor, "warmup_ner_engine", lambda engine=None: None)
+    monkeypatch.setattr(docx_redactor, "_run_ner_batch", run_ner_batch)
+    monkeypatch.setattr(docx_redactor, "_ner_model_signature", lambda: "modell-1")
+    monkeypatch.setattr(docx_redactor, "NER_CACHE_FILE", str(tmp_path / "ner.sqlite3"))
+    docx_redactor.set_ner_cache(enabled=True)
+    yield calls
+    docx_redactor.set_ner_cache(enabled=True)
+
+
+def test_known_texts_come_from_cache(ner_cache):
+    texts = ["Erika klagt.", "Max zahlt.", "Erika klagt."]
+    first = docx_redactor.extract_entities_batch(texts)
+    second = docx_redactor.extract_entities_batch(["Max zahlt.", "Anna schweigt."])
+
+    assert ner_cache == [["Erika klagt.", "Max zahlt."], ["Anna schweigt."]]
+    assert [e[0]["text"] for e in first] == ["Erika", "Max", "Erika"]
+    assert second[0] == first[1]
+    stats = docx_redactor.get_ner_cache_stats()
+    assert (stats["hits"], stats["entries"]) == (1, 3)
+
+
+def test_changed_model_signature_invalidates_entries(ner_cache, monkeypatch):
+    docx_redactor.extract_entities_batch(["Erika klagt."])
+    monkeypatch.setattr(docx_redactor, "_ner_model_signature", lambda: "modell-2")
+    docx_redactor.extract_entities_batch(["Erika klagt."])
+    assert ner_cache == [["Erika klagt."], ["Erika klagt."]]
+
+
+def test_unusable_cache_file_falls_back_to_model(ner_cache, tmp_path):
+    docx_redactor.set_ner_cache(path=str(tmp_path))   # ein Verzeichnis ist keine Datenbank
+    entities = docx_redactor.extract_entities_batch(["Erika klagt."])
+    assert entities[0][0]["text"] == "Erika"
+    assert docx_redactor.get_ner_cache() is None
@@ -0,0 +1,75 @@
+"""
+Spool der Web-App: ein Verzeichnis pro Sitzung, verwaiste werden nach
+SPOOL_MAX_AGE gelöscht; das Ergebnis-ZIP speichert PDF/DOCX unkomprimiert.
+"""
+
+import os
+import sys
+import time
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import result_spool
+
+
+@pytest.fixture
+def spool_root(tmp_path, monkeypatch):
+    root = str(tmp_path / "spool")
+    monkeypatch.setattr(result_spool, "SPOOL_ROOT", root)
+    return root
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_new_spool_replaces_previous_and_removes_stale_ones(spool_root):
+    first = result_spool.create_spool()
+    with open(os.path.join(first, "ergebnis.docx"), "w") as f:
+        f.write("geschwärzt")
+    other_session = result_spool.create_spool()
+    abandoned = result_spool.create_spool()
+    _age(abandoned, result_spool.SPOOL_MAX_AGE + 60)
+
+    second = result_spool.create_spool(previous=first)
+
+    assert os.path.dirname(second) == spool_root and os.path.isdir(second)
+    assert not os.path.exists(first)          # voriger Lauf dieser Sitzung
+    assert not os.path.exists(abandoned)      # verwaist
+    assert os.path.isdir(other_session)       # andere, aktive Sitzung bleibt
+
+
+def test_touched_spool_survives_cleanup(spool_root):
+    spool = result_spool.create_spool()
+    _age(spool, result_spool.SPOOL_MAX_AGE + 60)
+    result_spool.touch_spool(spool)
+    result_spool.cleanup_stale_spools()
+    assert os.path.isdir(spool)
+
+    result_spool.discard_spool(spool)
+    result_spool.discard_spool(None)
+    assert not os.path.exists(spool)
+
+
+def test_zip_stores_compressed_formats_and_deflates_text(spool_root):
+    spool = result_spool.create_spool()
+    results = []
+    for name, payload in [("Klage.pdf", b"%PDF-1.7 " * 200), ("Vertrag.DOCX", b"PK" * 300),
+                          ("Mail.txt", "Sehr geehrte Damen und Herren\n".encode() * 50)]:
+        path = os.path.join(spool, name)
+        with open(path, "wb") as f:
+            f.write(payload)
+        results.append({"name": name, "path": path})
+
+    zip_path = result_spool.build_results_zip(results, spool)
+
+    assert os.path.dirname(zip_path) == spool
+    with zipfile.ZipFile(zip_path) as zf:
+        types = {info.filename: info.compress_type for info in zf.infolist()}
+        assert types == {"Klage.pdf": zipfile.ZIP_STORED, "Vertrag.DOCX": zipfile.ZIP_STORED,
+                         "Mail.txt": zipfile.ZIP_DEFLATED}
+        assert zf.read("Mail.txt") == "Sehr geehrte Damen und Herren\n".encode() * 50
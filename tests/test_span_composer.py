@@ -0,0 +1,208 @@
+"""
+Span-basierte Schwärzung: dieselbe Ausgabe wie die frühere Kette von
+Textersetzungen (Regex → NER auf dem Zwischentext → "immer schwärzen"), auch wenn
+sich Regex-, NER- und gelernte Treffer überschneiden — und in DOCX-Absätzen, deren
+Text auf mehrere Runs verteilt ist (Run-Offset-Map).
+"""
+
+import copy
+import os
+import random
+import re
+import sys
+
+import pytest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS))
+sys.path.insert(0, TESTS)
+
+docx = pytest.importorskip("docx")
+
+import docx_redactor
+from test_regex_scanner import sequential_redact
+from test_text_matcher import sequential_always_redact
+
+# Erkennung der Schein-NER: Name → (Label, Score)
+NER_NAMES = {
+    "Erika Beispiel": ("PER", 0.97),
+    "Hans Muster": ("PER", 0.91),
+    "Beispiel AG": ("ORG", 0.88),
+    "Musterdorf": ("LOC", 0.93),
+    "Wien": ("LOC", 0.95),
+    "Hauptstraße": ("LOC", 0.90),     # liegt in einer Regex-Adresse
+    "Oberster Gerichtshof": ("ORG", 0.99),   # Whitelist
+    "Musterfirma": ("ORG", 0.95),     # gelernt: nie schwärzen
+    "Karl Zweifel": ("PER", 0.40),    # unter der Schwelle
+    "Kläger": ("PER", 0.92),          # Heuristik (Rollenbezeichnung)
+}
+NER_PATTERN = re.compile(r"\b(?:" + "|".join(map(re.escape, sorted(NER_NAMES, key=len, reverse=True))) + r")\b")
+
+LEARNED = {"never_redact": ["Musterfirma"],
+           "always_redact": {"PER": ["Anna Gelernt", "Erika"], "ORG": ["Kanzlei Rot"],
+                             "LOC": ["Hauptstraße 7"]}}
+
+TOKENS = [
+    "Erika Beispiel", "Hans Muster", "Beispiel AG", "Musterdorf", "Oberster Gerichtshof",
+    "Musterfirma", "Karl Zweifel", "Kläger", "Anna Gelernt", "Kanzlei Rot", "Erika",
+    "Hauptstraße 7", "1010 Wien", "Wien", "max.muster@example.com", "Tel. 0664 123456",
+    "IBAN DE89 3704 0044 0532 0130 00", "geb. 12.03.1980", "EZ 128/542", "HRB 12345",
+    "der Vertrag", "zahlt", "vom 1.2.2024", "und",
+]
+
+
+def fake_extract_entities(text, mapper=None):
+    return [{"start": m.start(), "end": m.end(), "text": m.group(), "label": NER_NAMES[m.group()][0],
+             "score": NER_NAMES[m.group()][1], "source": "flair"} for m in NER_PATTERN.finditer(text)]
+
+
+def sequential_redact_ner(text, mapper):
+    """Referenz: die ursprüngliche Implementierung von redact_ner()."""
+    entities = sorted(fake_extract_entities(text), key=lambda x: x["start"], reverse=True)
+    for ent in entities:
+        if docx_redactor.is_learned_never_redact(ent["text"]):
+            continue
+        if docx_redactor.is_whitelisted(ent["text"], ent["label"]):
+            continue
+        if ent["label"] == "ORG" and mapper.sensitivity == "konservativ":
+            continue
+        if ent["score"] < mapper.confidence_threshold:
+            continue
+        if docx_redactor._should_skip_entity(ent["text"], ent["label"]):
+            continue
+        placeholder = mapper.get_placeholder(ent["text"], ent["label"])
+        if placeholder:
+            text = text[:ent["start"]] + placeholder + text[ent["end"]:]
+    return text
+
+
+def sequential_redact_text_full(text, mapper):
+    """Referenz: die ursprüngliche Kette in redact_text_full()."""
+    text = sequential_redact(text, docx_redactor.get_active_regex_patterns())
+    text = sequential_redact_ner(text, mapper)
+    return sequential_always_redact(text, LEARNED["always_redact"], mapper)
+
+
+def sequential_redact_paragraph(run_texts, mapper):
+    """Referenz: das frühere redact_paragraph() — bei mehreren Runs jeder Run für sich."""
+    full_text = "".join(run_texts)
+    if not full_text.strip():
+        return run_texts
+    redacted_full = sequential_redact_text_full(full_text, mapper)
+    if redacted_full == full_text:
+        return run_texts
+    if len(run_texts) == 1:
+        return [redacted_full]
+    return [sequential_redact_text_full(t, mapper) if t.strip() else t for t in run_texts]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Schein-NER, feste Lernebene; gibt einen Mapper mit vorab vergebenen Platzhaltern zurück."""
+    monkeypatch.setattr(docx_redactor, "extract_entities", fake_extract_entities)
+    monkeypatch.setattr(docx_redactor, "_learned_data", copy.deepcopy(LEARNED))
+    docx_redactor._compile_learned_entities()
+    docx_redactor.set_sensitivity("standard")
+    mapper = docx_redactor.EntityMapper()
+    for name, (label, _) in sorted(NER_NAMES.items()):
+        mapper.get_placeholder(name, label)
+    for label, terms in sorted(LEARNED["always_redact"].items()):
+        for term in terms:
+            mapper.get_placeholder(term, label)
+    yield mapper
+    monkeypatch.undo()
+    docx_redactor._compile_learned_entities()
+
+
+def _with_placeholders(template, mapper):
+    """Setzt für {Name} den vorab vergebenen Platzhalter ein."""
+    mappings = {**mapper.person_mapping, **mapper.org_mapping, **mapper.loc_mapping}
+    return re.sub(r"\{([^}]+)\}", lambda m: mappings[m.group(1)], template)
+
+
+def _random_tokens(rng):
+    return [rng.choice(TOKENS) for _ in range(rng.randint(1, 12))]
+
+
+# ==================== TEXT ====================
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_sequential_rewrites(pipeline, seed):
+    rng = random.Random(seed)
+    for _ in range(150):
+        text = rng.choice([" ", ", ", "; ", "\n"]).join(_random_tokens(rng))
+        expected = sequential_redact_text_full(text, copy.deepcopy(pipeline))
+        assert docx_redactor.redact_text_full(text, copy.deepcopy(pipeline)) == expected, text
+
+
+@pytest.mark.parametrize("text,expected", [
+    # Regex-Adresse vor NER-Ort und gelerntem Begriff
+    ("Wohnhaft Hauptstraße 7, Musterdorf", "Wohnhaft [ADRESSE REDACTED], {Musterdorf}"),
+    # NER-Person vor dem kürzeren gelernten Begriff
+    ("Zeugin Erika Beispiel und Erika", "Zeugin {Erika Beispiel} und {Erika}"),
+    # E-Mail verdeckt den darin enthaltenen Namen
+    ("Kontakt: Hans.Muster@example.com", "Kontakt: [E-MAIL REDACTED]"),
+    # Grundbuch-Bruch bleibt, Whitelist und "nie schwärzen" ebenso
+    ("EZ 128/542 laut Oberster Gerichtshof, Musterfirma", "EZ 128/542 laut Oberster Gerichtshof, Musterfirma"),
+])
+def test_overlapping_detectors(pipeline, text, expected):
+    expected = _with_placeholders(expected, pipeline)
+    assert docx_redactor.redact_text_full(text, pipeline) == expected
+    assert sequential_redact_text_full(text, copy.deepcopy(pipeline)) == expected
+
+
+# ==================== DOCX-ABSÄTZE MIT MEHREREN RUNS ====================
+
+def _paragraph(run_texts):
+    paragraph = docx.Document().add_paragraph()
+    for i, run_text in enumerate(run_texts):
+        paragraph.add_run(run_text).bold = i % 2 == 1
+    return paragraph
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_runs_match_per_run_rewrites_when_no_match_crosses_a_run(pipeline, seed):
+    rng = random.Random(seed)
+    for _ in range(80):
+        # "; " trennt jeden Treffer aller Detektoren — Runs enden nur dort
+        tokens = _random_tokens(rng)
+        run_texts, current = [], ""
+        for i, token in enumerate(tokens):
+            current += token + ("; " if i < len(tokens) - 1 else "")
+            if rng.random() < 0.5 or i == len(tokens) - 1:
+                run_texts.append(current)
+                current = ""
+        paragraph = _paragraph(run_texts)
+        docx_redactor.redact_paragraph(paragraph, copy.deepcopy(pipeline))
+        expected = sequential_redact_paragraph(run_texts, copy.deepcopy(pipeline))
+        assert [r.text for r in paragraph.runs] == expected, run_texts
+        assert [r.bold for r in paragraph.runs] == [i % 2 == 1 for i in range(len(run_texts))]
+
+
+def test_match_across_runs_is_redacted_once(pipeline):
+    # Früher jeder Run für sich: weder "Erika Bei" + "spiel" noch "1010 " + "Wien" wurde erkannt
+    paragraph = _paragraph(["Zeugin Erika Bei", "spiel", " aus 1010 ", "Wien", ", sagt aus."])
+    docx_redactor.redact_paragraph(paragraph, pipeline)
+    assert [r.text for r in paragraph.runs] == [
+        _with_placeholders("Zeugin {Erika Beispiel}", pipeline), "", " aus [PLZ-ORT REDACTED]", "",
+        ", sagt aus."]
+
+
+# ==================== RUN-OFFSET-MAP ====================
+
+@pytest.mark.parametrize("run_texts,spans,expected", [
+    # Span mitten in einem Run
+    (["Herr Max Muster, ", "fett"], [(5, 15, "P")], ["Herr P, ", "fett"]),
+    # Span über drei Runs: Platzhalter im ersten, der mittlere Run wird leer
+    (["Tel. 06", "64 12", "34 56 ab"], [(5, 17, "T")], ["Tel. T", "", " ab"]),
+    # Zwei Spans in einem Run und einer direkt am Run-Ende
+    (["A und B", " sowie C"], [(0, 1, "X"), (6, 7, "Y"), (14, 15, "Z")], ["X und Y", " sowie Z"]),
+    # Span endet genau an der Run-Grenze, leerer Run dazwischen
+    (["Erika", "", " klagt"], [(0, 5, "P")], ["P", "", " klagt"]),
+    # Keine Spans: alles unverändert
+    (["eins", "zwei"], [], ["eins", "zwei"]),
+])
+def test_spans_are_placed_into_runs(run_texts, spans, expected):
+    result = docx_redactor._apply_spans_to_runs(run_texts, spans)
+    assert result == expected
+    assert "".join(result) == docx_redactor.apply_spans("".join(run_texts), spans)
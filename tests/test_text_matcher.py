@@ -0,0 +1,113 @@
+"""
+Aho-Corasick-Automat und Lernebene: dieselben Ergebnisse wie die frühere Suche
+Begriff für Begriff (`term in text`, text.replace) — bis auf verschachtelte
+Begriffe, bei denen jetzt der längste gewinnt.
+"""
+
+import copy
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+from text_matcher import AhoCorasick
+
+
+def brute_force_matches(terms, text):
+    """Referenz: alle (start, end, begriff) per str.find, auch überlappende."""
+    found = set()
+    for term in terms:
+        start = text.find(term)
+        while start != -1:
+            found.add((start, start + len(term), term))
+            start = text.find(term, start + 1)
+    return found
+
+
+def sequential_always_redact(text, always, mapper):
+    """Referenz: die ursprüngliche Implementierung von _apply_always_redact()."""
+    for label, terms in always.items():
+        for term in terms:
+            if term in text:
+                placeholder = mapper.get_placeholder(term, label)
+                if placeholder:
+                    text = text.replace(term, placeholder)
+    return text
+
+
+def _random_text(rng, alphabet, length):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+# ==================== AUTOMAT ====================
+
+@pytest.mark.parametrize("seed", range(5))
+def test_finds_every_occurrence_like_str_find(seed):
+    rng = random.Random(seed)
+    # Kleines Alphabet: viele Überlappungen, gemeinsame Präfixe und Suffixe
+    terms = {_random_text(rng, "abä ", rng.randint(1, 5)) for _ in range(30)}
+    automaton = AhoCorasick(terms)
+    for _ in range(50):
+        text = _random_text(rng, "abäc ", rng.randint(0, 60))
+        assert set(automaton.iter_matches(text)) == brute_force_matches(terms, text)
+        assert automaton.contains_any(text) == any(term in text for term in terms)
+
+
+def test_longest_match_wins_and_matches_do_not_overlap():
+    automaton = AhoCorasick({"Max": "PER", "Max Muster": "PER", "Muster GmbH": "ORG"})
+    assert automaton.find_longest("Herr Max Muster GmbH und Max") == [
+        (5, 15, "PER"), (25, 28, "PER")]
+    assert AhoCorasick().find_longest("Max") == []
+    assert len(AhoCorasick(["", "a", "a"])) == 2
+
+
+# ==================== LERNEBENE ====================
+
+@pytest.fixture
+def learned(monkeypatch):
+    data = {"never_redact": [" Musterfirma ", "Landgericht Beispielstadt"],
+            "always_redact": {"PER": ["Erika Beispiel", "Hans Muster"],
+                              "ORG": ["Beispiel AG", "Kanzlei Rot"],
+                              "LOC": ["Musterdorf"]}}
+    monkeypatch.setattr(docx_redactor, "_learned_data", data)
+    docx_redactor._compile_learned_entities()
+    yield data
+    monkeypatch.undo()
+    docx_redactor._compile_learned_entities()
+
+
+def test_never_redact_lookup_matches_list_membership(learned):
+    for text in ["Musterfirma", "  Musterfirma", "Landgericht Beispielstadt\n",
+                 "Musterfirma GmbH", "musterfirma", ""]:
+        expected = text.strip() in [t.strip() for t in learned["never_redact"]]
+        assert docx_redactor.is_learned_never_redact(text) == expected, text
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_always_redact_matches_sequential_replace(learned, seed):
+    rng = random.Random(seed)
+    words = ["Erika Beispiel", "Hans Muster", "Beispiel AG", "Kanzlei Rot", "Musterdorf",
+             "der", "Vertrag", "Erika", "Beispiel", "AG,", "Rotwein", "1.", "\n"]
+    # Platzhalter vorab vergeben: die Nummerierung hängt sonst von der Reihenfolge ab
+    prepared = docx_redactor.EntityMapper()
+    for label, terms in sorted(learned["always_redact"].items()):
+        for term in terms:
+            prepared.get_placeholder(term, label)
+
+    for _ in range(100):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 15)))
+        expected = sequential_always_redact(text, learned["always_redact"], copy.deepcopy(prepared))
+        assert docx_redactor._apply_always_redact(text, copy.deepcopy(prepared)) == expected, text
+
+
+def test_nested_terms_redact_the_longest(learned):
+    learned["always_redact"]["PER"].insert(0, "Erika")
+    docx_redactor._compile_learned_entities()
+    mapper = docx_redactor.EntityMapper()
+    # Früher: "Erika" zuerst ersetzt → "Person A Beispiel"
+    assert docx_redactor._apply_always_redact("Zeugin Erika Beispiel", mapper) == "Zeugin Person A"
+    assert mapper.person_mapping == {"Erika Beispiel": "Person A"}
@@ -0,0 +1,119 @@
+"""
+Segmentierung der NER-Eingaben: Satzgrenzen, Fenster für überlange Sätze und das
+Zurückrechnen der Entity-Offsets (ohne Doppelungen in den Überlappungen).
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_segmenter import split_sentences, segment_text, map_entities, Segment
+
+
+def _sentences(text):
+    return [text[start:end] for start, end in split_sentences(text)]
+
+
+# ==================== SATZGRENZEN ====================
+
+@pytest.mark.parametrize("text", [
+    "Frau Erika Beispiel, geb. Muster, wohnt in Wien.",
+    "Gemäß § 5 Abs. 2 S. 1 Nr. 3 i.V.m. Art. 6 DSGVO ist das zulässig.",
+    "Die Haftung folgt aus §§ 823 ff. BGB und ist unstrittig.",
+    "Die Verhandlung fand am 12. März 2024 statt.",
+    "Vertreten durch RA Dr. M. Mustermann, Tel. 0664 123456.",
+    "Er ist verh. und wh. in Graz, vgl. a.a.O. Rn. 5.",
+])
+def test_abbreviations_do_not_end_sentences(text):
+    assert _sentences(text) == [text]
+
+
+def test_splits_at_sentence_ends():
+    text = "Der Kläger zahlt. Die Beklagte schweigt! Warum? 2024 endete der Vertrag."
+    assert _sentences(text) == ["Der Kläger zahlt.", "Die Beklagte schweigt!", "Warum?",
+                                "2024 endete der Vertrag."]
+
+
+def test_blank_line_is_a_hard_boundary():
+    assert _sentences("Briefkopf Kanzlei\n\n  Sehr geehrte Damen und Herren") == [
+        "Briefkopf Kanzlei", "Sehr geehrte Damen und Herren"]
+
+
+def test_offsets_point_into_source_without_surrounding_whitespace():
+    text = "  Erster Satz.   Zweiter Satz.\n"
+    spans = split_sentences(text)
+    assert spans == [(2, 14), (17, 30)]
+    assert not split_sentences("   \n  ")
+
+
+# ==================== FENSTER ====================
+
+def _long_sentence(words=400):
+    return " ".join(f"Wort{i}" for i in range(words))
+
+
+def test_short_sentences_are_single_segments():
+    text = "Erster Satz. Zweiter Satz."
+    assert segment_text(text, max_chars=100, overlap=10) == [
+        Segment(0, 12, 0, 12), Segment(13, 26, 13, 26)]
+
+
+@pytest.mark.parametrize("max_chars,overlap", [(200, 20), (500, 100), (64, 64)])
+def test_windows_respect_bounds_and_cores_tile_the_sentence(max_chars, overlap):
+    text = "Einleitung. " + _long_sentence()
+    segments = segment_text(text, max_chars=max_chars, overlap=overlap)
+    windows = segments[1:]
+    assert len(windows) > 1
+
+    for seg in windows:
+        assert seg.end - seg.start <= max_chars
+        assert seg.start <= seg.core_start < seg.core_end <= seg.end
+    # Die Kerne überdecken den Satz lückenlos und ohne Überschneidung
+    assert windows[0].core_start == 12 and windows[-1].core_end == len(text)
+    for previous, current in zip(windows, windows[1:]):
+        assert previous.core_end == current.core_start
+        assert current.start < previous.end          # Fenster überlappen
+        assert text[current.start - 1] == " "        # Fenster beginnen nicht mitten im Wort
+
+
+def test_window_without_spaces_is_still_bounded():
+    text = "x" * 2500
+    segments = segment_text(text, max_chars=1000, overlap=100)
+    assert all(seg.end - seg.start <= 1000 for seg in segments)
+    assert segments[0].core_start == 0 and segments[-1].core_end == 2500
+
+
+# ==================== OFFSETS ZURÜCKRECHNEN ====================
+
+def test_map_entities_shifts_offsets_and_drops_overlap():
+    segment = Segment(start=100, end=200, core_start=120, core_end=180)
+    entities = [
+        {"start": 5, "end": 10, "text": "vorn", "label": "PER"},     # 105: vor dem Kern
+        {"start": 20, "end": 30, "text": "kern", "label": "PER"},    # 120: Kernbeginn
+        {"start": 79, "end": 90, "text": "ende", "label": "ORG"},    # 179: noch im Kern
+        {"start": 80, "end": 95, "text": "danach", "label": "ORG"},  # 180: nächster Kern
+    ]
+    mapped = map_entities(entities, segment)
+    assert [(e["start"], e["end"], e["text"]) for e in mapped] == [(120, 130, "kern"), (179, 190, "ende")]
+    assert entities[1]["start"] == 20   # Eingabe bleibt unverändert
+
+
+def test_every_entity_found_exactly_once_across_windows():
+    text = "Einleitung. " + " ".join(f"Herr Muster{i} und" for i in range(300))
+    pattern = re.compile(r"Muster\d+")
+
+    def detect(piece):
+        return [{"start": m.start(), "end": m.end(), "text": m.group(), "label": "PER"}
+                for m in pattern.finditer(piece)]
+
+    found = []
+    for seg in segment_text(text, max_chars=300, overlap=60):
+        found.extend(map_entities(detect(text[seg.start:seg.end]), seg))
+
+    expected = [(m.start(), m.end()) for m in pattern.finditer(text)]
+    assert sorted((e["start"], e["end"]) for e in found) == expected
+    assert all(text[e["start"]:e["end"]] == e["text"] for e in found)
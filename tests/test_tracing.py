@@ -0,0 +1,127 @@
+"""
+Tracing: Stufen werden dem Dokument bzw. dem Batch zugeordnet, Worker-Berichte
+zusammengeführt, langsame Dokumente per Sampling-Profiler aufgezeichnet.
+"""
+
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing
+from tracing import span
+
+
+@pytest.fixture
+def traced():
+    config = tracing.get_tracing_config()
+    tracing.enable_tracing()
+    tracing.enable_profiler(None)
+    tracing.reset_batch()
+    yield
+    tracing.set_tracing_config(config)
+    tracing.reset_batch()
+
+
+def test_disabled_tracing_records_nothing():
+    config = tracing.get_tracing_config()
+    tracing.enable_tracing(False)
+    try:
+        tracing.reset_batch()
+        tracing.begin_document("akt.docx")
+        with span("docx.load", bytes=10) as s:
+            s.add(bytes=5)
+        assert span("a") is span("b")              # ein gemeinsames Leer-Objekt
+        assert tracing.end_document() is None
+        assert tracing.batch_report()["stages"] == {}
+    finally:
+        tracing.set_tracing_config(config)
+
+
+def test_stages_per_document_and_batch(traced):
+    tracing.begin_document("klage.pdf", bytes=2000)
+    with span("pdf.extract", pages=4):
+        with span("ner.flair", texts=3) as ner:
+            time.sleep(0.01)
+            ner.add(texts=2)
+    with span("pdf.extract", pages=2):
+        pass
+    tracing.add_document_counts(pages=6)
+    report = tracing.end_document()
+
+    # Außerhalb eines Dokuments (z.B. API-Nachbearbeitung): dem Batch zugeordnet
+    with span("api.request", texts=7):
+        pass
+
+    extract = report["stages"]["pdf.extract"]
+    assert (extract["calls"], extract["pages"]) == (2, 6)
+    assert report["stages"]["ner.flair"]["texts"] == 5
+    assert report["stages"]["ner.flair"]["texts_per_second"] > 0
+    assert extract["seconds"] >= report["stages"]["ner.flair"]["seconds"] >= 0.01   # verschachtelt
+    assert report["counts"] == {"bytes": 2000, "pages": 6}
+
+    batch = tracing.batch_report()
+    assert [d["name"] for d in batch["documents"]] == ["klage.pdf"]
+    assert set(batch["stages"]) == {"pdf.extract", "ner.flair", "api.request"}
+    assert batch["stages"]["api.request"]["texts"] == 7
+
+
+def test_worker_report_is_merged_into_current_document(traced):
+    # Im Worker: Bericht nicht selbst verbuchen, sondern zurückgeben
+    tracing.begin_document("vertrag.docx")
+    with span("docx.redact", paragraphs=40):
+        pass
+    worker_report = tracing.end_document(record=False)
+    assert tracing.batch_report()["documents"] == []
+
+    tracing.begin_document("vertrag.docx", bytes=900)
+    with span("batch.wait"):
+        pass
+    tracing.merge_document_report(json.loads(json.dumps(worker_report)))
+    report = tracing.end_document()
+
+    assert report["stages"]["docx.redact"]["paragraphs"] == 40
+    assert "paragraphs_per_second" not in report["counts"]
+    assert set(report["stages"]) == {"docx.redact", "batch.wait"}
+
+
+def _slow_stage():
+    time.sleep(0.08)
+
+
+def test_slow_document_writes_folded_profile(traced, tmp_path):
+    tracing.enable_profiler(0.05, interval=0.002, out_dir=str(tmp_path))
+    tracing.begin_document("langsam/akt 1.docx")
+    _slow_stage()
+    report = tracing.end_document()
+
+    path = report["profile"]
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).startswith("akt_1.docx.")
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert any("_slow_stage (test_tracing.py" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    tracing.begin_document("schnell.docx")
+    assert "profile" not in tracing.end_document()
+    assert tracing.batch_report()["profiles"] == [path]
+
+
+def test_written_report_and_summary(traced, tmp_path):
+    tracing.begin_document("a.docx")
+    with span("docx.save", bytes=4096):
+        time.sleep(0.005)
+    tracing.end_document()
+
+    path = str(tmp_path / "trace.json")
+    report = tracing.write_report(path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["stages"] == report["stages"]
+    assert not os.path.exists(path + ".tmp")
+    (line,) = tracing.summary_lines(report)
+    assert line.startswith("docx.save: ") and "1 Aufruf(en)" in line and "bytes/s" in line
@@ -0,0 +1,104 @@
+"""
+Kompilierte Whitelist (frozensets + Aho-Corasick): dieselben Entscheidungen wie
+die frühere Schleife über alle Begriffe — auch nach eigenen Ergänzungen.
+"""
+
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+
+LABELS = ["PER", "ORG", "LOC", "MISC"]
+
+
+def loop_is_whitelisted(entity_text, entity_label):
+    """Referenz: die ursprüngliche Implementierung von is_whitelisted()."""
+    text_clean = entity_text.strip()
+    if text_clean in docx_redactor.WHITELIST_MISC:
+        return True
+    if entity_label == "ORG":
+        if text_clean in docx_redactor.WHITELIST_ORGS:
+            return True
+        for term in docx_redactor.WHITELIST_ORGS:
+            if text_clean.startswith(term) or term in text_clean:
+                return True
+    if entity_label == "LOC":
+        if text_clean in docx_redactor.WHITELIST_LOCS:
+            return True
+    return False
+
+
+def loop_should_skip_entity(ent_text):
+    """Referenz: die ursprüngliche Implementierung von _should_skip_entity()."""
+    text = ent_text.strip()
+    if len(text) <= 1:
+        return True
+    if text.replace(" ", "").isdigit():
+        return True
+    if re.match(r'^\d{1,6}/\d{1,6}$', text):
+        return True
+    return text in docx_redactor.COMMON_FALSE_POSITIVES
+
+
+def _entity_texts(seed, count=400):
+    """Whitelist-Begriffe pur, mit Leerraum, als Teil längerer Namen und leicht verändert."""
+    rng = random.Random(seed)
+    terms = sorted(docx_redactor.WHITELIST_ORGS | docx_redactor.WHITELIST_LOCS
+                   | docx_redactor.WHITELIST_MISC | docx_redactor.COMMON_FALSE_POSITIVES)
+    texts = ["", " ", "X", "12 34", "128/542", "Erika Beispiel", "Musterbach GmbH"]
+    for _ in range(count):
+        term = rng.choice(terms)
+        variant = rng.randrange(5)
+        if variant == 0:
+            texts.append(f"  {term}\n")
+        elif variant == 1:
+            texts.append(f"{term} {rng.choice(['Wien', 'für ZRS Graz', 'GmbH'])}")
+        elif variant == 2:
+            texts.append(f"{rng.choice(['Das', 'Beim', 'Musterbach'])} {term}")
+        elif variant == 3:
+            texts.append(term[:-1] or term)
+        else:
+            texts.append(term.lower())
+    return texts
+
+
+@pytest.fixture
+def custom_terms():
+    added = {"ORG": {"Musterbach Verwaltung", "Stadtwerke"}, "LOC": {"Beispielstadt"},
+             "MISC": {"Testakte"}, "FALSE_POSITIVES": {"Antragstellerin"}}
+    targets = {"ORG": docx_redactor.WHITELIST_ORGS, "LOC": docx_redactor.WHITELIST_LOCS,
+               "MISC": docx_redactor.WHITELIST_MISC,
+               "FALSE_POSITIVES": docx_redactor.COMMON_FALSE_POSITIVES}
+    for key, terms in added.items():
+        targets[key].update(terms)
+    docx_redactor.rebuild_whitelist()
+    yield added
+    for key, terms in added.items():
+        targets[key].difference_update(terms)
+    docx_redactor.rebuild_whitelist()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_loop_over_all_terms(seed):
+    for text in _entity_texts(seed):
+        for label in LABELS:
+            assert docx_redactor.is_whitelisted(text, label) == loop_is_whitelisted(text, label), (text, label)
+        assert docx_redactor._should_skip_entity(text, "PER") == loop_should_skip_entity(text), text
+
+
+def test_custom_terms_apply_after_rebuild(custom_terms):
+    assert docx_redactor.is_whitelisted("Stadtwerke Musterbach", "ORG")
+    assert not docx_redactor.is_whitelisted("Stadtwerke Musterbach", "PER")
+    assert docx_redactor.is_whitelisted(" Beispielstadt ", "LOC")
+    assert docx_redactor.is_whitelisted("Testakte", "PER")
+    assert docx_redactor._should_skip_entity("Antragstellerin", "PER")
+    texts = _entity_texts(seed=11) + ["Die Musterbach Verwaltung Nord", "Stadtwerk"]
+    for text in texts:
+        for label in LABELS:
+            assert docx_redactor.is_whitelisted(text, label) == loop_is_whitelisted(text, label), (text, label)
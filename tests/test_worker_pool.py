@@ -0,0 +1,68 @@
+"""
+Langlebiger Worker-Pool: ein Pool pro Prozess, der über Aufrufe hinweg bestehen
+bleibt, und eine Worker-Anzahl, die auch durch den Arbeitsspeicher begrenzt ist.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_redactor
+import worker_pool
+
+
+@pytest.fixture(autouse=True)
+def no_pool():
+    worker_pool.shutdown_worker_pool()
+    yield
+    worker_pool.shutdown_worker_pool()
+
+
+def test_pool_is_reused_until_its_size_changes():
+    # Prozesse startet der Pool erst beim ersten Auftrag — hier wird nur die Identität geprüft
+    first = worker_pool.get_worker_pool(2)
+    assert worker_pool.get_worker_pool(2) is first
+    resized = worker_pool.get_worker_pool(3)
+    assert resized is not first
+    assert worker_pool.get_worker_pool(3) is resized
+
+
+def test_worker_count_is_capped_by_memory(monkeypatch):
+    monkeypatch.setattr(docx_redactor, "worker_memory_mb", lambda: 1000)
+    monkeypatch.setattr(worker_pool, "available_memory_mb",
+                        lambda: worker_pool.MEMORY_RESERVE_MB + 3500)
+    assert worker_pool.worker_limit(8) == 3
+    assert worker_pool.worker_limit(2) == 2
+
+    monkeypatch.setattr(worker_pool, "available_memory_mb", lambda: 100)
+    assert worker_pool.worker_limit(8) == 1
+
+    monkeypatch.setattr(worker_pool, "available_memory_mb", lambda: None)
+    assert worker_pool.worker_limit(8) == 8
+
+
+def test_running_pool_keeps_its_size_while_its_workers_use_the_memory(monkeypatch):
+    monkeypatch.setattr(docx_redactor, "worker_memory_mb", lambda: 1000)
+    monkeypatch.setattr(worker_pool, "available_memory_mb",
+                        lambda: worker_pool.MEMORY_RESERVE_MB + 4000)
+    workers = worker_pool.worker_limit(6)
+    pool = worker_pool.get_worker_pool(workers)
+
+    # Die geladenen Modelle belegen jetzt den Speicher — kein Neustart mit weniger Workern
+    monkeypatch.setattr(worker_pool, "available_memory_mb", lambda: worker_pool.MEMORY_RESERVE_MB)
+    assert worker_pool.worker_limit(6) == workers == 4
+    assert worker_pool.get_worker_pool(worker_pool.worker_limit(6)) is pool
+
+
+def test_engine_memory_estimate_without_local_models(monkeypatch):
+    class _Client:
+        def serves(self, engine):
+            return True
+
+    monkeypatch.setattr(docx_redactor, "get_ner_client", lambda: None)
+    local = docx_redactor.worker_memory_mb()
+    monkeypatch.setattr(docx_redactor, "get_ner_client", lambda: _Client())
+    assert docx_redactor.worker_memory_mb() == docx_redactor.WORKER_BASE_MEMORY_MB < local
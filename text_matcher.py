@@ -0,0 +1,97 @@
+"""
+Mehrfach-Begriffssuche (Aho-Corasick) für Lernebene und Whitelist.
+
+Statt für jeden Begriff einzeln `term in text` bzw. `text.find(term)` aufzurufen,
+wird aus allen Begriffen einmal ein Automat gebaut. Eine einzige Iteration über
+den Text findet dann alle Vorkommen aller Begriffe samt Offsets — unabhängig
+davon, wie lang die Begriffsliste ist.
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick-Automat über einer festen Begriffsmenge.
+    Jedem Begriff kann ein Wert (z.B. das Label) zugeordnet werden.
+    """
+
+    def __init__(self, terms=None):
+        # Zustand 0 ist die Wurzel; pro Zustand: Übergänge, Fail-Link, Ausgaben
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # Liste von (Begriffslänge, Wert)
+        self._size = 0
+        if terms:
+            if isinstance(terms, dict):
+                terms = terms.items()
+            else:
+                terms = ((term, term) for term in terms)
+            for term, value in terms:
+                self._add(term, value)
+        self._build()
+
+    def __len__(self):
+        return self._size
+
+    def _add(self, term, value):
+        if not term:
+            return
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state].append((len(term), value))
+        self._size += 1
+
+    def _build(self):
+        # Breitensuche: Fail-Links setzen und Ausgaben der Suffix-Zustände übernehmen
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """Liefert alle (start, end, wert)-Treffer in einem Durchlauf (auch überlappende)."""
+        if not self._size:
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield pos + 1 - length, pos + 1, value
+
+    def contains_any(self, text):
+        """True, wenn mindestens ein Begriff im Text vorkommt."""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+
+    def find_longest(self, text):
+        """
+        Nicht überlappende Treffer, von links nach rechts, bei gleichem Start der längste.
+        Gibt eine Liste von (start, end, wert) zurück.
+        """
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], -(m[1] - m[0])))
+        result = []
+        last_end = 0
+        for start, end, value in matches:
+            if start >= last_end:
+                result.append((start, end, value))
+                last_end = end
+        return result
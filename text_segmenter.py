@@ -0,0 +1,147 @@
+"""
+Segmentierung der NER-Eingaben: Sätze bzw. begrenzte Fenster mit Offsets.
+
+Ganze PDF-Seiten oder E-Mail-Texte als ein einziger Flair-Satz bzw. spaCy-Doc
+sind langsam, speicherhungrig (und können spaCys max_length überschreiten).
+Texte werden deshalb in Sätze zerlegt — unter Beachtung deutscher (juristischer)
+Abkürzungen wie "Abs.", "Nr.", "Dr.", "geb.", "i.V.m." sowie von Ordinalzahlen ("12. März")
+und Initialen. Überlange Sätze werden in Fenster mit kleiner Überlappung geteilt.
+
+Jedes Segment kennt seine Position im Quelltext. Bei Fenstern gehört jede Stelle
+genau einem "Kernbereich" (Mitte der Überlappung als Grenze); eine Entity wird nur
+aus dem Fenster übernommen, in dessen Kern sie beginnt — so entstehen in den
+Überlappungen keine Doppelungen.
+"""
+
+import re
+from collections import namedtuple
+
+# Bei Änderungen an Satzgrenzen oder Fenstern erhöhen (Teil der NER-Cache-Signatur)
+SEGMENTER_VERSION = 2
+
+# start/end: Ausschnitt im Quelltext; core_start/core_end: Bereich, aus dem Entities gelten
+Segment = namedtuple("Segment", "start end core_start core_end")
+
+# Abkürzungen, nach denen kein Satzende ist (mit Punkt, Groß-/Kleinschreibung beachtet)
+ABBREVIATIONS = frozenset("""
+    Abs. Nr. Nrn. Art. Artt. S. Hs. Alt. Var. lit. Buchst. Ziff. UAbs. Unterabs. Rn. Rz. Tz.
+    Az. Gz. Bd. Aufl. Anm. Kap. Anh. Einl. Vorb. Slg. Bl. Fn. Nachw.
+    Dr. Prof. Dipl. Ing. Mag. jur. med. rer. nat. phil. oec. Hr. Hrn. Fr. RA. RAin. StB. WP.
+    v. vs. gem. vgl. ggf. bzw. bzgl. ca. inkl. exkl. usw. etc. evtl. sog. ua. zzgl. abzgl. insb. insbes.
+    Urt. Beschl. Entsch. Verf. Verw. Gesch. Str. St. Pl.
+    z.B. u.a. d.h. i.V.m. i.S.d. i.S.v. i.d.F. i.d.R. a.F. n.F. m.w.N. u.U. o.Ä. o.g. s.o. s.u.
+    e.V. e.K. a.D. i.R. z.Hd. z.Zt. u.ä. Co. Gebr. Inh. Ges. Jan. Feb. Febr. Aug. Sept. Okt. Nov. Dez.
+    geb. verh. verw. gesch. led. verst. sen. jun. wh. whft. Tel. Fax. Mob. Kto. Hausnr. Abt. Bez. Pos.
+    f. ff. a.a.O. aaO. ebd. Rspr. h.M. h.L. m.E. str. zit. lt. bspw. ggü. Mio. Mrd. Tsd.
+    Kl. Bekl. Ast. Ag. Bf. Vors. Ri. StA. Ber. Rev.
+""".split())
+
+# Kandidaten für Satzgrenzen: Satzzeichen + Leerraum vor einem möglichen Satzanfang,
+# oder eine Leerzeile (harte Grenze, z.B. zwischen Absätzen einer PDF-Seite)
+_BOUNDARY_PATTERN = re.compile(
+    r'[.!?]["“”»)\']*\s+(?=["„“»(\']?[A-ZÄÖÜ0-9§])'
+    r'|\n[ \t]*\n\s*'
+)
+_INITIAL_PATTERN = re.compile(r'^[A-ZÄÖÜ]\.$')
+_ORDINAL_PATTERN = re.compile(r'^\d{1,4}\.$')
+
+
+def _is_sentence_end(text, match):
+    """Prüft, ob ein Punkt an dieser Stelle wirklich ein Satzende ist."""
+    end_char_pos = match.start()
+    if text[end_char_pos] != ".":
+        return True  # ! ? und Leerzeilen
+    word_start = max(text.rfind(" ", 0, end_char_pos), text.rfind("\n", 0, end_char_pos)) + 1
+    word = text[word_start:end_char_pos + 1].lstrip("(\"„“»'")
+    if word in ABBREVIATIONS:
+        return False
+    if _INITIAL_PATTERN.match(word):   # "M. Mustermann"
+        return False
+    if _ORDINAL_PATTERN.match(word):   # "am 12. März", "§ 5 Abs. 2 S. 1"
+        return False
+    return True
+
+
+def split_sentences(text):
+    """Gibt die Satzgrenzen als Liste von (start, end) zurück (ohne führenden/folgenden Leerraum)."""
+    spans = []
+    start = 0
+    for match in _BOUNDARY_PATTERN.finditer(text):
+        if not _is_sentence_end(text, match):
+            continue
+        # Satzzeichen (und schließende Anführungszeichen) gehören zum Satz
+        end = match.start() + len(match.group().rstrip())
+        if text[match.start()] == "\n":
+            end = match.start()
+        spans.append((start, end))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    result = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            result.append((s, e))
+    return result
+
+
+def _windows(text, start, end, max_chars, overlap):
+    """Teilt einen überlangen Abschnitt in Fenster (Schnitt möglichst an Leerraum)."""
+    windows = []
+    pos = start
+    while True:
+        if end - pos <= max_chars:
+            windows.append((pos, end))
+            break
+        cut = pos + max_chars
+        space = text.rfind(" ", cut - overlap, cut)
+        if space > pos + overlap:
+            cut = space
+        windows.append((pos, cut))
+        next_pos = cut - overlap
+        # Fensteranfang nicht mitten in ein Wort legen
+        space = text.find(" ", next_pos, cut)
+        pos = space + 1 if space != -1 else next_pos
+
+    segments = []
+    for i, (w_start, w_end) in enumerate(windows):
+        # Grenze zwischen zwei Kernen: Mitte der Überlappung
+        core_start = start if i == 0 else (windows[i - 1][1] + w_start) // 2
+        core_end = end if i == len(windows) - 1 else (w_end + windows[i + 1][0]) // 2
+        segments.append(Segment(w_start, w_end, core_start, core_end))
+    return segments
+
+
+def segment_text(text, max_chars=1000, overlap=100):
+    """
+    Zerlegt einen Text in Segmente (Sätze; überlange Sätze in Fenster mit Überlappung).
+    Kurze Texte ohne Satzgrenze ergeben genau ein Segment.
+    """
+    overlap = max(0, min(overlap, max_chars // 2))
+    segments = []
+    for start, end in split_sentences(text):
+        if end - start <= max_chars:
+            segments.append(Segment(start, end, start, end))
+        else:
+            segments.extend(_windows(text, start, end, max_chars, overlap))
+    return segments
+
+
+def map_entities(entities, segment):
+    """
+    Verschiebt die Offsets der Entities eines Segments auf den Quelltext und verwirft
+    Entities, die nicht im Kernbereich des Segments beginnen (Überlappungen).
+    """
+    mapped = []
+    for ent in entities:
+        start = segment.start + ent["start"]
+        if not segment.core_start <= start < segment.core_end:
+            continue
+        shifted = dict(ent)
+        shifted["start"] = start
+        shifted["end"] = segment.start + ent["end"]
+        mapped.append(shifted)
+    return mapped
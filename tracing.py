@@ -0,0 +1,313 @@
+"""
+Zeitmessung pro Verarbeitungsstufe (Tracing) und optionaler Sampling-Profiler.
+
+- span("pdf.save", bytes=...) misst eine Stufe; ist das Tracing aus, liefert span()
+  ein gemeinsames Leer-Objekt (eine Abfrage, keine Zeitmessung, keine Allokation)
+- Messungen werden dem aktuellen Dokument zugeordnet (begin_document/end_document)
+  oder — außerhalb eines Dokuments, z.B. API-Nachbearbeitung — dem Batch
+- batch_report() fasst alles zusammen: Wandzeit, Aufrufe, Durchsatz
+  (Bytes/Seiten/Absätze/Texte pro Sekunde) pro Stufe, pro Dokument und gesamt
+- Worker-Prozesse liefern ihren Dokument-Bericht mit (merge_document_report)
+- Sampling-Profiler (opt-in): tastet während eines Dokuments den Stack ab und
+  schreibt für langsame Dokumente eine Datei im "folded"-Format (flamegraph.pl,
+  speedscope)
+
+Einschalten: enable_tracing() bzw. REDACT_TRACE=1;
+Profiler: enable_profiler(schwelle_sekunden) bzw. REDACT_PROFILE_SLOW=<Sekunden>.
+Stufen können verschachtelt sein (ner.* läuft z.B. innerhalb von docx.ner) —
+die Zeiten der Stufen addieren sich daher nicht zur Wandzeit.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+_enabled = os.getenv("REDACT_TRACE", "0") == "1"
+
+# Profiler: Dokumente, die länger als PROFILE_SLOW_SECONDS brauchen, werden gespeichert
+PROFILE_SLOW_SECONDS = float(os.getenv("REDACT_PROFILE_SLOW", "0")) or None
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = os.getenv("REDACT_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "anonymizer-profiles")
+
+_local = threading.local()
+_lock = threading.Lock()
+_documents = []    # fertige Dokument-Berichte des aktuellen Batches
+_unattributed = {}  # Stufen außerhalb eines Dokuments
+_batch_started = time.perf_counter()
+
+
+def enable_tracing(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_tracing_enabled():
+    return _enabled
+
+
+def enable_profiler(slow_seconds=None, interval=None, out_dir=None):
+    """Profiler für Dokumente ab slow_seconds Sekunden (None = aus)."""
+    global PROFILE_SLOW_SECONDS, PROFILE_INTERVAL, PROFILE_DIR
+    PROFILE_SLOW_SECONDS = slow_seconds
+    if interval:
+        PROFILE_INTERVAL = interval
+    if out_dir:
+        PROFILE_DIR = out_dir
+
+
+def get_tracing_config():
+    """Einstellungen zum Weitergeben an Worker-Prozesse (siehe set_tracing_config)."""
+    return {"enabled": _enabled, "slow_seconds": PROFILE_SLOW_SECONDS,
+            "interval": PROFILE_INTERVAL, "out_dir": PROFILE_DIR}
+
+
+def set_tracing_config(config):
+    enable_tracing(config["enabled"])
+    enable_profiler(config["slow_seconds"], config["interval"], config["out_dir"])
+
+
+# ==================== SPANS ====================
+
+def _add_stage(stages, name, seconds, counts, calls=1):
+    entry = stages.get(name)
+    if entry is None:
+        entry = stages[name] = {"calls": 0, "seconds": 0.0}
+    entry["calls"] += calls
+    entry["seconds"] += seconds
+    for key, value in counts.items():
+        entry[key] = entry.get(key, 0) + value
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "counts", "started")
+
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = counts
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def add(self, **counts):
+        """Mengen nachtragen, die erst während der Stufe bekannt werden."""
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        document = getattr(_local, "document", None)
+        if document is not None:
+            _add_stage(document["stages"], self.name, seconds, self.counts)
+        else:
+            with _lock:
+                _add_stage(_unattributed, self.name, seconds, self.counts)
+        return False
+
+
+def span(name, **counts):
+    """
+    Misst eine Stufe: with span("docx.save", bytes=123): ...
+    counts: Mengen (bytes, pages, paragraphs, texts, ...) für den Durchsatz.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, counts)
+
+
+# ==================== DOKUMENTE & BATCH ====================
+
+def begin_document(name, **counts):
+    """Beginnt den Bericht für ein Dokument (im aktuellen Thread)."""
+    if not _enabled:
+        return
+    _local.document = {"name": name, "started": time.perf_counter(), "counts": counts, "stages": {}}
+    if PROFILE_SLOW_SECONDS:
+        _local.profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL)
+        _local.profiler.start()
+
+
+def add_document_counts(**counts):
+    """Mengen des aktuellen Dokuments (z.B. Seiten) nachtragen."""
+    document = getattr(_local, "document", None)
+    if document is not None:
+        for key, value in counts.items():
+            document["counts"][key] = document["counts"].get(key, 0) + value
+
+
+def merge_document_report(report):
+    """Übernimmt den Bericht aus einem Worker-Prozess in das aktuelle Dokument."""
+    document = getattr(_local, "document", None)
+    if document is None or not report:
+        return
+    for name, entry in report["stages"].items():
+        counts = {k: v for k, v in entry.items() if k not in ("calls", "seconds") and not k.endswith("_per_second")}
+        _add_stage(document["stages"], name, entry["seconds"], counts, calls=entry["calls"])
+    for key, value in report.get("counts", {}).items():
+        document["counts"].setdefault(key, value)
+    if report.get("profile"):
+        document["profile"] = report["profile"]
+
+
+def end_document(record=True):
+    """
+    Schließt den Bericht des aktuellen Dokuments ab und gibt ihn zurück.
+    record=False: nicht in den Batch übernehmen (z.B. im Worker, der Bericht geht an den Hauptprozess).
+    """
+    document = getattr(_local, "document", None)
+    if document is None:
+        return None
+    _local.document = None
+    wall = time.perf_counter() - document.pop("started")
+    report = {"name": document["name"], "wall_seconds": round(wall, 4),
+              "counts": document["counts"], "stages": _finish_stages(document["stages"])}
+    if document.get("profile"):
+        report["profile"] = document["profile"]
+
+    profiler = getattr(_local, "profiler", None)
+    if profiler is not None:
+        _local.profiler = None
+        profiler.stop()
+        # Ein Profil aus dem Worker-Prozess (die eigentliche Arbeit) hat Vorrang
+        if PROFILE_SLOW_SECONDS and wall >= PROFILE_SLOW_SECONDS and not report.get("profile"):
+            report["profile"] = profiler.dump(PROFILE_DIR, document["name"])
+
+    if record:
+        with _lock:
+            _documents.append(report)
+    return report
+
+
+def _finish_stages(stages):
+    """Rundet die Zeiten und ergänzt den Durchsatz pro Menge (z.B. pages_per_second)."""
+    finished = {}
+    for name, entry in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+        result = dict(entry)
+        seconds = entry["seconds"]
+        for key, value in entry.items():
+            if key not in ("calls", "seconds") and seconds > 0:
+                result[f"{key}_per_second"] = round(value / seconds, 1)
+        result["seconds"] = round(seconds, 4)
+        finished[name] = result
+    return finished
+
+
+def reset_batch():
+    """Verwirft alle bisherigen Berichte (vor einem neuen Lauf)."""
+    global _batch_started
+    with _lock:
+        _documents.clear()
+        _unattributed.clear()
+        _batch_started = time.perf_counter()
+
+
+def batch_report():
+    """Bericht über alle Dokumente seit reset_batch(): pro Dokument und zusammengefasst."""
+    with _lock:
+        documents = list(_documents)
+        stages = {name: dict(entry) for name, entry in _unattributed.items()}
+    for document in documents:
+        for name, entry in document["stages"].items():
+            counts = {k: v for k, v in entry.items()
+                      if k not in ("calls", "seconds") and not k.endswith("_per_second")}
+            _add_stage(stages, name, entry["seconds"], counts, calls=entry["calls"])
+    return {
+        "wall_seconds": round(time.perf_counter() - _batch_started, 4),
+        "documents": documents,
+        "stages": _finish_stages(stages),
+        "profiles": [d["profile"] for d in documents if d.get("profile")],
+    }
+
+
+# ==================== SAMPLING-PROFILER ====================
+
+class SamplingProfiler:
+    """
+    Tastet in festen Abständen den Stack eines Threads ab (sys._current_frames) und
+    zählt gleiche Stacks. Kein Tracing-Hook — der überwachte Thread läuft unverändert.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, out_dir, name):
+        """Schreibt die Stacks im folded-Format ("a;b;c anzahl") und gibt den Pfad zurück."""
+        os.makedirs(out_dir, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]", "_", os.path.basename(name))
+        path = os.path.join(out_dir, f"{safe_name}.{os.getpid()}.{int(time.time())}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+# ==================== AUSGABE ====================
+
+def write_report(path, report=None):
+    """Schreibt den Bericht (Standard: batch_report()) atomar als JSON und gibt ihn zurück."""
+    if report is None:
+        report = batch_report()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return report
+
+
+def format_rates(entry):
+    """Durchsatz einer Stufe als Text, z.B. "1,200 bytes/s, 35 pages/s"."""
+    return ", ".join(f"{value:,.0f} {key[:-len('_per_second')]}/s"
+                     for key, value in entry.items() if key.endswith("_per_second"))
+
+
+def summary_lines(report, limit=5):
+    """Die langsamsten Stufen als Textzeilen (für die Konsolenausgabe)."""
+    lines = []
+    for name, entry in list(report["stages"].items())[:limit]:
+        rates = format_rates(entry)
+        lines.append(f"{name}: {entry['seconds']:.2f}s in {entry['calls']} Aufruf(en)"
+                     + (f" ({rates})" if rates else ""))
+    return lines
@@ -0,0 +1,398 @@
+"""
+Headless-Betrieb: überwacht einen Eingangsordner und schwärzt neue Dateien automatisch.
+
+- Die NER-Modelle werden einmal beim Start geladen und bleiben geladen: im Daemon
+  selbst (kleine Durchläufe laufen im Prozess) und in den Workern des langlebigen
+  Pools (worker_pool), den alle größeren Durchläufe gemeinsam nutzen
+- Neue Dateien werden per Polling erkannt und erst verarbeitet, wenn sich Größe und
+  Änderungszeit zwischen zwei Durchläufen nicht mehr ändern (Datei fertig geschrieben)
+- Ergebnisse landen in redacted/, Originale werden nach processed/ (bzw. failed/) verschoben
+- Live-Zähler (Dateien/Minute, Warteschlange, Latenz pro Stufe) werden regelmäßig
+  ausgegeben und in eine Statusdatei (JSON) im Eingangsordner geschrieben
+
+Aufruf:
+    python watch_daemon.py --inbox /pfad/zum/eingang
+    python watch_daemon.py --config daemon.json
+    python main.py --inbox /pfad/zum/eingang      # gleichwertig
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import time
+from collections import deque
+
+from docx_redactor import (EntityMapper, set_sensitivity, set_ner_engine,
+                           warmup_ner_engine, get_engine_name, set_flair_cascade,
+                           get_cascade_stats, refresh_learned_entities)
+from file_converter import convert_office_files
+from batch_executor import make_job, run_batch, default_worker_count
+import tracing
+import worker_pool
+
+import warnings
+warnings.simplefilter("ignore", category=DeprecationWarning)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".doc", ".msg")
+
+# Durchläufe mit höchstens so vielen Dateien laufen im Daemon-Prozess auf den
+# dort geladenen Modellen (der Pool lohnt sich erst für mehr Dateien)
+IN_PROCESS_MAX_FILES = 2
+
+DEFAULT_CONFIG = {
+    "inbox": None,
+    "output_dir": None,       # Standard: <inbox>/redacted
+    "processed_dir": None,    # Standard: <inbox>/processed
+    "failed_dir": None,       # Standard: <inbox>/failed
+    "engine": "flair",
+    "sensitivity": "standard",
+    "cascade": False,         # Flair-Kaskade: zweites Modell nur bei Bedarf
+    "convert_pdf": False,     # DOCX/DOC vor der Schwärzung in PDF umwandeln
+    "interval": 2.0,          # Sekunden zwischen zwei Durchläufen
+    "max_batch": 50,          # höchstens so viele Dateien pro Durchlauf
+    "workers": None,          # None = automatisch
+    "stats_interval": 60.0,   # Sekunden zwischen zwei Statusausgaben
+    "status_file": None,      # Standard: <inbox>/daemon_status.json
+    "trace_dir": None,        # Laufzeitbericht (JSON) pro Durchlauf in diesen Ordner
+    "profile_slow": None,     # Sekunden: langsamere Dokumente werden profiliert (in trace_dir)
+}
+
+
+# ==================== ZÄHLER ====================
+
+class DaemonStats:
+    """Live-Zähler: Durchsatz, Warteschlange und Latenz pro Verarbeitungsstufe."""
+
+    # Zeitfenster für den Durchsatz (Dateien/Minute)
+    RATE_WINDOW = 300
+
+    def __init__(self):
+        self.started = time.time()
+        self.files_done = 0
+        self.files_failed = 0
+        self.queue_depth = 0
+        self._finished = deque()
+        self._stages = {}
+
+    def record_stage(self, stage, seconds, files=1):
+        """Erfasst die Dauer einer Stufe (Sekunden pro Datei)."""
+        if files <= 0:
+            return
+        entry = self._stages.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        per_file = seconds / files
+        entry["count"] += files
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], per_file)
+        entry["last"] = per_file
+
+    def record_file(self, ok):
+        if ok:
+            self.files_done += 1
+        else:
+            self.files_failed += 1
+        self._finished.append(time.time())
+
+    def files_per_minute(self):
+        now = time.time()
+        while self._finished and now - self._finished[0] > self.RATE_WINDOW:
+            self._finished.popleft()
+        window = min(self.RATE_WINDOW, max(now - self.started, 1.0))
+        return len(self._finished) * 60.0 / window
+
+    def snapshot(self):
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "files_done": self.files_done,
+            "files_failed": self.files_failed,
+            "files_per_minute": round(self.files_per_minute(), 2),
+            "queue_depth": self.queue_depth,
+            "stages": {
+                stage: {
+                    "files": entry["count"],
+                    "avg_seconds": round(entry["total"] / entry["count"], 3),
+                    "max_seconds": round(entry["max"], 3),
+                    "last_seconds": round(entry["last"], 3),
+                }
+                for stage, entry in self._stages.items()
+            },
+            "ner_cascade": get_cascade_stats(),
+        }
+
+    def summary_line(self):
+        snap = self.snapshot()
+        stages = ", ".join(f"{stage} {s['avg_seconds']:.2f}s" for stage, s in snap["stages"].items())
+        return (f"[Status] {snap['files_done']} fertig, {snap['files_failed']} fehlgeschlagen, "
+                f"{snap['files_per_minute']:.1f} Dateien/min, Warteschlange {snap['queue_depth']}"
+                + (f" | Latenz pro Datei: {stages}" if stages else ""))
+
+
+# ==================== EINGANGSORDNER ====================
+
+class InboxWatcher:
+    """Erkennt neue, fertig geschriebene Dateien im Eingangsordner (Polling)."""
+
+    def __init__(self, inbox):
+        self.inbox = inbox
+        self._seen = {}  # Pfad → (Größe, Änderungszeit, erstmals gesehen)
+
+    def scan(self):
+        """
+        Gibt (stabile Dateien, Anzahl wartender Dateien) zurück. Stabil ist eine Datei,
+        wenn Größe und Änderungszeit seit dem letzten Durchlauf unverändert sind.
+        """
+        current = {}
+        stable = []
+        for name in sorted(os.listdir(self.inbox)):
+            path = os.path.join(self.inbox, name)
+            if name.startswith((".", "~$")) or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+            signature = (st.st_size, st.st_mtime)
+            previous = self._seen.get(path)
+            first_seen = previous[2] if previous else time.time()
+            current[path] = signature + (first_seen,)
+            if previous and previous[:2] == signature:
+                stable.append(path)
+        self._seen = current
+        return stable, len(current)
+
+    def first_seen(self, path):
+        entry = self._seen.get(path)
+        return entry[2] if entry else time.time()
+
+    def forget(self, path):
+        self._seen.pop(path, None)
+
+
+# ==================== VERARBEITUNG ====================
+
+def _unique_path(folder, name):
+    """Zielpfad in folder; existiert er schon, wird ein Zeitstempel angehängt."""
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        return path
+    base, ext = os.path.splitext(name)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    counter = 1
+    while True:
+        path = os.path.join(folder, f"{base}_{stamp}_{counter}{ext}")
+        if not os.path.exists(path):
+            return path
+        counter += 1
+
+
+def _archive(path, folder):
+    """Verschiebt das Original nach processed/ bzw. failed/."""
+    try:
+        shutil.move(path, _unique_path(folder, os.path.basename(path)))
+    except OSError as e:
+        print(f"  Warnung: {os.path.basename(path)} konnte nicht verschoben werden: {e}")
+
+
+def process_batch(paths, config, stats, watcher):
+    """
+    Verarbeitet eine Gruppe stabiler Dateien. Jede Gruppe bekommt einen eigenen
+    EntityMapper (Platzhalter gelten innerhalb eines Durchlaufs, wie bei main.py).
+    """
+    refresh_learned_entities()
+    mapper = EntityMapper(sensitivity=config["sensitivity"])
+    conv_dir = os.path.join(config["inbox"], "converted")
+    os.makedirs(conv_dir, exist_ok=True)
+
+    jobs = []
+    conversions = []
+    origin = {}         # Eingabe des Auftrags → Original im Eingangsordner
+    intermediates = {}  # Original → Zwischendatei (wird danach gelöscht)
+
+    for path in paths:
+        name = os.path.basename(path)
+        filename, ext = os.path.splitext(name)
+        ext = ext.lower()
+
+        if ext in (".docx", ".doc") and (config["convert_pdf"] or ext == ".doc"):
+            target_ext = ".pdf" if config["convert_pdf"] else ".docx"
+            converted = _unique_path(conv_dir, filename + target_ext)
+            conversions.append((path, converted, target_ext[1:]))
+            intermediates[path] = converted
+            kind = "pdf" if config["convert_pdf"] else "docx"
+            output = _unique_path(config["output_dir"], filename + target_ext)
+            jobs.append(make_job(kind, converted, output))
+            origin[converted] = path
+        elif ext == ".msg":
+            jobs.append(make_job("msg", path, _unique_path(config["output_dir"], filename + ".pdf")))
+            origin[path] = path
+        else:
+            kind = "pdf" if ext == ".pdf" else "docx"
+            jobs.append(make_job(kind, path, _unique_path(config["output_dir"], name)))
+            origin[path] = path
+
+    def finish(original, ok):
+        stats.record_file(ok)
+        stats.record_stage("total", time.time() - watcher.first_seen(original))
+        watcher.forget(original)
+        _archive(original, config["processed_dir"] if ok else config["failed_dir"])
+        intermediate = intermediates.get(original)
+        if intermediate and os.path.exists(intermediate):
+            os.remove(intermediate)
+
+    # 1. Konvertierungen (gemeinsam, warme LibreOffice-Instanzen)
+    if conversions:
+        start = time.time()
+        created = set(convert_office_files(conversions))
+        stats.record_stage("convert", time.time() - start, len(conversions))
+        for original, converted, _ in conversions:
+            if converted not in created:
+                finish(original, False)
+        jobs = [job for job in jobs if job["input"] not in intermediates.values()
+                or job["input"] in created]
+
+    # 2. Schwärzung
+    if jobs:
+        start = time.time()
+
+        def on_progress(done, total, job, error):
+            finish(origin[job["input"]], error is None)
+
+        workers = config["workers"] if len(jobs) > IN_PROCESS_MAX_FILES else 1
+        run_batch(jobs, mapper, workers=workers, progress=on_progress)
+        stats.record_stage("redact", time.time() - start, len(jobs))
+
+    if config["trace_dir"]:
+        path = os.path.join(config["trace_dir"], time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        tracing.write_report(path)
+        tracing.reset_batch()
+
+
+def _write_status(path, stats):
+    """Schreibt die Zähler atomar als JSON (für Monitoring)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_daemon(config):
+    """Hauptschleife: Modelle laden, dann den Eingangsordner bis zum Beenden überwachen."""
+    inbox = config["inbox"]
+    config["output_dir"] = config["output_dir"] or os.path.join(inbox, "redacted")
+    config["processed_dir"] = config["processed_dir"] or os.path.join(inbox, "processed")
+    config["failed_dir"] = config["failed_dir"] or os.path.join(inbox, "failed")
+    config["status_file"] = config["status_file"] or os.path.join(inbox, "daemon_status.json")
+    for folder in (config["output_dir"], config["processed_dir"], config["failed_dir"]):
+        os.makedirs(folder, exist_ok=True)
+
+    set_ner_engine(config["engine"])
+    set_sensitivity(config["sensitivity"])
+    set_flair_cascade(enabled=config["cascade"])
+    if config["trace_dir"]:
+        os.makedirs(config["trace_dir"], exist_ok=True)
+        tracing.enable_tracing()
+        tracing.enable_profiler(config["profile_slow"], out_dir=config["trace_dir"])
+        tracing.reset_batch()
+    warmup_ner_engine()
+    config["workers"] = config["workers"] or default_worker_count()
+    pool_workers = 1
+    if config["workers"] > 1:
+        # Pool einmal starten und seine Worker die Modelle laden lassen — er bleibt
+        # für alle Durchläufe bestehen
+        pool_workers = worker_pool.warm_worker_pool(config["workers"], worker_pool.task_settings())
+
+    print("=" * 60)
+    print(f"  Überwache: {inbox}")
+    print(f"  NER-Engine: {get_engine_name()}, Sensitivität: {config['sensitivity']}")
+    print(f"  Worker-Prozesse: {pool_workers}")
+    print(f"  Ausgabe: {config['output_dir']}")
+    print("=" * 60)
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    watcher = InboxWatcher(inbox)
+    stats = DaemonStats()
+    last_report = time.time()
+    try:
+        while not stopping:
+            stable, pending = watcher.scan()
+            stats.queue_depth = pending
+            if stable:
+                batch = stable[:config["max_batch"]]
+                print(f"\nVerarbeite {len(batch)} neue Datei(en)...")
+                process_batch(batch, config, stats, watcher)
+                stats.queue_depth = max(0, pending - len(batch))
+
+            if time.time() - last_report >= config["stats_interval"]:
+                print(stats.summary_line())
+                last_report = time.time()
+            _write_status(config["status_file"], stats)
+
+            if not stable:
+                time.sleep(config["interval"])
+    except KeyboardInterrupt:
+        pass
+
+    print("\nBeende Überwachung.")
+    print(stats.summary_line())
+    _write_status(config["status_file"], stats)
+
+
+# ==================== KONFIGURATION ====================
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Überwacht einen Eingangsordner und schwärzt neue Dokumente.")
+    parser.add_argument("--inbox", help="Eingangsordner, der überwacht wird")
+    parser.add_argument("--config", help="Konfigurationsdatei (JSON, Schlüssel wie die Optionen)")
+    parser.add_argument("--output-dir", help="Zielordner (Standard: <inbox>/redacted)")
+    parser.add_argument("--processed-dir", help="Ablage der Originale (Standard: <inbox>/processed)")
+    parser.add_argument("--failed-dir", help="Ablage fehlgeschlagener Originale (Standard: <inbox>/failed)")
+    parser.add_argument("--engine", choices=["flair", "flair-int8", "spacy"])
+    parser.add_argument("--sensitivity", choices=["konservativ", "standard", "aggressiv"])
+    parser.add_argument("--cascade", action="store_true", default=None,
+                        help="Flair-Kaskade: large-Modell nur auf Sätzen, die es brauchen")
+    parser.add_argument("--convert-pdf", action="store_true", default=None,
+                        help="DOCX/DOC vor der Schwärzung in PDF umwandeln")
+    parser.add_argument("--interval", type=float, help="Sekunden zwischen zwei Durchläufen")
+    parser.add_argument("--max-batch", type=int, help="Höchstens so viele Dateien pro Durchlauf")
+    parser.add_argument("--workers", type=int, help="Anzahl Worker-Prozesse")
+    parser.add_argument("--stats-interval", type=float, help="Sekunden zwischen zwei Statusausgaben")
+    parser.add_argument("--status-file", help="Statusdatei (Standard: <inbox>/daemon_status.json)")
+    parser.add_argument("--trace-dir", help="Laufzeitbericht pro Durchlauf als JSON in diesen Ordner schreiben")
+    parser.add_argument("--profile-slow", type=float,
+                        help="Dokumente, die länger als so viele Sekunden brauchen, profilieren (mit --trace-dir)")
+    return parser
+
+
+def load_config(args):
+    """Standardwerte ← Konfigurationsdatei ← Kommandozeile."""
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            file_config = json.load(f)
+        unknown = set(file_config) - set(DEFAULT_CONFIG)
+        if unknown:
+            print(f"  Warnung: unbekannte Konfigurationsschlüssel ignoriert: {', '.join(sorted(unknown))}")
+        config.update({key: value for key, value in file_config.items() if key in DEFAULT_CONFIG})
+    for key in DEFAULT_CONFIG:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    config = load_config(args)
+    if not config["inbox"] or not os.path.isdir(config["inbox"]):
+        parser.error("--inbox (oder 'inbox' in der Konfigurationsdatei) muss ein vorhandener Ordner sein")
+    run_daemon(config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Langlebiger Worker-Pool für die Erkennung (ein Pool pro Prozess).
+
+- Der Pool startet beim ersten Bedarf und bleibt bis zum Prozessende bestehen:
+  jeder Worker lädt die NER-Modelle einmal und nutzt sie für alle weiteren
+  Dokumente, PDF-Seitenbereiche und Batches
+- Jeder Auftrag trägt die Einstellungen des Aufrufers mit (Engine, Sensitivität,
+  Tracing, ...); ein Worker übernimmt sie nur, wenn sie sich geändert haben
+- Die Anzahl Worker ist durch die Kerne UND den freien Arbeitsspeicher begrenzt:
+  pro Worker wird der Speicherbedarf der aktiven Engine angesetzt
+- Startmethode forkserver bzw. spawn, nie fork aus dem Hauptprozess (siehe pool_context)
+"""
+
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tracing
+
+# Arbeitsspeicher, der für Hauptprozess und System frei bleibt (MB)
+MEMORY_RESERVE_MB = 1024
+
+_pool = None
+_pool_size = 0
+_pool_requested = 0  # gewünschte Anzahl, für die _pool_size berechnet wurde
+_pool_lock = threading.Lock()
+
+
+def pool_context():
+    """
+    Startmethode für den Pool. Kein fork aus dem Hauptprozess: dort laufen nach
+    dem Laden von torch/Flair deren Thread-Pools (in Web-App und Job-Queue weitere
+    Threads) — ein Fork kann deren Locks im gesperrten Zustand kopieren und den
+    Worker blockieren. Per forkserver forkt ein schlanker Prozess ohne torch die
+    Worker; jeder Worker lädt die Modelle beim ersten Auftrag selbst.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # Nur importieren, keine Modelle: der Forkserver bleibt frei von torch-Threads
+        context.set_forkserver_preload(["docx_redactor", "pdf_redactor", "worker_pool"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+# ==================== ANZAHL WORKER ====================
+
+def available_memory_mb():
+    """Verfügbarer Arbeitsspeicher laut /proc/meminfo in MB (None, wenn unbekannt)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def worker_limit(workers):
+    """
+    Begrenzt die gewünschte Anzahl Worker durch den freien Arbeitsspeicher.
+    Für einen laufenden Pool gilt die beim Start berechnete Größe weiter — seine
+    Worker belegen den Speicher bereits (sonst würde der Pool ständig neu gestartet).
+    """
+    global _pool_requested
+    from docx_redactor import worker_memory_mb
+    if _pool is not None and _pool_requested == workers:
+        return _pool_size
+    limit = max(1, workers)
+    available = available_memory_mb()
+    if available is not None:
+        fits = int(max(0, available - MEMORY_RESERVE_MB) // worker_memory_mb())
+        limit = max(1, min(workers, fits))
+        if limit < workers:
+            print(f"  Arbeitsspeicher reicht für {limit} statt {workers} Worker-Prozesse.")
+    _pool_requested = workers
+    return limit
+
+
+# ==================== POOL ====================
+
+def get_worker_pool(workers):
+    """
+    Gibt den Pool dieses Prozesses mit `workers` Prozessen zurück. Er wird nur neu
+    gestartet, wenn sich die Größe ändert oder ein Worker abgestürzt ist.
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None and _pool_size != workers:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+            _pool_size = workers
+        return _pool
+
+
+def shutdown_worker_pool(pool=None):
+    """Beendet den Pool (bei pool != None nur, wenn es noch der aktuelle ist)."""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or (pool is not None and pool is not _pool):
+            return
+        _pool.shutdown(wait=pool is None, cancel_futures=True)
+        _pool = None
+        _pool_size = 0
+
+
+atexit.register(shutdown_worker_pool)
+
+
+def task_settings(**overrides):
+    """Einstellungen dieses Prozesses für die Aufträge (overrides ersetzen einzelne Werte)."""
+    from docx_redactor import get_worker_settings
+    return {"redactor": dict(get_worker_settings(), **overrides),
+            "tracing": tracing.get_tracing_config()}
+
+
+def submit_task(workers, settings, fn, *args):
+    """Reiht fn(*args) im Pool ein; ein abgestürzter Pool wird einmal neu gestartet."""
+    pool = get_worker_pool(workers)
+    try:
+        return pool.submit(_run_task, settings, workers, fn, *args)
+    except BrokenProcessPool:
+        print("  Worker-Pool abgestürzt, starte ihn neu.")
+        shutdown_worker_pool(pool)
+        return get_worker_pool(workers).submit(_run_task, settings, workers, fn, *args)
+
+
+def warm_worker_pool(workers, settings):
+    """
+    Startet den Pool und lädt die Modelle in den Workern vorab (z.B. beim Start
+    eines Daemons), damit der erste Batch nicht die Ladezeit trägt.
+    workers: gewünschte Anzahl (wie bei späteren Aufrufen); gibt die tatsächliche zurück.
+    """
+    workers = worker_limit(workers)
+    futures = [submit_task(workers, settings, _warmed) for _ in range(workers)]
+    for future in futures:
+        future.result()
+    return workers
+
+
+# ==================== IM WORKER ====================
+
+_applied_settings = None
+
+
+def _run_task(settings, workers, fn, *args):
+    """Führt einen Auftrag im Worker aus: Einstellungen bei Änderung übernehmen, Modelle laden."""
+    global _applied_settings
+    from docx_redactor import apply_worker_settings, refresh_learned_entities, warmup_ner_engine
+    if settings != _applied_settings:
+        apply_worker_settings(settings["redactor"])
+        tracing.set_tracing_config(settings["tracing"])
+        _applied_settings = settings
+    else:
+        # Gelernte Entities können sich seit dem letzten Auftrag geändert haben
+        refresh_learned_entities()
+    warmup_ner_engine()
+    # torch soll pro Worker nicht alle Kerne belegen (sonst Überbuchung)
+    if "torch" in sys.modules:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    return fn(*args)
+
+
+def _warmed():
+    return os.getpid()